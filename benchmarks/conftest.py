@@ -0,0 +1,36 @@
+"""shared fixtures for the benchmarks of puppet mock"""
+import resource
+import sys
+
+import pytest
+
+from wechaty_puppet_mock import EnvironmentMock, Mocker, PuppetMockOptions, \
+    PuppetMock
+
+
+def peak_rss_kb() -> int:
+    """the peak resident set size of this process in KB"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS but KB on linux
+    if sys.platform == 'darwin':
+        return max_rss // 1024
+    return max_rss
+
+
+@pytest.fixture(autouse=True)
+def record_peak_rss(benchmark):
+    """save the peak rss into the json result of every benchmark"""
+    yield
+    benchmark.extra_info['peak_rss_kb'] = peak_rss_kb()
+
+
+@pytest.fixture(scope='session')
+def puppet() -> PuppetMock:
+    """the accessories can only bind to one puppet, so share it"""
+    environment = EnvironmentMock(contact_num=1000)
+    mocker = Mocker()
+    mocker.use(environment)
+    puppet = PuppetMock(PuppetMockOptions(mocker=mocker))
+    mocker.init(puppet, None)
+    mocker.login(environment.get_contact_payloads()[0].id)
+    return puppet
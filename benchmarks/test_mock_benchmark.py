@@ -0,0 +1,86 @@
+"""benchmarks for the hot paths of puppet mock
+
+run with `make benchmark`, the results are saved as json in .benchmarks/
+"""
+import asyncio
+
+import pytest
+
+from wechaty_puppet_mock import EnvironmentMock, PuppetMock
+from wechaty_puppet_mock.mock.content import ContentGenerator, ContentOptions
+
+MESSAGE_BATCH = 1000
+
+
+@pytest.mark.parametrize('contact_num', [1000, 100000])
+def test_environment_construction(benchmark, contact_num: int):
+    benchmark.extra_info['contact_num'] = contact_num
+    benchmark.pedantic(EnvironmentMock, kwargs={'contact_num': contact_num},
+                       rounds=1, iterations=1)
+
+
+def test_populate_rooms(benchmark):
+    environment = EnvironmentMock(contact_num=10000, room_num=0, seed=0)
+    benchmark.extra_info['room_num'] = 10000
+    benchmark.pedantic(environment.populate_rooms, args=(10000,),
+                       rounds=1, iterations=1)
+
+
+def test_message_event_throughput(benchmark, puppet: PuppetMock):
+    asyncio.get_event_loop().run_until_complete(puppet.start())
+    mocker = puppet.mocker
+    received = []
+    puppet.on('message', received.append)
+
+    contact_ids = [payload.id for payload in
+                   mocker.environment.get_contact_payloads()[:10]]
+    talkers = [mocker.Contact.load(contact_id) for contact_id in contact_ids]
+    room = mocker.new_room()
+
+    def send_messages():
+        received.clear()
+        for index in range(MESSAGE_BATCH):
+            mocker.send_message(
+                talker=talkers[index % len(talkers)],
+                conversation=room,
+                msg='ding'
+            )
+        assert len(received) == MESSAGE_BATCH
+
+    benchmark.extra_info['messages_per_round'] = MESSAGE_BATCH
+    benchmark(send_messages)
+
+
+def test_contact_payload_latency(benchmark, puppet: PuppetMock):
+    contact_id = puppet.mocker.environment.get_contact_payloads()[-1].id
+    loop = asyncio.get_event_loop()
+    benchmark(lambda: loop.run_until_complete(
+        puppet.contact_payload(contact_id)))
+
+
+def test_room_payload_latency(benchmark, puppet: PuppetMock):
+    room_id = puppet.mocker.environment.new_room_payload().id
+    loop = asyncio.get_event_loop()
+    benchmark(lambda: loop.run_until_complete(puppet.room_payload(room_id)))
+
+
+@pytest.mark.parametrize('room_size', [10000])
+def test_add_contact_to_large_room(benchmark, puppet: PuppetMock,
+                                   room_size: int):
+    environment = puppet.mocker.environment
+    member_ids = [environment.new_contact_payload().id
+                  for _ in range(room_size)]
+    room_id = environment.new_room_payload(member_ids=member_ids).id
+
+    def new_contact():
+        return (environment.new_contact_payload().id, room_id), {}
+
+    benchmark.extra_info['room_size'] = room_size
+    benchmark.pedantic(puppet.mocker.add_contact_to_room, setup=new_contact,
+                       rounds=200)
+
+
+def test_generate_content(benchmark):
+    generator = ContentGenerator(ContentOptions(seed=0))
+    member_ids = [f'contact-{index}' for index in range(100)]
+    benchmark(generator.generate, member_ids)
@@ -0,0 +1,59 @@
+"""ding-dong bot against the mocker"""
+import asyncio
+from typing import cast
+
+from wechaty import WechatyOptions     # type: ignore
+
+from wechaty_puppet import (    # type: ignore
+    Puppet,
+)
+
+from wechaty_puppet_mock import (
+    PuppetMock,
+    PuppetMockOptions,
+    EnvironmentMock,
+    Mocker
+)
+from wechaty_puppet_mock.bench.runner import DingDongBot
+
+
+async def main():
+    """the bot replies dong to every ding in the room"""
+
+    # init the mocker
+    environment = EnvironmentMock()
+    mocker = Mocker()
+    mocker.use(environment)
+
+    # init the puppet_mock
+    puppet_options = PuppetMockOptions(mocker=mocker)
+    puppet = PuppetMock(puppet_options)
+
+    # init the wechaty, the same bot which wechaty-mock-bench runs
+    wechaty_options = WechatyOptions(
+        puppet=cast(Puppet, puppet),
+        puppet_options=puppet_options
+    )
+    bot = DingDongBot(wechaty_options)
+    mocker.init(puppet, bot)
+    await bot.start()
+
+    contact_ids = [payload.id for payload in
+                   environment.get_contact_payloads()]
+    mocker.login(contact_ids[0])
+
+    # one of the members says ding in a room
+    room = mocker.new_room()
+    members = [member for member in await room.member_list()
+               if member.contact_id != contact_ids[0]]
+    mocker.send_message(
+        talker=members[0],
+        conversation=room,
+        msg='ding'
+    )
+    await asyncio.sleep(1)
+    await bot.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
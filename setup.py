@@ -79,6 +79,11 @@ setuptools.setup(
     packages=setuptools.find_packages('src'),
     package_dir={'': 'src'},
     install_requires=get_install_requires(),
+    entry_points={
+        'console_scripts': [
+            'wechaty-mock-bench=wechaty_puppet_mock.bench.cli:main',
+        ],
+    },
     classifiers=[
         'Programming Language :: Python :: 3.7',
         'License :: OSI Approved :: Apache Software License',
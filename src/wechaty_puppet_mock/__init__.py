@@ -5,11 +5,14 @@ from wechaty_puppet_mock.exceptions import (
 )
 from wechaty_puppet_mock.mock.environment import EnvironmentMock
 from wechaty_puppet_mock.mock.mocker import Mocker
+from wechaty_puppet_mock.fault import ApiFault, FaultInjector
 
 __all__ = [
     'PuppetMock',
     'PuppetMockOptions',
     'MockEnvironmentError',
     'EnvironmentMock',
-    'Mocker'
+    'Mocker',
+    'ApiFault',
+    'FaultInjector'
 ]
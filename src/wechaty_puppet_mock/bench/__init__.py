@@ -0,0 +1,35 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from wechaty_puppet_mock.bench.runner import (
+    BenchReport,
+    compare_with_baseline,
+    load_bot_factory,
+    run_bench
+)
+from wechaty_puppet_mock.bench.workloads import WORKLOADS, WorkloadContext
+
+__all__ = [
+    'BenchReport',
+    'compare_with_baseline',
+    'load_bot_factory',
+    'run_bench',
+    'WORKLOADS',
+    'WorkloadContext'
+]
@@ -0,0 +1,105 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from typing import List, Optional
+
+from wechaty_puppet_mock.bench.runner import (
+    compare_with_baseline,
+    load_bot_factory,
+    run_bench
+)
+from wechaty_puppet_mock.bench.workloads import WORKLOADS
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='wechaty-mock-bench',
+        description='run the standard workloads against the bot with the '
+                    'puppet mock, set WECHATY_LOG=WARNING to keep the '
+                    'console quiet'
+    )
+    parser.add_argument('--bot', default=None,
+                        help='module:attr or path/to/bot.py:attr, the attr '
+                             'receives WechatyOptions and returns Wechaty, '
+                             'the ding-dong bot by default')
+    parser.add_argument('--workload', default='ding-dong',
+                        choices=sorted(WORKLOADS))
+    parser.add_argument('--duration', type=float, default=None,
+                        help='run for seconds')
+    parser.add_argument('--events', type=int, default=None,
+                        help='run for the count of events')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='events per second, as fast as possible by '
+                             'default')
+    parser.add_argument('--contacts', type=int, default=100)
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None,
+                        help='write the json report to the file')
+    parser.add_argument('--baseline', default=None,
+                        help='the json report to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='the allowed regression ratio, 0.1 by default')
+    args = parser.parse_args(argv)
+    if args.duration is None and args.events is None:
+        args.duration = 10.0
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """the entry of wechaty-mock-bench"""
+    args = _parse_args(argv)
+    bot_factory = load_bot_factory(args.bot) if args.bot else None
+
+    report = asyncio.get_event_loop().run_until_complete(run_bench(
+        workload=args.workload,
+        bot_factory=bot_factory,
+        duration=args.duration,
+        events=args.events,
+        contact_num=args.contacts,
+        room_num=args.rooms,
+        rate=args.rate,
+        seed=args.seed
+    )).to_dict()
+
+    report_str = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report_str)
+    print(report_str)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'regression: {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import importlib.util
+import os
+import random
+import resource
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    cast
+)
+
+from wechaty import (   # type: ignore
+    Message,
+    Wechaty,
+    WechatyOptions
+)
+from wechaty_puppet import (    # type: ignore
+    Puppet,
+    get_logger
+)
+
+from wechaty_puppet_mock.correlation import ReplyCorrelator, percentiles
+from wechaty_puppet_mock.exceptions import WechatyPuppetMockError
+from wechaty_puppet_mock.mock.environment import EnvironmentMock
+from wechaty_puppet_mock.mock.mocker import Mocker
+from wechaty_puppet_mock.puppet_mock import PuppetMock, PuppetMockOptions
+from wechaty_puppet_mock.bench.workloads import WORKLOADS, WorkloadContext
+
+log = get_logger('MockBench')
+
+BotFactory = Callable[[WechatyOptions], Wechaty]
+
+# the metrics which are worse when they are bigger
+LOWER_IS_BETTER = ('latency_ms.p50', 'latency_ms.p90', 'latency_ms.p99',
+                   'peak_rss_kb')
+HIGHER_IS_BETTER = ('throughput',)
+
+
+class DingDongBot(Wechaty):
+    """the default bot which replies dong to ding, examples/ding-dong-bot.py
+    runs it against the mocker"""
+
+    async def on_message(self, msg: Message):
+        if msg.text() == 'ding':
+            await msg.say('dong')
+
+
+@dataclass
+class BenchReport:
+    """the json report of one bench run"""
+    workload: str
+    duration: float
+    events: int
+    throughput: float
+    replies: int
+    unanswered: int = 0
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    peak_rss_kb: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """the json-serializable data of report"""
+        return {
+            'workload': self.workload,
+            'duration': self.duration,
+            'events': self.events,
+            'throughput': self.throughput,
+            'replies': self.replies,
+            'unanswered': self.unanswered,
+            'latency_ms': self.latency_ms,
+            'peak_rss_kb': self.peak_rss_kb,
+        }
+
+
+def peak_rss_kb() -> int:
+    """the peak resident set size of this process in KB"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return max_rss // 1024
+    return max_rss
+
+
+def load_bot_factory(spec: str) -> BotFactory:
+    """load the bot from `module:attr` or `path/to/bot.py:attr`
+
+    the attr defaults to `bot`, it must be a callable which receives the
+    WechatyOptions and returns the Wechaty, eg: the subclass of Wechaty.
+    """
+    module_name, _, attr = spec.partition(':')
+    if module_name.endswith('.py'):
+        module_spec = importlib.util.spec_from_file_location(
+            os.path.splitext(os.path.basename(module_name))[0], module_name)
+        if module_spec is None or module_spec.loader is None:
+            raise WechatyPuppetMockError(f'can not load bot <{spec}>')
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)   # type: ignore
+    else:
+        module = importlib.import_module(module_name)
+
+    factory = getattr(module, attr or 'bot', None)
+    if not callable(factory):
+        raise WechatyPuppetMockError(f'bot <{spec}> is not callable')
+    return cast(BotFactory, factory)
+
+
+async def _drain(timeout: float):
+    """wait for the listener tasks of the bot to finish"""
+    deadline = time.perf_counter() + timeout
+    current = asyncio.current_task()
+    while time.perf_counter() < deadline:
+        pending = [task for task in asyncio.all_tasks()
+                   if task is not current and not task.done()]
+        if not pending:
+            return
+        await asyncio.sleep(0.01)
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+async def run_bench(workload: str,
+                    bot_factory: Optional[BotFactory] = None,
+                    duration: Optional[float] = None,
+                    events: Optional[int] = None,
+                    contact_num: int = 100,
+                    room_num: int = 10,
+                    rate: Optional[float] = None,
+                    seed: int = 0) -> BenchReport:
+    """run the named workload against the bot
+
+    Args:
+        workload (str): the name of workload in WORKLOADS
+        bot_factory (Optional[BotFactory]): DingDongBot by default
+        duration (Optional[float]): stop after seconds
+        events (Optional[int]): stop after the count of events
+        contact_num (int): the count of contacts in environment
+        room_num (int): the count of rooms in environment
+        rate (Optional[float]): events per second, None means as fast as
+            possible
+        seed (int): the seed of the workload
+
+    Returns:
+        BenchReport: throughput, latency percentiles and memory
+    """
+    if workload not in WORKLOADS:
+        raise WechatyPuppetMockError(f'workload <{workload}> not found, '
+                                     f'choose from {list(WORKLOADS)}')
+    if duration is None and events is None:
+        raise WechatyPuppetMockError('duration or events is required')
+    if contact_num < 2:
+        raise WechatyPuppetMockError('contact_num must be at least 2, the '
+                                     'login user can not talk to itself')
+
+    # init the mocker, the same as examples/ding-dong-mock.py
+    environment = EnvironmentMock(contact_num=contact_num)
+    mocker = Mocker()
+    mocker.use(environment)
+
+    puppet_options = PuppetMockOptions(mocker=mocker)
+    puppet = PuppetMock(puppet_options)
+
+    wechaty_options = WechatyOptions(
+        puppet=cast(Puppet, puppet),
+        puppet_options=puppet_options
+    )
+    bot = (bot_factory or DingDongBot)(wechaty_options)
+    mocker.init(puppet, bot)
+    await bot.start()
+
+    contact_ids = [payload.id for payload in environment.get_contact_payloads()]
+    login_user_id = contact_ids[0]
+    mocker.login(login_user_id)
+
+    rand = random.Random(seed)
+    room_ids = []
+    for _ in range(room_num):
+        member_ids = rand.sample(contact_ids,
+                                 rand.randint(1, len(contact_ids)))
+        # the workloads skip the login user, someone else must talk
+        if member_ids == [login_user_id]:
+            member_ids.append(rand.choice(contact_ids[1:]))
+        room_ids.append(
+            environment.new_room_payload(member_ids=member_ids).id)
+
+    correlator = ReplyCorrelator(mocker).attach()
+
+    context = WorkloadContext(mocker=mocker, login_user_id=login_user_id,
+                              room_ids=room_ids, rand=rand)
+    step = WORKLOADS[workload]
+
+    log.info('run the workload <%s>', workload)
+    loop = asyncio.get_event_loop()
+    start_time = loop.time()
+    injected = 0
+    while True:
+        elapsed = loop.time() - start_time
+        if duration is not None and elapsed >= duration:
+            break
+        if events is not None and injected >= events:
+            break
+        delay = 0.0
+        if rate:
+            delay = start_time + injected / rate - loop.time()
+        # always yield, so the bot can handle the events
+        await asyncio.sleep(max(delay, 0))
+        injected += step(context)
+
+    elapsed = loop.time() - start_time
+    await _drain(timeout=5)
+    await bot.stop()
+    correlator.detach()
+    latencies = correlator.latencies_ms()
+
+    return BenchReport(
+        workload=workload,
+        duration=elapsed,
+        events=injected,
+        throughput=injected / elapsed if elapsed else 0.0,
+        replies=len(latencies),
+        unanswered=sum(conversation.unanswered for conversation
+                       in correlator.conversations.values()),
+        latency_ms=percentiles(latencies),
+        peak_rss_kb=peak_rss_kb()
+    )
+
+
+def _metric(report: Dict[str, Any], name: str) -> Optional[float]:
+    value: Any = report
+    for key in name.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return float(value)
+
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any],
+                          tolerance: float = 0.1) -> List[str]:
+    """compare the report with the baseline report
+
+    Returns:
+        List[str]: the description of the regressions
+    """
+    regressions: List[str] = []
+    for name in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+        current, expected = _metric(report, name), _metric(baseline, name)
+        if current is None or not expected:
+            continue
+        if name in LOWER_IS_BETTER:
+            regressed = current > expected * (1 + tolerance)
+        else:
+            regressed = current < expected * (1 - tolerance)
+        if regressed:
+            regressions.append(f'{name}: {current:.3f} vs baseline '
+                               f'{expected:.3f}')
+    return regressions
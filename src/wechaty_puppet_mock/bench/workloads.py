@@ -0,0 +1,143 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional
+)
+
+from wechaty_puppet import MessageType    # type: ignore
+
+from wechaty_puppet_mock.mock.mocker import Mocker
+
+ROOM_FLOOD_BURST = 50
+
+
+@dataclass
+class WorkloadContext:
+    """the world which the workloads inject events into"""
+    mocker: Mocker
+    login_user_id: str
+    room_ids: List[str]
+    rand: random.Random
+
+
+# every step injects some events and returns the count of them
+Workload = Callable[[WorkloadContext], int]
+
+
+def _random_member(context: WorkloadContext, room_id: str) -> Optional[str]:
+    """a random member of the room except the login user, the messages of
+    the login user are sent by the bot itself"""
+    member_ids = [
+        member_id for member_id in context.mocker.environment
+        .get_room_member_ids(room_id)
+        if member_id != context.login_user_id
+    ]
+    if not member_ids:
+        return None
+    return context.rand.choice(member_ids)
+
+
+def ding_dong(context: WorkloadContext) -> int:
+    """one member of a random room says ding"""
+    room_id = context.rand.choice(context.room_ids)
+    talker_id = _random_member(context, room_id)
+    if talker_id is None:
+        return 0
+    context.mocker.send_message_payload(
+        talker_id=talker_id,
+        conversation_id=room_id,
+        msg_type=MessageType.MESSAGE_TYPE_TEXT,
+        text='ding'
+    )
+    return 1
+
+
+def room_flood(context: WorkloadContext) -> int:
+    """the members of the first room send a burst of messages"""
+    room_id = context.room_ids[0]
+    for index in range(ROOM_FLOOD_BURST):
+        talker_id = _random_member(context, room_id)
+        if talker_id is None:
+            return index
+        context.mocker.send_message_payload(
+            talker_id=talker_id,
+            conversation_id=room_id,
+            msg_type=MessageType.MESSAGE_TYPE_TEXT,
+            text=f'flood message {index}'
+        )
+    return ROOM_FLOOD_BURST
+
+
+def member_churn(context: WorkloadContext) -> int:
+    """one new contact joins a random room, and one member leaves it"""
+    room_id = context.rand.choice(context.room_ids)
+    leaving_id = _random_member(context, room_id)
+    contact_id = context.mocker.environment.new_contact_payload().id
+    context.mocker.add_contact_to_room(
+        contact_ids=[contact_id],
+        room_id=room_id,
+        inviter_id=context.login_user_id
+    )
+    if leaving_id is None:
+        return 1
+    context.mocker.remove_contact_from_room(
+        contact_ids=[leaving_id],
+        room_id=room_id,
+        remover_id=context.login_user_id
+    )
+    return 2
+
+
+def chatter(context: WorkloadContext) -> int:
+    """one member of a random room says something realistic"""
+    room_id = context.rand.choice(context.room_ids)
+    talker_id = _random_member(context, room_id)
+    if talker_id is None:
+        return 0
+    context.mocker.send_random_message(
+        talker_id=talker_id,
+        conversation_id=room_id
+    )
+    return 1
+
+
+def mixed_traffic(context: WorkloadContext) -> int:
+    """mostly ding-dong messages with some floods and member churn"""
+    workload = context.rand.choices(
+        [ding_dong, room_flood, member_churn],
+        weights=[90, 2, 8]
+    )[0]
+    return workload(context)
+
+
+WORKLOADS: Dict[str, Workload] = {
+    'ding-dong': ding_dong,
+    'room-flood': room_flood,
+    'member-churn': member_churn,
+    'chatter': chatter,
+    'mixed': mixed_traffic,
+}
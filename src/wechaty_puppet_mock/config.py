@@ -22,6 +22,7 @@ from __future__ import annotations
 
 import logging
 import os
+from functools import lru_cache
 from datetime import datetime
 import base64
 
@@ -71,8 +72,10 @@ def get_logger(name: str) -> logging.Logger:
     return logger
 
 
+@lru_cache(maxsize=None)
 def get_image_base64_data() -> str:
-    """the image base64 data"""
+    """the image base64 data, which is read once and shared by all of the
+    payloads"""
     sample_file_path = os.path.join(BASE_URL, 'mock/static/sample.jpeg')
     with open(sample_file_path, 'rb') as f:
         base64_str = base64.b64encode(f.read())
@@ -0,0 +1,229 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import json
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional
+)
+
+from wechaty_puppet import EventType, MessagePayload     # type: ignore
+
+from wechaty_puppet_mock.mock.mocker import Mocker, MockerResponse
+
+# outbound message payload -> the id of inbound message which it replies to
+CorrelationHook = Callable[[MessagePayload], Optional[str]]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """the p50/p90/p99/max of the samples"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def _at(ratio: float) -> float:
+        return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+    return {
+        'p50': _at(0.5),
+        'p90': _at(0.9),
+        'p99': _at(0.99),
+        'max': ordered[-1],
+    }
+
+
+@dataclass
+class OutboundRecord:
+    """one message sent by the login user"""
+    message_id: str
+    conversation_id: str
+    sent_at: float
+    inbound_message_id: Optional[str] = None
+    latency_ms: Optional[float] = None
+
+
+@dataclass
+class ConversationReplies:
+    """the reply latency of one conversation"""
+    latencies_ms: Deque[float] = field(default_factory=deque)
+    replies: int = 0
+    # the inbound messages which are not answered yet, oldest first
+    pending: OrderedDict[str, float] = field(default_factory=OrderedDict)
+    # the unanswered messages which are dropped out of the capacity
+    expired: int = 0
+
+    @property
+    def unanswered(self) -> int:
+        """the count of inbound messages which are not answered"""
+        return len(self.pending)
+
+
+class ReplyCorrelator:
+    """correlate the messages sent by the bot with the inbound messages
+
+    the outbound message replies to the most recent inbound message in the
+    same conversation, unless the hook returns the id of inbound message
+    explicitly. The inbound messages which are followed by no reply are
+    counted as unanswered, until they are expired by the capacity.
+
+    Args:
+        mocker (Mocker): the mocker which the messages flow through
+        capacity (int): the size of ring buffers of outbound records, the
+            unanswered messages, the conversations, and the latencies of
+            every conversation, the least recently active conversation is
+            dropped when there are too many
+        hook (Optional[CorrelationHook]): find the inbound message explicitly
+    """
+
+    def __init__(self, mocker: Mocker, capacity: int = 10000,
+                 hook: Optional[CorrelationHook] = None):
+        self._mocker = mocker
+        self.capacity = capacity
+        self.hook = hook
+        self.outbound: Deque[OutboundRecord] = deque(maxlen=capacity)
+        self.conversations: OrderedDict[str, ConversationReplies] = \
+            OrderedDict()
+        # unanswered message id -> conversation id, oldest first
+        self._inbound_ids: OrderedDict[str, str] = OrderedDict()
+
+    def attach(self) -> ReplyCorrelator:
+        """start to listen the messages of mocker"""
+        self._mocker.on('stream', self._on_stream)
+        return self
+
+    def detach(self):
+        """stop listening the messages of mocker"""
+        self._mocker.remove_listener('stream', self._on_stream)
+
+    def _conversation(self, conversation_id: str) -> ConversationReplies:
+        conversation = self.conversations.get(conversation_id)
+        if conversation is not None:
+            self.conversations.move_to_end(conversation_id)
+            return conversation
+
+        conversation = self.conversations[conversation_id] = \
+            ConversationReplies(latencies_ms=deque(maxlen=self.capacity))
+        if len(self.conversations) > self.capacity:
+            _, dropped = self.conversations.popitem(last=False)
+            for message_id in dropped.pending:
+                self._inbound_ids.pop(message_id, None)
+        return conversation
+
+    def _on_stream(self, response: MockerResponse):
+        if response.type != int(EventType.EVENT_TYPE_MESSAGE) or \
+                not self._mocker.has_login:
+            return
+        message_id = json.loads(response.payload)['messageId']
+        payload = self._mocker.environment.get_message_payload(message_id)
+        now = time.perf_counter()
+        if payload.from_id == self._mocker.login_user_id:
+            self.on_outbound(payload, now)
+        else:
+            self.on_inbound(payload, now)
+
+    def on_inbound(self, payload: MessagePayload, now: float):
+        """record the message which the bot should reply to"""
+        conversation_id = payload.room_id or payload.from_id
+        self._conversation(conversation_id).pending[payload.id] = now
+        self._inbound_ids[payload.id] = conversation_id
+        if len(self._inbound_ids) > self.capacity:
+            # the oldest unanswered message is expired
+            message_id, expired_id = self._inbound_ids.popitem(last=False)
+            conversation = self.conversations.get(expired_id)
+            if conversation is not None and \
+                    conversation.pending.pop(message_id, None) is not None:
+                conversation.expired += 1
+
+    def on_outbound(self, payload: MessagePayload, now: float):
+        """correlate the message sent by the bot, the latency is booked to
+        the conversation of the inbound message"""
+        conversation_id = payload.room_id or payload.to_id
+        record = OutboundRecord(message_id=payload.id,
+                                conversation_id=conversation_id,
+                                sent_at=now)
+        self.outbound.append(record)
+
+        conversation: Optional[ConversationReplies] = None
+        inbound_id: Optional[str] = None
+        if self.hook:
+            inbound_id = self.hook(payload)
+            if inbound_id and inbound_id in self._inbound_ids:
+                conversation = self._conversation(
+                    self._inbound_ids[inbound_id])
+        else:
+            conversation = self._conversation(conversation_id)
+            if conversation.pending:
+                inbound_id = next(reversed(conversation.pending))
+        # the inbound message is unknown, expired or answered already
+        if conversation is None or inbound_id is None or \
+                inbound_id not in conversation.pending:
+            return
+
+        received_at = conversation.pending[inbound_id]
+        record.inbound_message_id = inbound_id
+        record.latency_ms = (now - received_at) * 1000
+        conversation.latencies_ms.append(record.latency_ms)
+        conversation.replies += 1
+        if inbound_id == next(reversed(conversation.pending)):
+            # the earlier messages are answered by the reply together
+            answered_ids = list(conversation.pending)
+            conversation.pending.clear()
+        else:
+            answered_ids = [inbound_id]
+            del conversation.pending[inbound_id]
+        for message_id in answered_ids:
+            self._inbound_ids.pop(message_id, None)
+
+    def latencies_ms(self) -> List[float]:
+        """the reply latencies of all conversations"""
+        return [latency for conversation in self.conversations.values()
+                for latency in conversation.latencies_ms]
+
+    def report(self) -> Dict[str, Dict]:
+        """the reply latency percentiles and unanswered count of every
+        conversation"""
+        return {
+            conversation_id: {
+                'replies': conversation.replies,
+                'unanswered': conversation.unanswered,
+                'expired': conversation.expired,
+                'latency_ms': percentiles(list(conversation.latencies_ms)),
+            }
+            for conversation_id, conversation in self.conversations.items()
+        }
+
+    def summary(self) -> Dict[str, object]:
+        """the reply latency percentiles of all conversations"""
+        return {
+            'replies': sum(conversation.replies for conversation
+                           in self.conversations.values()),
+            'unanswered': sum(conversation.unanswered for conversation
+                              in self.conversations.values()),
+            'expired': sum(conversation.expired for conversation
+                           in self.conversations.values()),
+            'latency_ms': percentiles(self.latencies_ms()),
+        }
@@ -36,3 +36,15 @@ class WechatyPuppetMockError(Exception):
 
 class MockEnvironmentError(WechatyPuppetMockError):
     """environment mock error"""
+
+
+class PuppetFaultError(WechatyPuppetMockError):
+    """the error injected into the puppet api"""
+
+
+class PuppetTimeoutError(PuppetFaultError):
+    """the timeout injected into the puppet api"""
+
+
+class PuppetRateLimitError(PuppetFaultError):
+    """the puppet api is called faster than the rate limit"""
@@ -0,0 +1,210 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+from dataclasses import dataclass
+from typing import (
+    Dict,
+    Optional,
+    Union
+)
+
+from wechaty_puppet import get_logger     # type: ignore
+
+from wechaty_puppet_mock.exceptions import (
+    PuppetFaultError,
+    PuppetRateLimitError,
+    PuppetTimeoutError
+)
+
+log = get_logger('FaultInjector')
+
+# the puppet apis which support the injection
+FAULT_APIS = ('contact_payload', 'room_payload', 'message_payload',
+              'message_send_text', 'message_send_contact', 'message_send_file',
+              'message_send_url', 'message_send_mini_program',
+              'message_forward')
+
+
+@dataclass
+class FixedLatency:
+    """always the same latency"""
+    seconds: float
+
+    def sample(self, rand: random.Random) -> float:
+        """the latency in seconds"""
+        # pylint: disable=unused-argument
+        return self.seconds
+
+
+@dataclass
+class UniformLatency:
+    """the latency between low and high"""
+    low: float
+    high: float
+
+    def sample(self, rand: random.Random) -> float:
+        """the latency in seconds"""
+        return rand.uniform(self.low, self.high)
+
+
+@dataclass
+class LogNormalLatency:
+    """the long-tailed latency of the real rpc, eg: median=0.1, sigma=0.5
+    gives p99 around 0.32 seconds"""
+    median: float
+    sigma: float = 0.5
+    maximum: Optional[float] = None
+
+    def sample(self, rand: random.Random) -> float:
+        """the latency in seconds"""
+        seconds = rand.lognormvariate(math.log(self.median), self.sigma)
+        if self.maximum is not None:
+            seconds = min(seconds, self.maximum)
+        return seconds
+
+
+Latency = Union[FixedLatency, UniformLatency, LogNormalLatency]
+
+
+class TokenBucket:
+    """the token bucket which refills `rate` tokens per second up to
+    `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at: Optional[float] = None
+
+    def _refill(self, now: float):
+        if self._updated_at is not None:
+            refilled = (now - self._updated_at) * self.rate
+            self._tokens = min(self.capacity, self._tokens + refilled)
+        self._updated_at = now
+
+    def try_acquire(self, now: float) -> float:
+        """take one token, return 0 if succeed, or the seconds to wait for
+        the next token"""
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+@dataclass
+class ApiFault:
+    """the fault of one puppet api
+
+    Args:
+        latency (Optional[Latency]): the latency before the api returns
+        error_rate (float): the probability of raising PuppetFaultError
+        timeout_rate (float): the probability of raising PuppetTimeoutError
+            after `timeout` seconds
+        timeout (float): the seconds before the timeout is raised
+        rate_limit (Optional[TokenBucket]): limit the calls of the api
+        block (bool): wait for the token if the api is rate limited,
+            otherwise raise PuppetRateLimitError
+    """
+    latency: Optional[Latency] = None
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    timeout: float = 5.0
+    rate_limit: Optional[TokenBucket] = None
+    block: bool = True
+
+
+@dataclass
+class FaultStats:
+    """the injected faults of one puppet api"""
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    rate_limited: int = 0
+    latency: float = 0.0
+
+
+class FaultInjector:
+    """inject the latency, errors and rate limits into the puppet apis
+
+    every api samples from its own random generator derived from the seed,
+    so the faults of one api are deterministic no matter how the calls of
+    different apis interleave.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed
+        self._faults: Dict[str, ApiFault] = {}
+        self._randoms: Dict[str, random.Random] = {}
+        self.stats: Dict[str, FaultStats] = {}
+
+    def configure(self, api: str, fault: ApiFault) -> FaultInjector:
+        """configure the fault of the api, eg: message_send_text"""
+        if api not in FAULT_APIS:
+            raise PuppetFaultError(f'api <{api}> does not support the fault '
+                                   f'injection, choose from {FAULT_APIS}')
+        self._faults[api] = fault
+        self._randoms[api] = random.Random(
+            None if self.seed is None else f'{self.seed}:{api}')
+        self.stats[api] = FaultStats()
+        return self
+
+    def get_fault(self, api: str) -> Optional[ApiFault]:
+        """get the fault of the api"""
+        return self._faults.get(api)
+
+    async def inject(self, api: str):
+        """apply the fault before the api is handled"""
+        fault = self._faults.get(api)
+        if fault is None:
+            return
+        rand, stats = self._randoms[api], self.stats[api]
+        stats.calls += 1
+        loop = asyncio.get_event_loop()
+
+        if fault.rate_limit is not None:
+            wait = fault.rate_limit.try_acquire(loop.time())
+            while wait:
+                if not fault.block:
+                    stats.rate_limited += 1
+                    raise PuppetRateLimitError(f'api <{api}> is rate limited')
+                stats.rate_limited += 1
+                await asyncio.sleep(wait)
+                wait = fault.rate_limit.try_acquire(loop.time())
+
+        # sample all of the values every call, so the sequence is stable
+        latency = fault.latency.sample(rand) if fault.latency else 0.0
+        dice = rand.random()
+        if latency:
+            stats.latency += latency
+            await asyncio.sleep(latency)
+
+        if dice < fault.timeout_rate:
+            stats.timeouts += 1
+            await asyncio.sleep(fault.timeout)
+            raise PuppetTimeoutError(f'api <{api}> timeout after '
+                                     f'{fault.timeout} seconds')
+        if dice < fault.timeout_rate + fault.error_rate:
+            stats.errors += 1
+            raise PuppetFaultError(f'api <{api}> failed by the injection')
@@ -0,0 +1,238 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    Deque,
+    List,
+    Optional
+)
+
+from wechaty_puppet import get_logger     # type: ignore
+
+from wechaty_puppet_mock.metrics import METRICS, MockMetrics
+
+log = get_logger('LoopMonitor')
+
+LOOP_LAG_SECONDS = METRICS.loop_lag_seconds
+LOOP_STALLS = METRICS.loop_stalls
+LOOP_TASKS = METRICS.loop_tasks
+
+
+@dataclass
+class LoopMonitorOptions:
+    """the options of the event loop monitor
+
+    Args:
+        interval (float): the seconds between two samples
+        stall_threshold (float): the lag which is flagged as stall
+        top_tasks (int): the count of the longest-running tasks to report
+        stack_limit (int): the max frames of every stack
+        history (int): the count of samples kept
+    """
+    interval: float = 0.1
+    stall_threshold: float = 0.5
+    top_tasks: int = 3
+    stack_limit: int = 10
+    history: int = 1000
+
+
+@dataclass
+class TaskStack:
+    """the coroutine stack of one pending task"""
+    name: str
+    running_seconds: float
+    stack: List[str]
+
+
+@dataclass
+class LoopStall:
+    """the event loop was blocked longer than the threshold"""
+    lag: float
+    detected_at: float
+    task_count: int
+    # the stack of the loop thread captured while it was blocked
+    blocking_stack: List[str] = field(default_factory=list)
+    tasks: List[TaskStack] = field(default_factory=list)
+
+    def format(self) -> str:
+        """the readable report of the stall"""
+        lines = [f'event loop stalled for {self.lag:.3f}s with '
+                 f'{self.task_count} pending tasks']
+        if self.blocking_stack:
+            lines.append('blocked at:')
+            lines.extend(self.blocking_stack)
+        for task in self.tasks:
+            lines.append(f'task <{task.name}> running for '
+                         f'{task.running_seconds:.3f}s:')
+            lines.extend(task.stack)
+        return '\n'.join(lines)
+
+
+@dataclass
+class LoopSample:
+    """one sample of the event loop"""
+    time: float
+    lag: float
+    task_count: int
+
+
+def _task_name(task: asyncio.Task) -> str:
+    """the name of task, Task.get_name is only supported since python 3.8"""
+    get_name = getattr(task, 'get_name', None)
+    return get_name() if get_name else repr(task)
+
+
+def _format_stack(stack: traceback.StackSummary, limit: int) -> List[str]:
+    return [line.rstrip('\n') for line in stack.format()[-limit:]]
+
+
+class LoopMonitor:
+    """sample the scheduling lag and pending tasks of the event loop
+
+    the sampler coroutine measures how late it wakes up, and a watchdog
+    thread captures the stack of the loop thread when the loop has not
+    ticked for longer than the threshold, which points to the blocking code
+    itself rather than the task which happened to run after it.
+    """
+
+    def __init__(self, options: Optional[LoopMonitorOptions] = None,
+                 metrics: Optional[MockMetrics] = None):
+        self.options = options or LoopMonitorOptions()
+        self.metrics = metrics or METRICS
+        self.samples: Deque[LoopSample] = deque(maxlen=self.options.history)
+        self.stalls: Deque[LoopStall] = deque(maxlen=self.options.history)
+        self.max_lag = 0.0
+
+        self._first_seen: weakref.WeakKeyDictionary = \
+            weakref.WeakKeyDictionary()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._last_tick = time.monotonic()
+        self._blocking_stack: List[str] = []
+
+    @property
+    def running(self) -> bool:
+        """the monitor is sampling"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """start sampling in the running loop"""
+        if self.running:
+            return
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._last_tick = time.monotonic()
+        self._task = self._loop.create_task(self._sample_forever())
+        self._watchdog = threading.Thread(target=self._watch, daemon=True,
+                                          name='wechaty-mock-loop-watchdog')
+        self._watchdog.start()
+
+    def stop(self):
+        """stop sampling"""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._watchdog = None
+
+    def _watch(self):
+        """capture the stack of the loop thread while it is blocked"""
+        interval = min(self.options.interval,
+                       self.options.stall_threshold / 2)
+        captured_tick = None
+        while not self._stopped.wait(interval):
+            last_tick = self._last_tick
+            # the sampler is expected to tick again after one interval
+            blocked = time.monotonic() - last_tick - self.options.interval
+            if blocked < self.options.stall_threshold or \
+                    captured_tick == last_tick:
+                continue
+            # pylint: disable=protected-access
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._blocking_stack = _format_stack(
+                    traceback.extract_stack(frame), self.options.stack_limit)
+                captured_tick = last_tick
+
+    def _longest_running_tasks(self, tasks: List[asyncio.Task],
+                               now: float) -> List[TaskStack]:
+        current = asyncio.current_task()
+        candidates = sorted(
+            (task for task in tasks if task is not current),
+            key=lambda task: self._first_seen.get(task, now))
+        stacks = []
+        for task in candidates[:self.options.top_tasks]:
+            stacks.append(TaskStack(
+                name=_task_name(task),
+                running_seconds=now - self._first_seen.get(task, now),
+                stack=_format_stack(traceback.StackSummary.extract(
+                    (frame, frame.f_lineno) for frame in task.get_stack()
+                ), self.options.stack_limit)
+            ))
+        return stacks
+
+    def sample(self, lag: float):
+        """record one sample of the lag, flag it if it's a stall"""
+        now = time.monotonic()
+        tasks = [task for task in asyncio.all_tasks(self._loop)
+                 if not task.done()]
+        for task in tasks:
+            self._first_seen.setdefault(task, now)
+
+        self.samples.append(LoopSample(time=now, lag=lag,
+                                       task_count=len(tasks)))
+        self.max_lag = max(self.max_lag, lag)
+        self.metrics.loop_lag_seconds.observe(lag)
+        self.metrics.loop_tasks.set(len(tasks))
+        if lag < self.options.stall_threshold:
+            return
+
+        stall = LoopStall(
+            lag=lag,
+            detected_at=now,
+            task_count=len(tasks),
+            blocking_stack=self._blocking_stack,
+            tasks=self._longest_running_tasks(tasks, now)
+        )
+        self._blocking_stack = []
+        self.stalls.append(stall)
+        self.metrics.loop_stalls.inc()
+        log.warning(stall.format())
+
+    async def _sample_forever(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            expected = loop.time() + self.options.interval
+            await asyncio.sleep(self.options.interval)
+            self._last_tick = time.monotonic()
+            self.sample(max(loop.time() - expected, 0.0))
@@ -0,0 +1,249 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass, is_dataclass, fields
+from itertools import islice
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Set,
+    TYPE_CHECKING
+)
+
+from wechaty_puppet import get_logger     # type: ignore
+
+if TYPE_CHECKING:
+    from wechaty_puppet_mock.puppet_mock import PuppetMock
+
+log = get_logger('MemoryTracker')
+
+PACKAGE_NAME = 'wechaty_puppet_mock'
+KNOWN_PACKAGES = ('wechaty_puppet_mock', 'wechaty_puppet', 'wechaty', 'pyee',
+                  'asyncio')
+
+
+@dataclass
+class PoolUsage:
+    """live object count and estimated bytes of one pool"""
+    count: int
+    bytes: int
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """the bytes of object and everything it references"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(key, seen) + deep_sizeof(value, seen)
+                          for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    if is_dataclass(obj):
+        return size + sum(deep_sizeof(getattr(obj, item.name, None), seen)
+                          for item in fields(obj))
+    if hasattr(obj, '__dict__'):
+        return size + deep_sizeof(vars(obj), seen)
+    return size
+
+
+def estimate_pool_bytes(pool: Dict[str, Any], sample_size: int = 64) -> int:
+    """estimate the bytes of pool from the first payloads of it
+
+    the shared objects are counted in every payload, so it's the upper bound
+    """
+    if not pool:
+        return sys.getsizeof(pool)
+    samples = list(islice(pool.values(), sample_size))
+    average = sum(deep_sizeof(sample) for sample in samples) / len(samples)
+    return sys.getsizeof(pool) + int(average * len(pool))
+
+
+def _task_owner(task: asyncio.Task) -> str:
+    """the top-level package of the coroutine which the task runs"""
+    # Task.get_coro is only supported since python 3.8
+    get_coro = getattr(task, 'get_coro', None)
+    coro = get_coro() if get_coro else getattr(task, '_coro', None)
+    frame = getattr(coro, 'cr_frame', None)
+    module_name = frame.f_globals.get('__name__', '') if frame else ''
+    package = module_name.split('.')[0]
+    if package in KNOWN_PACKAGES:
+        return package
+    return 'bot'
+
+
+def pending_tasks_by_owner(
+        loop: Optional[asyncio.AbstractEventLoop] = None) -> Dict[str, int]:
+    """count the pending tasks of the loop by package, the running loop by
+    default"""
+    counts: Dict[str, int] = {}
+    for task in asyncio.all_tasks(loop):
+        if task.done():
+            continue
+        owner = _task_owner(task)
+        counts[owner] = counts.get(owner, 0) + 1
+    return counts
+
+
+def listener_counts(emitter: Any) -> Dict[str, int]:
+    """count the listeners of the pyee emitter by event"""
+    # pyee has no public api to list the event names
+    # pylint: disable=protected-access
+    return {str(event): len(listeners)
+            for event, listeners in emitter._events.items() if listeners}
+
+
+def memory_report(puppet: PuppetMock) -> Dict[str, Any]:
+    """live object counts and estimated bytes of every mock subsystem"""
+    environment = puppet.mocker.environment
+    report: Dict[str, Any] = {
+        'environment': {
+            name: asdict(usage)
+            for name, usage in environment.memory_usage().items()
+        },
+        'listeners': {
+            'mocker': listener_counts(puppet.mocker),
+            'puppet': listener_counts(puppet.emitter),
+        },
+    }
+    try:
+        report['pending_tasks'] = pending_tasks_by_owner()
+    except RuntimeError:
+        # there is no running loop
+        report['pending_tasks'] = {}
+    return report
+
+
+def _subsystem_of(traceback: tracemalloc.Traceback) -> str:
+    """the innermost module of the package in the traceback"""
+    for frame in traceback:
+        if PACKAGE_NAME in frame.filename:
+            path = frame.filename.replace('\\', '/')
+            module = path.rsplit(PACKAGE_NAME + '/', 1)[-1]
+            return module[:-3] if module.endswith('.py') else module
+    return 'unknown'
+
+
+@dataclass
+class SubsystemGrowth:
+    """the memory growth of one module between two checkpoints"""
+    subsystem: str
+    size_diff: int
+    count_diff: int
+    size: int
+
+
+class MemoryTracker:
+    """take tracemalloc snapshots filtered to the frames of this package,
+    and attribute the growth between checkpoints to the subsystems"""
+
+    def __init__(self, nframes: int = 16):
+        self.nframes = nframes
+        self._snapshots: List[tracemalloc.Snapshot] = []
+        self._checkpoints: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        self._started_tracing = False
+
+    def start(self):
+        """start tracing the memory allocation"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+            self._started_tracing = True
+
+    def stop(self):
+        """stop the periodic checkpoints and tracing"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def checkpoint(self, name: Optional[str] = None) -> tracemalloc.Snapshot:
+        """take the snapshot of the allocations from this package"""
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(True, f'*{PACKAGE_NAME}*', all_frames=True)
+        ])
+        self._snapshots.append(snapshot)
+        self._checkpoints.append(name or f'checkpoint-{len(self._snapshots)}')
+        return snapshot
+
+    @property
+    def checkpoints(self) -> List[str]:
+        """the names of the checkpoints"""
+        return list(self._checkpoints)
+
+    @staticmethod
+    def _group(snapshot: tracemalloc.Snapshot) -> Dict[str, List[int]]:
+        groups: Dict[str, List[int]] = {}
+        for statistic in snapshot.statistics('traceback'):
+            subsystem = _subsystem_of(statistic.traceback)
+            size_count = groups.setdefault(subsystem, [0, 0])
+            size_count[0] += statistic.size
+            size_count[1] += statistic.count
+        return groups
+
+    def diff(self, start: int = -2, end: int = -1) -> List[SubsystemGrowth]:
+        """the growth of every subsystem between two checkpoints, the last
+        two checkpoints by default, sorted by the growth of size"""
+        if len(self._snapshots) < 2:
+            return []
+        old_groups = self._group(self._snapshots[start])
+        new_groups = self._group(self._snapshots[end])
+        growths = []
+        for subsystem in set(old_groups) | set(new_groups):
+            old_size, old_count = old_groups.get(subsystem, [0, 0])
+            new_size, new_count = new_groups.get(subsystem, [0, 0])
+            growths.append(SubsystemGrowth(
+                subsystem=subsystem,
+                size_diff=new_size - old_size,
+                count_diff=new_count - old_count,
+                size=new_size
+            ))
+        return sorted(growths, key=lambda growth: growth.size_diff,
+                      reverse=True)
+
+    async def _run_periodic(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.checkpoint()
+            for growth in self.diff()[:5]:
+                log.info('memory growth <%s>: %+d bytes, %+d blocks',
+                         growth.subsystem, growth.size_diff,
+                         growth.count_diff)
+
+    def start_periodic(self, interval: float = 60.0):
+        """take the checkpoints periodically in the running loop"""
+        self.start()
+        if not self._snapshots:
+            self.checkpoint('start')
+        self._task = asyncio.ensure_future(self._run_periodic(interval))
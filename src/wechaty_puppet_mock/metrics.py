@@ -0,0 +1,371 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type
+)
+
+from wechaty_puppet_mock.exceptions import WechatyPuppetMockError
+
+Labels = Tuple[str, ...]
+Collector = Callable[[], Dict[Labels, float]]
+
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01,
+                   0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n')\
+        .replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(str(value))}"'
+                     for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Metric:
+    """the base of metrics, the label values are passed as a tuple in the
+    order of labelnames to keep the hot path cheap"""
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[Tuple[str, Labels, Sequence[str], float]]:
+        """(suffix, label names, label values, value) of the metric"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """the prometheus text format of the metric"""
+        lines = [f'# HELP {self.name} {_escape(self.documentation)}',
+                 f'# TYPE {self.name} {self.type_name}']
+        for suffix, names, values, value in self.samples():
+            lines.append(f'{self.name}{suffix}'
+                         f'{_format_labels(names, values)} '
+                         f'{_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """the monotonic counter"""
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()):
+        """increase the counter of the label values"""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def get(self, labels: Labels = ()) -> float:
+        """get the value of the label values"""
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[Tuple[str, Labels, Sequence[str], float]]:
+        return [('', self.labelnames, labels, value)
+                for labels, value in list(self._values.items())]
+
+
+class Gauge(Metric):
+    """the gauge which can be set directly or collected by a callback"""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._collectors: List[Collector] = []
+
+    def set(self, value: float, labels: Labels = ()):
+        """set the value of the label values"""
+        self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()):
+        """increase the value of the label values"""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: Labels = ()):
+        """decrease the value of the label values"""
+        self.inc(-amount, labels)
+
+    def get(self, labels: Labels = ()) -> float:
+        """get the value of the label values, collectors included"""
+        return self._collect().get(labels, 0.0)
+
+    def add_collector(self, collector: Collector):
+        """collect the values by the callback when the metrics are exported,
+        the callback returns label values -> value"""
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Collector):
+        """stop collecting the values by the callback"""
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def _collect(self) -> Dict[Labels, float]:
+        """the set values plus the collected ones, the values of the same
+        label values from several collectors are summed"""
+        values = dict(list(self._values.items()))
+        for collector in list(self._collectors):
+            for labels, value in collector().items():
+                values[labels] = values.get(labels, 0.0) + value
+        return values
+
+    def samples(self) -> List[Tuple[str, Labels, Sequence[str], float]]:
+        return [('', self.labelnames, labels, value)
+                for labels, value in self._collect().items()]
+
+
+class Histogram(Metric):
+    """the histogram with fixed buckets"""
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        """observe the value of the label values"""
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        """the count of the observed values"""
+        counts = self._values.get(labels)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self) -> List[Tuple[str, Labels, Sequence[str], float]]:
+        samples: List[Tuple[str, Labels, Sequence[str], float]] = []
+        bucket_names = self.labelnames + ('le',)
+        for labels, counts in list(self._values.items()):
+            counts = list(counts)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float('inf'),),
+                                    counts[:-1]):
+                cumulative += count
+                samples.append(('_bucket', bucket_names,
+                                labels + (_format_value(bound),), cumulative))
+            samples.append(('_sum', self.labelnames, labels, counts[-1]))
+            samples.append(('_count', self.labelnames, labels, cumulative))
+        return samples
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsRegistry:
+    """the registry of the metrics, which can be exported in prometheus text
+    format by file dump or local http endpoint"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class: Type[Metric], name: str,
+                       documentation: str, labelnames: Sequence[str],
+                       **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, documentation, labelnames,
+                                      **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise WechatyPuppetMockError(
+                    f'metric <{name}> is registered as {metric.type_name}')
+            return metric
+
+    def counter(self, name: str, documentation: str,
+                labelnames: Sequence[str] = ()) -> Counter:
+        """get or create the counter"""
+        metric = self._get_or_create(Counter, name, documentation, labelnames)
+        assert isinstance(metric, Counter)
+        return metric
+
+    def gauge(self, name: str, documentation: str,
+              labelnames: Sequence[str] = ()) -> Gauge:
+        """get or create the gauge"""
+        metric = self._get_or_create(Gauge, name, documentation, labelnames)
+        assert isinstance(metric, Gauge)
+        return metric
+
+    def histogram(self, name: str, documentation: str,
+                  labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """get or create the histogram"""
+        metric = self._get_or_create(Histogram, name, documentation,
+                                     labelnames, buckets=buckets)
+        assert isinstance(metric, Histogram)
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        """get the metric by name"""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """all of the metrics in prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+    def dump(self, path: str):
+        """write the metrics to the file, eg: for the textfile collector"""
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.render())
+        # replace the file at once, so the reader never gets half of it
+        os.replace(temp_path, path)
+
+    def serve(self, port: int = 9464, host: str = '127.0.0.1') -> HTTPServer:
+        """serve the metrics at http://host:port/metrics in a daemon thread
+
+        Returns:
+            HTTPServer: call `shutdown()` to stop it
+        """
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            # pylint: disable=invalid-name
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type',
+                                 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):   # pylint: disable=W0622
+                pass
+
+        server = _ThreadingHTTPServer((host, port), _Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True,
+                                  name='wechaty-mock-metrics')
+        thread.start()
+        return server
+
+
+class MockMetrics:
+    """the metrics of one mock, created in the registry
+
+    every puppet reports to the default `REGISTRY` unless its options give
+    it another registry, eg: to keep the runs apart in the tests.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.events_emitted = registry.counter(
+            'wechaty_mock_events_emitted_total',
+            'the events emitted by mocker', ['event_type'])
+        self.event_dispatch_seconds = registry.histogram(
+            'wechaty_mock_event_dispatch_seconds',
+            'the time of dispatching the event to the sync listeners',
+            ['event_type'])
+        self.messages_stored = registry.counter(
+            'wechaty_mock_messages_stored_total',
+            'the message payloads stored in environment')
+        self.payload_lookups = registry.counter(
+            'wechaty_mock_payload_lookups_total',
+            'the payload lookups in environment', ['payload_type'])
+        self.payload_misses = registry.counter(
+            'wechaty_mock_payload_misses_total',
+            'the payload lookups which are not found in environment',
+            ['payload_type'])
+        self.listeners = registry.gauge(
+            'wechaty_mock_listeners',
+            'the listeners of the emitters', ['emitter', 'event'])
+        self.pending_tasks = registry.gauge(
+            'wechaty_mock_pending_tasks',
+            'the pending tasks of the event loop', ['owner'])
+        self.accessory_cache = registry.counter(
+            'wechaty_mock_accessory_cache_total',
+            'the accessory cache lookups of mocker',
+            ['payload_type', 'result'])
+        self.loop_lag_seconds = registry.histogram(
+            'wechaty_mock_loop_lag_seconds',
+            'the scheduling lag of the event loop',
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+        self.loop_stalls = registry.counter(
+            'wechaty_mock_loop_stalls_total',
+            'the event loop lags above the stall threshold')
+        self.loop_tasks = registry.gauge(
+            'wechaty_mock_loop_tasks',
+            'the pending tasks of the event loop in the last sample')
+        self.send_queue_wait_seconds = registry.histogram(
+            'wechaty_mock_send_queue_wait_seconds',
+            'the time of the outbound messages waiting in the send queue',
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0,
+                     60.0))
+        self.send_queue_depth = registry.gauge(
+            'wechaty_mock_send_queue_depth',
+            'the outbound messages waiting in the send queue')
+
+
+# the default registry which the mock reports to
+REGISTRY = MetricsRegistry()
+METRICS = MockMetrics(REGISTRY)
+
+EVENTS_EMITTED = METRICS.events_emitted
+EVENT_DISPATCH_SECONDS = METRICS.event_dispatch_seconds
+MESSAGES_STORED = METRICS.messages_stored
+PAYLOAD_LOOKUPS = METRICS.payload_lookups
+PAYLOAD_MISSES = METRICS.payload_misses
+LISTENERS = METRICS.listeners
+PENDING_TASKS = METRICS.pending_tasks
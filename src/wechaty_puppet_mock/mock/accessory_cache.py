@@ -0,0 +1,134 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar
+)
+from weakref import WeakValueDictionary
+
+from wechaty_puppet import get_logger     # type: ignore
+from wechaty_puppet.schemas.types import PayloadType     # type: ignore
+
+from wechaty_puppet_mock.metrics import METRICS, MockMetrics
+
+log = get_logger('AccessoryCache')
+
+ACCESSORY_CACHE = METRICS.accessory_cache
+
+AccessoryT = TypeVar('AccessoryT')
+
+
+@dataclass
+class AccessoryCacheStats:
+    """the lookups of the accessory cache"""
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """the hits / lookups"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class AccessoryCache:
+    """payload type -> id -> the accessory instance with payload attached
+
+    the values are weak references, so the hot conversations reuse the same
+    instance while someone holds it, and the cold ones are released with the
+    last reference. the missed accessories are created by `load` of wechaty,
+    so the pooled ones, eg: Contact and Room, are the same instances as
+    `Contact.load` returns, and the cache also reuses the messages which
+    wechaty doesn't pool.
+    """
+
+    def __init__(self, metrics: Optional[MockMetrics] = None):
+        self.metrics = metrics or METRICS
+        self._pools: Dict[PayloadType, WeakValueDictionary] = {}
+        self._labels: Dict[PayloadType, Tuple[Tuple[str, str],
+                                              Tuple[str, str]]] = {}
+        self.stats = AccessoryCacheStats()
+
+    def __len__(self) -> int:
+        return sum(len(pool) for pool in self._pools.values())
+
+    def _get_labels(self, payload_type: PayloadType
+                    ) -> Tuple[Tuple[str, str], Tuple[str, str]]:
+        labels = self._labels.get(payload_type)
+        if labels is None:
+            name = PayloadType(payload_type).name
+            labels = self._labels[payload_type] = ((name, 'hit'),
+                                                   (name, 'miss'))
+        return labels
+
+    def get(self, payload_type: PayloadType, accessory_class: Type[AccessoryT],
+            accessory_id: str, load_payload: Callable[[str], Any]
+            ) -> AccessoryT:
+        """get the cached accessory, or load it and attach the payload
+
+        Args:
+            payload_type (PayloadType): the pool of the accessory
+            accessory_class (Type[AccessoryT]): eg: Contact, Room, Message
+            accessory_id (str): the id of the accessory
+            load_payload (Callable[[str], Any]): load the payload by id
+        """
+        pool = self._pools.get(payload_type)
+        if pool is None:
+            pool = self._pools[payload_type] = WeakValueDictionary()
+        hit_labels, miss_labels = self._get_labels(payload_type)
+
+        accessory = pool.get(accessory_id)
+        if accessory is not None and isinstance(accessory, accessory_class):
+            self.stats.hits += 1
+            self.metrics.accessory_cache.inc(labels=hit_labels)
+            return accessory
+
+        self.stats.misses += 1
+        self.metrics.accessory_cache.inc(labels=miss_labels)
+        accessory = accessory_class.load(accessory_id)   # type: ignore
+        # the payload setter of wechaty refuses to replace the payload of
+        # the pooled accessory, which is changed in environment
+        # pylint: disable=protected-access
+        accessory._payload = load_payload(accessory_id)
+        pool[accessory_id] = accessory
+        return accessory
+
+    def invalidate(self, payload_type: PayloadType, accessory_id: str):
+        """drop the accessory whose payload is changed, the payload is
+        attached again on the next load"""
+        pool = self._pools.get(payload_type)
+        if pool is not None and pool.pop(accessory_id, None) is not None:
+            self.stats.invalidations += 1
+
+    def clear(self, payload_type: Optional[PayloadType] = None):
+        """drop all of the accessories, or the accessories of the type"""
+        if payload_type is None:
+            self._pools.clear()
+        else:
+            self._pools.pop(payload_type, None)
@@ -0,0 +1,191 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    List,
+    Optional
+)
+
+from wechaty_puppet import get_logger     # type: ignore
+from wechaty_puppet.schemas.types import PayloadType     # type: ignore
+
+from wechaty_puppet_mock.exceptions import MockEnvironmentError
+
+log = get_logger('ChangeFeed')
+
+CHANGE_INSERT = 'insert'
+CHANGE_UPDATE = 'update'
+CHANGE_DELETE = 'delete'
+
+
+@dataclass
+class Change:
+    """one change of the environment
+
+    the members are PAYLOAD_TYPE_ROOM_MEMBER changes, whose payload_id is
+    the contact id and room_id is the room of the member.
+    """
+    seq: int
+    op: str
+    payload_type: PayloadType
+    payload_id: str
+    room_id: Optional[str] = None
+
+
+ChangeListener = Callable[[List[Change]], None]
+
+
+class ChangeSubscription:
+    """the cursor of one observer on the feed
+
+    the subscription with listener receives the batches when the feed is
+    flushed, the one without listener polls the batches itself.
+    """
+
+    def __init__(self, feed: ChangeFeed, cursor: int, batch_size: int,
+                 listener: Optional[ChangeListener] = None):
+        self.feed = feed
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.listener = listener
+
+    def poll(self, limit: Optional[int] = None) -> List[Change]:
+        """get the next batch of changes after the cursor and move it"""
+        changes = self.feed.changes_since(self.cursor,
+                                          limit or self.batch_size)
+        if changes:
+            self.cursor = changes[-1].seq
+        return changes
+
+    def close(self):
+        """stop receiving the changes"""
+        self.feed.unsubscribe(self)
+
+
+class ChangeFeed:
+    """the ordered changes of the environment with sequence numbers
+
+    the recent changes are kept in a list which is trimmed to the capacity,
+    so the observers can subscribe from an old sequence and catch up, and
+    every observer costs O(changes) instead of copying the pools.
+
+    Args:
+        capacity (int): the count of changes which are kept for catching up
+    """
+
+    def __init__(self, capacity: int = 100000):
+        if capacity <= 0:
+            raise MockEnvironmentError('capacity of change feed must be '
+                                       'positive')
+        self.capacity = capacity
+        self.last_seq = 0
+        # seq of self._changes[index] is self._base_seq + index + 1
+        self._changes: List[Change] = []
+        self._base_seq = 0
+        self._subscriptions: List[ChangeSubscription] = []
+        self._scheduled = False
+
+    @property
+    def first_seq(self) -> int:
+        """the oldest sequence which can be subscribed from"""
+        return self._base_seq
+
+    def append(self, op: str, payload_type: PayloadType, payload_id: str,
+               room_id: Optional[str] = None) -> int:
+        """record the change and schedule the delivery
+
+        Returns:
+            int: the sequence of the change
+        """
+        self.last_seq += 1
+        self._changes.append(Change(self.last_seq, op, payload_type,
+                                    payload_id, room_id))
+        if len(self._changes) >= self.capacity * 2:
+            trimmed = len(self._changes) - self.capacity
+            del self._changes[:trimmed]
+            self._base_seq += trimmed
+        self._schedule_flush()
+        return self.last_seq
+
+    def _schedule_flush(self):
+        """deliver the batch in the next loop iteration, if there is a loop,
+        otherwise the owner calls flush"""
+        if self._scheduled or not self._subscriptions:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._scheduled = True
+        loop.call_soon(self.flush)
+
+    def changes_since(self, seq: int,
+                      limit: Optional[int] = None) -> List[Change]:
+        """get the changes whose sequence is bigger than seq"""
+        if seq < self._base_seq:
+            raise MockEnvironmentError(f'changes after <{seq}> are trimmed, '
+                                       f'the oldest sequence is '
+                                       f'<{self._base_seq}>')
+        start = seq - self._base_seq
+        end = None if limit is None else start + limit
+        return self._changes[start:end]
+
+    def subscribe(self, listener: Optional[ChangeListener] = None,
+                  from_seq: Optional[int] = None,
+                  batch_size: int = 1000) -> ChangeSubscription:
+        """subscribe the changes after from_seq, the new changes by default
+
+        Args:
+            listener (Optional[ChangeListener]): called with the batches when
+                the feed is flushed, None to poll the subscription
+            from_seq (Optional[int]): the changes after it are delivered
+            batch_size (int): the max count of changes in one batch
+        """
+        if from_seq is None:
+            from_seq = self.last_seq
+        if from_seq < self._base_seq or from_seq > self.last_seq:
+            raise MockEnvironmentError(f'can not subscribe from <{from_seq}>,'
+                                       f' the feed is in <{self._base_seq}, '
+                                       f'{self.last_seq}>')
+        subscription = ChangeSubscription(self, from_seq, batch_size,
+                                          listener)
+        self._subscriptions.append(subscription)
+        if from_seq < self.last_seq:
+            self._schedule_flush()
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeSubscription):
+        """remove the subscription"""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def flush(self):
+        """deliver the pending changes to the listeners in batches"""
+        self._scheduled = False
+        for subscription in list(self._subscriptions):
+            if subscription.listener is None:
+                continue
+            while subscription.cursor < self.last_seq:
+                changes = subscription.poll()
+                subscription.listener(changes)
@@ -0,0 +1,172 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import (
+    Callable,
+    List,
+    Optional,
+    Sequence
+)
+
+from faker import Faker     # type: ignore
+
+from wechaty_puppet_mock.exceptions import WechatyPuppetMockError
+
+# the unicode emoji and the wechat emoticon codes
+DEFAULT_EMOJI: List[str] = [
+    '😀', '😂', '🤣', '😊', '😍', '😘', '😅', '😭', '😡', '😱', '🤔', '🙄',
+    '👍', '👌', '🙏', '👏', '💪', '🎉', '🔥', '❤️', '💔', '🌹', '☕', '🍺',
+    '[微笑]', '[撇嘴]', '[色]', '[发呆]', '[流泪]', '[害羞]', '[大哭]',
+    '[尴尬]', '[发怒]', '[调皮]', '[呲牙]', '[惊讶]', '[难过]', '[抓狂]',
+    '[偷笑]', '[愉快]', '[白眼]', '[捂脸]', '[奸笑]', '[机智]', '[皱眉]',
+    '[耶]', '[强]', '[握手]', '[抱拳]', '[OK]', '[玫瑰]', '[红包]',
+]
+
+
+@dataclass
+class ContentOptions:
+    """the distributions of the generated messages
+
+    Args:
+        median_tokens (float): the median count of tokens in one message
+        sigma (float): the spread of the log-normal message lengths
+        max_tokens (int): the longest message in tokens
+        zipf_exponent (float): the skew of the token frequencies, the word
+            list of faker is ranked in its order
+        emoji_rate (float): the probability that a message has emoji
+        max_emoji (int): the max count of emoji in one message
+        mention_rate (float): the probability that a room message mentions
+            the members
+        max_mentions (int): the max count of mentions in one message
+        url_rate (float): the probability that a message has an url
+        locale (str): the faker locale of the words and urls
+        separator (Optional[str]): between the tokens, by the locale if None
+        table_size (int): the count of precomputed lengths and tokens
+        emoji (List[str]): the emoji to choose from
+        seed (Optional[int]): the seed of the corpus and the sampling
+    """
+    # pylint: disable=too-many-instance-attributes
+    median_tokens: float = 8.0
+    sigma: float = 1.0
+    max_tokens: int = 200
+    zipf_exponent: float = 1.1
+    emoji_rate: float = 0.15
+    max_emoji: int = 3
+    mention_rate: float = 0.1
+    max_mentions: int = 2
+    url_rate: float = 0.02
+    locale: str = 'zh_CN'
+    separator: Optional[str] = None
+    table_size: int = 1 << 16
+    emoji: List[str] = field(default_factory=lambda: list(DEFAULT_EMOJI))
+    seed: Optional[int] = None
+
+
+@dataclass
+class MessageContent:
+    """the text of one generated message with the mentioned contacts"""
+    text: str
+    mention_ids: List[str] = field(default_factory=list)
+
+
+class ContentGenerator:
+    """generate the message texts from a corpus which is built once
+
+    faker is only called while the corpus is built: the message lengths are
+    sampled into a table, and the tokens into a long zipf-distributed
+    stream, so one message is a table lookup and a slice of the stream
+    joined together, which is fast enough for millions of messages.
+    """
+
+    def __init__(self, options: Optional[ContentOptions] = None):
+        self.options = options or ContentOptions()
+        options = self.options
+        if min(options.max_tokens, options.table_size, options.max_emoji,
+               options.max_mentions) <= 0:
+            raise WechatyPuppetMockError('max_tokens, table_size, max_emoji '
+                                         'and max_mentions must be positive')
+        self._random = random.Random(options.seed)
+        separator = options.separator
+        if separator is None:
+            separator = '' if options.locale[:2] in ('zh', 'ja') else ' '
+        self._separator: str = separator
+
+        fake = Faker(options.locale)
+        fake.seed_instance(options.seed)
+        words = list(dict.fromkeys(fake.get_words_list()))
+        cum_weights = list(accumulate(
+            1 / rank ** options.zipf_exponent
+            for rank in range(1, len(words) + 1)))
+        # long enough that the windows of the messages rarely repeat
+        self._tokens: List[str] = self._random.choices(
+            words, cum_weights=cum_weights,
+            k=options.table_size * 4 + options.max_tokens)
+        self._lengths: List[int] = [
+            max(1, min(options.max_tokens, int(self._random.lognormvariate(
+                0, options.sigma) * options.median_tokens)))
+            for _ in range(options.table_size)
+        ]
+        self._urls: List[str] = [fake.url() + fake.uri_path()
+                                 for _ in range(256)]
+        self._emoji = options.emoji
+
+    def generate(self, member_ids: Sequence[str] = (),
+                 get_name: Optional[Callable[[str], str]] = None
+                 ) -> MessageContent:
+        """generate one message
+
+        Args:
+            member_ids (Sequence[str]): the members who can be mentioned,
+                eg: the members of the room, only the mentioned ones are read, so it
+                can be a view of the member store
+            get_name (Optional[Callable[[str], str]]): the display name of
+                the mentioned member, the id if None
+        """
+        options = self.options
+        rand = self._random
+        length = self._lengths[rand.randrange(len(self._lengths))]
+        start = rand.randrange(len(self._tokens) - length)
+        parts = self._tokens[start:start + length]
+
+        if options.emoji_rate and rand.random() < options.emoji_rate:
+            for _ in range(rand.randint(1, options.max_emoji)):
+                parts.insert(rand.randint(0, len(parts)),
+                             rand.choice(self._emoji))
+        if options.url_rate and rand.random() < options.url_rate:
+            parts.insert(rand.randint(0, len(parts)),
+                         f' {rand.choice(self._urls)} ')
+
+        mention_ids: List[str] = []
+        if member_ids and options.mention_rate and \
+                rand.random() < options.mention_rate:
+            mention_ids = rand.sample(
+                member_ids, min(len(member_ids),
+                                rand.randint(1, options.max_mentions)))
+            mentions = ''.join(
+                f'@{get_name(mention_id) if get_name else mention_id} '
+                for mention_id in mention_ids)
+            parts.insert(0, mentions)
+
+        return MessageContent(text=self._separator.join(parts).strip(),
+                              mention_ids=mention_ids)
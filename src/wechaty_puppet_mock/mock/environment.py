@@ -18,13 +18,24 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import os
+import sys
+import time
 from collections import defaultdict
+from dataclasses import dataclass, replace
+from itertools import count
 from typing import (
+    Any,
+    Callable,
     Dict,
+    Iterator,
     Optional,
-    List
+    List,
+    Sequence,
+    Set,
+    Tuple
 )
 import random
+from uuid import UUID, uuid4
 from wechaty_puppet import (    # type: ignore
     ContactPayload,
     ContactGender,
@@ -33,38 +44,160 @@ from wechaty_puppet import (    # type: ignore
     RoomPayload,
     MessagePayload
 )
+from wechaty_puppet.schemas.types import (     # type: ignore
+    FriendshipPayload,
+    FriendshipType,
+    PayloadType
+)
 from chatie_grpc.wechaty import MessageFileResponse     # type: ignore
 
 from wechaty_puppet_mock.config import get_image_base64_data
 from wechaty_puppet_mock.exceptions import MockEnvironmentError
+from wechaty_puppet_mock.memory import PoolUsage, estimate_pool_bytes
+from wechaty_puppet_mock.metrics import METRICS, MockMetrics
+from wechaty_puppet_mock.mock.change_feed import (
+    CHANGE_DELETE,
+    CHANGE_INSERT,
+    CHANGE_UPDATE,
+    ChangeFeed
+)
+from wechaty_puppet_mock.mock.population import (
+    ParetoRoomSize,
+    RoomSize,
+    sample_ids
+)
+from wechaty_puppet_mock.mock.social_graph import (
+    SocialGraph,
+    generate_social_graph
+)
+from wechaty_puppet_mock.mock.room_member import (
+    RoomMemberRecord,
+    RoomMemberStore
+)
+from wechaty_puppet_mock.mock.storage import MemoryStorage, StorageBackend
+from wechaty_puppet_mock.mock.tag import TagStore
 from faker import Faker     # type: ignore
 
 faker = Faker('zh_CN')
 
 BASE_URL = os.path.abspath(os.path.basename(__file__))
 
+DirtyListener = Callable[[PayloadType, str, int], None]
+
+# the payload id of the bulk dirty notification, all of the payloads of the
+# type should be reloaded
+ALL_PAYLOADS = ''
+
+
+@dataclass
+class IdPage:
+    """one page of ids, next_cursor is None at the end of pool"""
+    ids: List[str]
+    next_cursor: Optional[int]
+
+
+@dataclass
+class VersionedPayload:
+    """the payload together with the version it was fetched at"""
+    version: int
+    payload: Any
+
+
+# the attributes which are saved as the state of storage besides the
+# payloads, the change feed and the dirty listeners are not saved
+STATE_ATTRIBUTES = (
+    '_login_user_payload',
+    '_room_member_store',
+    '_contact_tag_store',
+    '_favorite_tag_store',
+    '_friendship_payload_pool',
+    '_recalled_message_ids',
+    '_message_origin_ids',
+    '_social_graph',
+)
+
 
 class EnvironmentMock:
     """get the simple mock environment"""
 
+    # pylint: disable=too-many-arguments
     def __init__(self,
                  room_num: int = 3,
                  contact_num: int = 30,
-                 message_num: int = 10):
-        """init the environment for mocker"""
-        self._contact_payload_pool: Dict[str, ContactPayload] = \
-            defaultdict(ContactPayload)
-        self._room_payload_pool: Dict[str, RoomPayload] = \
-            defaultdict(RoomPayload)
-        self._message_payload_pool: Dict[str, MessagePayload] = \
-            defaultdict(MessagePayload)
+                 message_num: int = 10,
+                 room_size: Optional[RoomSize] = None,
+                 seed: Optional[int] = None,
+                 storage: Optional[StorageBackend] = None):
+        """init the environment for mocker
+
+        the random contacts and rooms are only created if the storage is
+        empty, otherwise the world in the storage is reused.
+
+        Args:
+            room_num (int): the count of random rooms
+            contact_num (int): the count of random contacts
+            message_num (int): the count of random messages
+            room_size (Optional[RoomSize]): the distribution of the random
+                room sizes, heavy-tailed by default
+            seed (Optional[int]): the seed of the random rooms
+            storage (Optional[StorageBackend]): where the contact, room and
+                message payloads are kept, in memory by default
+        """
+        self._random = random.Random(seed)
+        self._room_size: RoomSize = room_size or ParetoRoomSize()
+        self._topics: List[str] = []
+        self._storage: StorageBackend = storage or MemoryStorage()
+        # the mocker replaces it with the metrics of its puppet
+        self.metrics: MockMetrics = METRICS
 
         self._message_file_payload_ppol: Dict[str, MessageFileResponse] = \
             defaultdict(MessageFileResponse)
 
+        # every mutation takes the next value of one shared clock, so the
+        # versions are monotonic across all of the payload types
+        self._version_clock = count(1)
+        self._payload_versions: Dict[PayloadType, Dict[str, int]] = {
+            PayloadType.PAYLOAD_TYPE_CONTACT: {},
+            PayloadType.PAYLOAD_TYPE_ROOM: {},
+            PayloadType.PAYLOAD_TYPE_MESSAGE: {},
+        }
+        self._dirty_listeners: List[DirtyListener] = []
+        # the changes are only recorded after the feed is enabled
+        self._change_feed: Optional[ChangeFeed] = None
+
+        self._friendship_payload_pool: Dict[str, FriendshipPayload] = {}
+        # search indexes for friendship_search, contact_id is the value
+        self._weixin_index: Dict[str, str] = {}
+        self._phone_index: Dict[str, str] = {}
+        self._indexed_search_keys: Dict[str, Tuple[str, List[str]]] = {}
+
+        # every contact gets an integer index for the tag bitmaps
+        self._contact_ids: List[str] = []
+        self._contact_indexes: Dict[str, int] = {}
+        self._contact_tag_store = TagStore()
+        self._favorite_tag_store = TagStore()
+
+        self._room_member_store = RoomMemberStore()
+        # the ids are only appended, so the integer cursors over them stay
+        # valid while the pools grow during the iteration
+        self._room_ids: List[str] = []
+        self._room_indexes: Dict[str, int] = {}
+        # the relationships over the contact indexes, which drive the
+        # members of the random rooms once it's built
+        self._social_graph: Optional[SocialGraph] = None
+
+        # recalled messages are tombstoned, forwarded messages point to the
+        # original message
+        self._recalled_message_ids: Set[str] = set()
+        self._message_origin_ids: Dict[str, str] = {}
+
         self._login_user_payload = self._get_random_contact_payload()
 
-        self._init_contacts(contact_num)
+        if self._storage.count(PayloadType.PAYLOAD_TYPE_CONTACT):
+            self._load_storage()
+        else:
+            self._init_contacts(contact_num)
+            self._init_rooms(room_num)
 
     @staticmethod
     def _get_random_contact_payload() -> ContactPayload:
@@ -83,43 +216,153 @@ class EnvironmentMock:
             province=faker.province(),
             signature=faker.sentence(),
             star=(faker.random.randint(0, 1) % 2 == 0),
-            weixin=f'weixin-{temp_id}'
+            weixin=f'weixin-{temp_id}',
+            phone=[faker.phone_number()]
         )
         return payload
 
-    def _get_random_room_payload(self) -> RoomPayload:
-        """get random room payload"""
-        temp_id = faker.uuid4()
-        contact_ids = list(self._contact_payload_pool.keys())
-        if not contact_ids:
+    def _get_random_topic(self) -> str:
+        """pick the topic from the pool, faker is too slow for the
+        millions of rooms"""
+        if not self._topics:
+            self._topics = [faker.sentence() for _ in range(256)]
+        return self._random.choice(self._topics)
+
+    def _get_random_room_payload(self, room_size: Optional[RoomSize] = None
+                                 ) -> RoomPayload:
+        """get random room payload, the members are sampled from the
+        contact id array in O(room size)"""
+        if not self._contact_ids:
             raise MockEnvironmentError('there are no contacts in the '
                                        'environment, so, you can not '
                                        'create room')
+        size = (room_size or self._room_size).sample(
+            self._random, len(self._contact_ids))
         random_payload = RoomPayload(
-            id=f'room-{temp_id}',
-            topic=faker.sentence(),
+            id=f'room-{UUID(int=self._random.getrandbits(128), version=4)}',
+            topic=self._get_random_topic(),
             avatar=get_image_base64_data(),
             owner_id=self._login_user_payload.id,
             admin_ids=[],
-            member_ids=random.sample(
-                contact_ids,
-                random.randint(0, len(contact_ids))
-            )
+            member_ids=self._sample_room_member_ids(size)
         )
         return random_payload
 
+    def _sample_room_member_ids(self, size: int) -> List[str]:
+        """sample the members uniformly, or from the neighborhood of a
+        random contact in the social graph"""
+        if size <= 0:
+            return []
+        graph = self._social_graph
+        if graph is None or not graph.node_count:
+            return sample_ids(self._contact_ids, size, self._random)
+
+        seed = self._random.randrange(graph.node_count)
+        members = {seed}
+        frontier = [seed]
+        while frontier and len(members) < size:
+            node = frontier.pop(self._random.randrange(len(frontier)))
+            for neighbor in sample_ids(graph.neighbors_of(node),
+                                       size - len(members), self._random):
+                if neighbor not in members:
+                    members.add(neighbor)
+                    frontier.append(neighbor)
+        member_ids = [self._contact_ids[index] for index in members]
+        # the component is too small, fill the room with strangers until
+        # it's full, the sampled strangers may be the members already
+        size = min(size, len(self._contact_ids))
+        member_set = set(member_ids)
+        while len(member_ids) < size:
+            for contact_id in sample_ids(self._contact_ids,
+                                         size - len(member_ids), self._random):
+                if contact_id not in member_set:
+                    member_set.add(contact_id)
+                    member_ids.append(contact_id)
+        return member_ids
+
     def _init_contacts(self, contact_num: int):
         """init contacts payload"""
         # read sample file content from FileBox
         for i in range(contact_num):
             random_payload = self._get_random_contact_payload()
-            self._contact_payload_pool[random_payload.id] = random_payload
+            self._add_contact_payload(random_payload)
 
     def _init_rooms(self, room_num: int):
         """init rooms payload after contacts created"""
-        for i in range(room_num):
-            room_payload = self._get_random_room_payload()
-            self._room_payload_pool[room_payload.id] = room_payload
+        if not self._contact_ids:
+            return
+        self.populate_rooms(room_num)
+
+    def _load_storage(self):
+        """rebuild the ids and indexes from the payloads, and load the
+        state which is saved by the last flush"""
+        # the stored versions are not reused by the new changes
+        self._version_clock = count(self._storage.max_version() + 1)
+        for attribute in STATE_ATTRIBUTES:
+            state = self._storage.get_state(attribute.lstrip('_'))
+            if state is not None:
+                setattr(self, attribute, state)
+        # the worlds which are saved without the member store only know the
+        # members, the owner is taken as the inviter
+        rebuild_members = self._storage.get_state('room_member_store') is None
+
+        for contact_payload in self._storage.iter_payloads(
+                PayloadType.PAYLOAD_TYPE_CONTACT):
+            self._index_contact(contact_payload)
+            if not self._storage.keeps_versions:
+                self._bump_version(PayloadType.PAYLOAD_TYPE_CONTACT,
+                                   contact_payload.id)
+        for room_payload in self._storage.iter_payloads(
+                PayloadType.PAYLOAD_TYPE_ROOM):
+            self._index_room(room_payload)
+            if not self._storage.keeps_versions:
+                self._bump_version(PayloadType.PAYLOAD_TYPE_ROOM,
+                                   room_payload.id)
+            if rebuild_members:
+                self._room_member_store.add_many(
+                    room_payload.id, room_payload.member_ids,
+                    room_payload.owner_id, time.time())
+
+    def _save_state(self):
+        """save the state besides the payloads to the storage"""
+        for attribute in STATE_ATTRIBUTES:
+            self._storage.put_state(attribute.lstrip('_'),
+                                    getattr(self, attribute))
+
+    @property
+    def storage(self) -> StorageBackend:
+        """get the storage of the payloads"""
+        return self._storage
+
+    def flush(self):
+        """write the pending payloads and the state to the storage, the
+        state is only saved here and by close"""
+        self._save_state()
+        self._storage.flush()
+
+    def close(self):
+        """flush and close the storage"""
+        self._save_state()
+        self._storage.close()
+
+    def populate_rooms(self, room_num: int,
+                       room_size: Optional[RoomSize] = None) -> List[str]:
+        """create the random rooms over the existing contacts
+
+        Args:
+            room_num (int): the count of rooms
+            room_size (Optional[RoomSize]): the distribution of room sizes,
+                the one of environment by default
+
+        Returns:
+            List[str]: the ids of the new rooms
+        """
+        room_ids = []
+        for _ in range(room_num):
+            room_payload = self._get_random_room_payload(room_size)
+            self._add_room_payload(room_payload)
+            room_ids.append(room_payload.id)
+        return room_ids
 
     def new_room_payload(self,
                          member_ids: Optional[List[str]] = None,
@@ -133,19 +376,147 @@ class EnvironmentMock:
         if topic:
             random_room_payload.topic = topic
 
-        self._room_payload_pool[random_room_payload.id] = random_room_payload
+        self._add_room_payload(random_room_payload)
         return random_room_payload
 
-    def new_contact_payload(self) -> ContactPayload:
+    def _add_room_payload(self, room_payload: RoomPayload):
+        """save the new room payload to the pool and member store, the
+        members are invited by the owner of the room"""
+        version = self._bump_version(PayloadType.PAYLOAD_TYPE_ROOM,
+                                     room_payload.id)
+        self._put_payload(PayloadType.PAYLOAD_TYPE_ROOM, room_payload, version)
+        self._index_room(room_payload)
+        self._room_member_store.add_many(room_payload.id,
+                                         room_payload.member_ids,
+                                         room_payload.owner_id, time.time())
+        if self._change_feed is not None:
+            self._change_feed.append(CHANGE_INSERT,
+                                     PayloadType.PAYLOAD_TYPE_ROOM,
+                                     room_payload.id)
+            for contact_id in room_payload.member_ids:
+                self._publish_member(CHANGE_INSERT, room_payload.id,
+                                     contact_id)
+
+    def _index_room(self, room_payload: RoomPayload):
+        if room_payload.id not in self._room_indexes:
+            self._room_indexes[room_payload.id] = len(self._room_ids)
+            self._room_ids.append(room_payload.id)
+
+    def _add_contact_payload(self, contact_payload: ContactPayload):
+        """save the new contact payload to the pool and indexes"""
+        inserted = contact_payload.id not in self._contact_indexes
+        version = self._bump_version(PayloadType.PAYLOAD_TYPE_CONTACT,
+                                     contact_payload.id)
+        self._storage.put(PayloadType.PAYLOAD_TYPE_CONTACT, contact_payload,
+                          version)
+        self._index_contact(contact_payload)
+        if self._change_feed is not None:
+            self._change_feed.append(
+                CHANGE_INSERT if inserted else CHANGE_UPDATE,
+                PayloadType.PAYLOAD_TYPE_CONTACT, contact_payload.id)
+
+    def _index_contact(self, contact_payload: ContactPayload):
+        self._index_contact_payload(contact_payload)
+        if contact_payload.id not in self._contact_indexes:
+            self._contact_indexes[contact_payload.id] = len(self._contact_ids)
+            self._contact_ids.append(contact_payload.id)
+
+    def _index_contact_payload(self, contact_payload: ContactPayload):
+        """keep the weixin/phone search indexes up to date"""
+        old_weixin, old_phones = self._indexed_search_keys.get(
+            contact_payload.id, ('', []))
+        if old_weixin == contact_payload.weixin and \
+                old_phones == contact_payload.phone:
+            return
+
+        if self._weixin_index.get(old_weixin) == contact_payload.id:
+            del self._weixin_index[old_weixin]
+        for phone in old_phones:
+            if self._phone_index.get(phone) == contact_payload.id:
+                del self._phone_index[phone]
+
+        if contact_payload.weixin:
+            self._weixin_index[contact_payload.weixin] = contact_payload.id
+        for phone in contact_payload.phone:
+            self._phone_index[phone] = contact_payload.id
+        self._indexed_search_keys[contact_payload.id] = (
+            contact_payload.weixin, list(contact_payload.phone))
+
+    def new_contact_payload(self, friend: bool = True) -> ContactPayload:
         """create new random contact payload"""
         random_contact_paylaod = self._get_random_contact_payload()
-        self._contact_payload_pool[random_contact_paylaod.id] = \
-            random_contact_paylaod
+        random_contact_paylaod.friend = friend
+        self._add_contact_payload(random_contact_paylaod)
         return random_contact_paylaod
 
+    @staticmethod
+    def _get_id_page(ids: List[str], cursor: int,
+                     limit: Optional[int]) -> IdPage:
+        if cursor < 0 or (limit is not None and limit <= 0):
+            raise MockEnvironmentError(f'invalid page <{cursor}, {limit}>')
+        end = len(ids) if limit is None else cursor + limit
+        page_ids = ids[cursor:end]
+        return IdPage(ids=page_ids,
+                      next_cursor=end if end < len(ids) else None)
+
+    def get_contact_ids(self, cursor: int = 0,
+                        limit: Optional[int] = 1000) -> IdPage:
+        """get one page of contact ids in the order of creation, all of the
+        rest if limit is None
+
+        the contacts created during the paging are in the later pages, and
+        no contact is skipped or repeated.
+        """
+        return self._get_id_page(self._contact_ids, cursor, limit)
+
+    def get_room_ids(self, cursor: int = 0,
+                     limit: Optional[int] = 1000) -> IdPage:
+        """get one page of room ids in the order of creation, all of the
+        rest if limit is None"""
+        return self._get_id_page(self._room_ids, cursor, limit)
+
+    def iter_contact_ids(self, chunk_size: int = 1000
+                         ) -> Iterator[List[str]]:
+        """iterate the contact ids in chunks without copying the pool"""
+        cursor: Optional[int] = 0
+        while cursor is not None:
+            page = self.get_contact_ids(cursor, chunk_size)
+            if page.ids:
+                yield page.ids
+            cursor = page.next_cursor
+
+    def iter_room_ids(self, chunk_size: int = 1000) -> Iterator[List[str]]:
+        """iterate the room ids in chunks without copying the pool"""
+        cursor: Optional[int] = 0
+        while cursor is not None:
+            page = self.get_room_ids(cursor, chunk_size)
+            if page.ids:
+                yield page.ids
+            cursor = page.next_cursor
+
     def get_room_payloads(self) -> List[RoomPayload]:
         """get fake room payloads"""
-        return list(self._room_payload_pool.values())
+        return [self._with_members(room_payload) for room_payload
+                in self._storage.iter_payloads(PayloadType.PAYLOAD_TYPE_ROOM)]
+
+    def _with_members(self, room_payload: RoomPayload) -> RoomPayload:
+        """the copy of stored room payload with the member ids, the members
+        are only kept in the member store"""
+        return replace(room_payload, member_ids=self.get_room_member_ids(
+            room_payload.id))
+
+    def get_room_member_ids(self, room_id: str) -> List[str]:
+        """get the member ids of room from the member store"""
+        self._check_room_id(room_id)
+        return self._room_member_store.member_ids(room_id)
+
+    def get_room_member_view(self, room_id: str,
+                             exclude_id: Optional[str] = None
+                             ) -> Sequence[str]:
+        """get the member ids of room without copying them, the contact of
+        exclude_id is left out, see RoomMemberStore.member_view"""
+        self._check_room_id(room_id)
+        return self._room_member_store.member_view(room_id, exclude_id)
 
     def get_room_payload(self, room_id: str) -> RoomPayload:
         """get room paylaod by room_id
@@ -156,45 +527,559 @@ class EnvironmentMock:
         Returns:
             RoomPayload: the payload data for room
         """
-        if room_id not in self._room_payload_pool:
+        self.metrics.payload_lookups.inc(labels=('room',))
+        room_payload = self._storage.get(PayloadType.PAYLOAD_TYPE_ROOM,
+                                         room_id)
+        if room_payload is None:
+            self.metrics.payload_misses.inc(labels=('room',))
             raise MockEnvironmentError(
                 f'room <{room_id}> not in environment'
             )
-        return self._room_payload_pool[room_id]
+        return self._with_members(room_payload)
 
-    def update_room_payload(self, room_payload: RoomPayload):
-        """update the room payload"""
-        if room_payload.id not in self._room_payload_pool:
+    def _check_room_id(self, room_id: str):
+        if room_id not in self._room_indexes:
             raise MockEnvironmentError(
-                f'room <{room_payload.id}> not in environment'
+                f'room <{room_id}> not in environment'
             )
-        self._room_payload_pool[room_payload.id] = room_payload
+
+    def update_room_payload(self, room_payload: RoomPayload):
+        """update the room payload, the member store follows the member_ids
+        of the payload"""
+        self._check_room_id(room_payload.id)
+        self._sync_room_members(room_payload)
+        self.mark_payload_dirty(PayloadType.PAYLOAD_TYPE_ROOM, room_payload.id,
+                                room_payload)
+
+    def _sync_room_members(self, room_payload: RoomPayload):
+        """keep the member store same as the member_ids of room payload"""
+        member_ids = set(room_payload.member_ids)
+        for contact_id in self._room_member_store.member_ids(room_payload.id):
+            if contact_id not in member_ids:
+                self._room_member_store.remove(room_payload.id, contact_id)
+                self._publish_member(CHANGE_DELETE, room_payload.id,
+                                     contact_id)
+
+        join_time = time.time()
+        for contact_id in room_payload.member_ids:
+            if self._room_member_store.add(room_payload.id, contact_id,
+                                           room_payload.owner_id, join_time):
+                self._publish_member(CHANGE_INSERT, room_payload.id,
+                                     contact_id)
+
+    def add_room_members(self, room_id: str, contact_ids: List[str],
+                         inviter_id: str) -> List[str]:
+        """add the contacts to room which are invited by inviter
+
+        Returns:
+            List[str]: the contact ids which are not in the room before
+        """
+        self._check_room_id(room_id)
+        join_time = time.time()
+        added_ids: List[str] = []
+        for contact_id in contact_ids:
+            if self._room_member_store.add(room_id, contact_id, inviter_id,
+                                           join_time):
+                added_ids.append(contact_id)
+                self._publish_member(CHANGE_INSERT, room_id, contact_id)
+        if added_ids:
+            self.mark_payload_dirty(PayloadType.PAYLOAD_TYPE_ROOM, room_id)
+        return added_ids
+
+    def remove_room_members(self, room_id: str,
+                            contact_ids: List[str]) -> List[str]:
+        """remove the contacts from room
+
+        Returns:
+            List[str]: the contact ids which were in the room
+        """
+        self._check_room_id(room_id)
+        removed_ids = [
+            contact_id for contact_id in contact_ids
+            if self._room_member_store.remove(room_id, contact_id)
+        ]
+        for contact_id in removed_ids:
+            self._publish_member(CHANGE_DELETE, room_id, contact_id)
+        if removed_ids:
+            self.mark_payload_dirty(PayloadType.PAYLOAD_TYPE_ROOM, room_id)
+        return removed_ids
+
+    def get_room_member(self, room_id: str,
+                        contact_id: str) -> RoomMemberRecord:
+        """get the member info with room alias, inviter and join time"""
+        record = self._room_member_store.get(room_id, contact_id)
+        if record is None:
+            raise MockEnvironmentError(f'contact <{contact_id}> is not the '
+                                       f'member of room <{room_id}>')
+        return record
+
+    def set_room_alias(self, room_id: str, contact_id: str, room_alias: str):
+        """set the alias of member in the room"""
+        if not self._room_member_store.set_alias(room_id, contact_id,
+                                                 room_alias):
+            raise MockEnvironmentError(f'contact <{contact_id}> is not the '
+                                       f'member of room <{room_id}>')
+        self._publish_member(CHANGE_UPDATE, room_id, contact_id)
 
     def get_contact_payloads(self) -> List[ContactPayload]:
         """get fake contact payloads"""
-        return list(self._contact_payload_pool.values())
+        return list(self._storage.iter_payloads(
+            PayloadType.PAYLOAD_TYPE_CONTACT))
 
     def get_contact_payload(self, contact_id: str) -> ContactPayload:
         """get contact payload by id"""
-        if contact_id not in self._contact_payload_pool:
+        self.metrics.payload_lookups.inc(labels=('contact',))
+        contact_payload = self._storage.get(PayloadType.PAYLOAD_TYPE_CONTACT,
+                                            contact_id)
+        if contact_payload is None:
+            self.metrics.payload_misses.inc(labels=('contact',))
             raise MockEnvironmentError(f'contact <{contact_id}> '
                                        f'not in environment')
-        return self._contact_payload_pool[contact_id]
+        return contact_payload
 
     def update_contact_payload(self, contact_payload: ContactPayload):
         """update the contact payload"""
-        if contact_payload.id not in self._contact_payload_pool:
+        if contact_payload.id not in self._contact_indexes:
             raise MockEnvironmentError(f'contact <{contact_payload.id}> not '
                                        f'in environment')
-        self._contact_payload_pool[contact_payload.id] = contact_payload
+        self._index_contact_payload(contact_payload)
+        self.mark_payload_dirty(PayloadType.PAYLOAD_TYPE_CONTACT,
+                                contact_payload.id, contact_payload)
+
+    def search_contact_id(self, weixin: Optional[str] = None,
+                          phone: Optional[str] = None) -> Optional[str]:
+        """search the contact by weixin or phone from the indexes"""
+        if weixin and weixin in self._weixin_index:
+            return self._weixin_index[weixin]
+        if phone:
+            return self._phone_index.get(phone, None)
+        return None
+
+    def _get_contact_index(self, contact_id: str) -> int:
+        """get the integer index of contact"""
+        if contact_id not in self._contact_indexes:
+            raise MockEnvironmentError(f'contact <{contact_id}> '
+                                       f'not in environment')
+        return self._contact_indexes[contact_id]
+
+    def _get_tag_store(self, favorite: bool) -> TagStore:
+        if favorite:
+            return self._favorite_tag_store
+        return self._contact_tag_store
+
+    def add_contact_tag(self, tag_id: str, contact_id: str,
+                        favorite: bool = False):
+        """tag the contact, the tag will be created if not exist"""
+        self._get_tag_store(favorite).add(
+            tag_id, self._get_contact_index(contact_id))
+
+    def remove_contact_tag(self, tag_id: str, contact_id: str,
+                           favorite: bool = False):
+        """remove the tag from contact"""
+        self._get_tag_store(favorite).remove(
+            tag_id, self._get_contact_index(contact_id))
+
+    def delete_tag(self, tag_id: str, favorite: bool = False):
+        """delete the tag and all of the membership"""
+        self._get_tag_store(favorite).delete(tag_id)
+
+    def get_tag_ids(self, contact_id: Optional[str] = None,
+                    favorite: bool = False) -> List[str]:
+        """get all of the tag ids, or the tag ids of the contact"""
+        tag_store = self._get_tag_store(favorite)
+        if contact_id is None:
+            return tag_store.tag_ids()
+        return tag_store.tag_ids_of(self._get_contact_index(contact_id))
+
+    def query_tagged_contact_ids(self,
+                                 all_of: Optional[List[str]] = None,
+                                 any_of: Optional[List[str]] = None,
+                                 none_of: Optional[List[str]] = None,
+                                 favorite: bool = False) -> List[str]:
+        """query contacts by tags, eg: tagged A and B but not C"""
+        bitmap = self._get_tag_store(favorite).query(
+            all_of=all_of, any_of=any_of, none_of=none_of)
+        return [self._contact_ids[index] for index in bitmap]
+
+    # pylint: disable=too-many-arguments
+    def build_social_graph(self, mean_degree: float = 20.0,
+                           degree_alpha: float = 2.5,
+                           community_size: int = 200,
+                           mixing: float = 0.1,
+                           self_id: Optional[str] = None,
+                           seed: Optional[int] = None) -> SocialGraph:
+        """generate the social graph over the existing contacts
+
+        the random rooms created later take their members from the
+        neighborhoods in the graph, see `generate_social_graph` for the
+        arguments of the graph.
+
+        Args:
+            self_id (Optional[str]): set the friend flags of the contacts by
+                the neighbors of this contact, eg: the login user
+        """
+        if seed is None:
+            seed = self._random.randrange(2 ** 32)
+        self._social_graph = generate_social_graph(
+            len(self._contact_ids), mean_degree=mean_degree,
+            degree_alpha=degree_alpha, community_size=community_size,
+            mixing=mixing, seed=seed)
+        if self_id:
+            self.apply_friend_flags(self_id)
+        return self._social_graph
+
+    @property
+    def social_graph(self) -> SocialGraph:
+        """get the social graph of the contacts"""
+        if self._social_graph is None:
+            raise MockEnvironmentError('social graph is not built, please '
+                                       'call build_social_graph first')
+        return self._social_graph
+
+    def _get_graph_node(self, contact_id: str) -> Optional[int]:
+        """the node of contact, None if it's created after the graph"""
+        index = self._get_contact_index(contact_id)
+        return index if index < self.social_graph.node_count else None
+
+    def apply_friend_flags(self, self_id: str) -> int:
+        """the contacts are the friends of self_id only if they are the
+        neighbors in the graph
+
+        Returns:
+            int: the count of contacts whose friend flag changed
+        """
+        node = self._get_graph_node(self_id)
+        friend_nodes = set(self.social_graph.neighbors_of(node)) \
+            if node is not None else set()
+        node_count = self.social_graph.node_count
+        changed_payloads: List[ContactPayload] = []
+        # scan the storage once instead of getting the contacts one by one
+        for payload in self._storage.iter_payloads(
+                PayloadType.PAYLOAD_TYPE_CONTACT):
+            index = self._contact_indexes[payload.id]
+            if index >= node_count:
+                continue
+            friend = index in friend_nodes
+            if payload.friend != friend:
+                payload.friend = friend
+                changed_payloads.append(payload)
+        if changed_payloads:
+            self.mark_payloads_dirty(PayloadType.PAYLOAD_TYPE_CONTACT,
+                                     changed_payloads)
+        return len(changed_payloads)
+
+    def get_neighbor_contact_ids(self, contact_id: str) -> List[str]:
+        """get the contacts connected to the contact in the graph"""
+        node = self._get_graph_node(contact_id)
+        if node is None:
+            return []
+        return [self._contact_ids[index]
+                for index in self.social_graph.neighbors_of(node)]
+
+    def get_mutual_contact_ids(self, contact_id: str,
+                               other_id: str) -> List[str]:
+        """get the contacts connected to both of the contacts"""
+        node, other = self._get_graph_node(contact_id), \
+            self._get_graph_node(other_id)
+        if node is None or other is None:
+            return []
+        return [self._contact_ids[index]
+                for index in self.social_graph.mutual_neighbors(node, other)]
+
+    def new_friendship_payload(
+            self, contact_id: str, hello: str = '',
+            friendship_type: FriendshipType =
+            FriendshipType.FRIENDSHIP_TYPE_RECEIVE) -> FriendshipPayload:
+        """create the friendship payload between login user and contact"""
+        contact_payload = self.get_contact_payload(contact_id)
+        friendship_payload = FriendshipPayload(
+            id=f'friendship-{uuid4()}',
+            contact_id=contact_id,
+            hello=hello,
+            type=friendship_type,
+            stranger=contact_payload.weixin,
+            ticket=str(uuid4())
+        )
+        self._friendship_payload_pool[friendship_payload.id] = \
+            friendship_payload
+        return friendship_payload
+
+    def get_friendship_payload(self, friendship_id: str) -> FriendshipPayload:
+        """get friendship payload by id"""
+        if friendship_id not in self._friendship_payload_pool:
+            raise MockEnvironmentError(f'friendship <{friendship_id}> '
+                                       f'not in environment')
+        return self._friendship_payload_pool[friendship_id]
+
+    def update_friendship_payload(self, friendship_payload: FriendshipPayload):
+        """update the friendship payload"""
+        if friendship_payload.id not in self._friendship_payload_pool:
+            raise MockEnvironmentError(f'friendship <{friendship_payload.id}>'
+                                       f' not in environment')
+        self._friendship_payload_pool[friendship_payload.id] = \
+            friendship_payload
+
+    def accept_friendship(self, friendship_id: str) -> FriendshipPayload:
+        """accept the friendship request, then the contact becomes friend"""
+        friendship_payload = self.get_friendship_payload(friendship_id)
+        if friendship_payload.type != FriendshipType.FRIENDSHIP_TYPE_RECEIVE:
+            raise MockEnvironmentError(f'friendship <{friendship_id}> is not '
+                                       f'a received request')
+
+        contact_payload = self.get_contact_payload(
+            friendship_payload.contact_id)
+        contact_payload.friend = True
+        self.update_contact_payload(contact_payload)
+
+        friendship_payload.type = FriendshipType.FRIENDSHIP_TYPE_CONFIRM
+        return friendship_payload
+
+    def is_room_id(self, conversation_id: str) -> bool:
+        """check if the conversation is a room in environment"""
+        return conversation_id in self._room_indexes
+
+    def add_message_payload(self, message_payload: MessagePayload,
+                            origin_id: Optional[str] = None):
+        """add a message payload to the pool
+
+        Args:
+            message_payload (MessagePayload): the payload of message
+            origin_id (Optional[str]): the id of message which is forwarded
+        """
+        version = self._bump_version(PayloadType.PAYLOAD_TYPE_MESSAGE,
+                                     message_payload.id)
+        self._storage.put(PayloadType.PAYLOAD_TYPE_MESSAGE, message_payload,
+                          version)
+        self.metrics.messages_stored.inc()
+        if self._change_feed is not None:
+            self._change_feed.append(CHANGE_INSERT,
+                                     PayloadType.PAYLOAD_TYPE_MESSAGE,
+                                     message_payload.id)
+        if origin_id:
+            # always point to the first message of the forward chain
+            self._message_origin_ids[message_payload.id] = \
+                self._message_origin_ids.get(origin_id, origin_id)
 
-    def add_message_payload(self, message_payload: MessagePayload):
-        """add a message payload to the pool"""
-        self._message_payload_pool[message_payload.id] = message_payload
+    def get_message_origin_id(self, message_id: str) -> Optional[str]:
+        """get the original message id of the forwarded message"""
+        return self._message_origin_ids.get(message_id)
+
+    def recall_message(self, message_id: str) -> bool:
+        """tombstone the message
+
+        Returns:
+            bool: False if the message has been recalled
+        """
+        if not self._storage.contains(PayloadType.PAYLOAD_TYPE_MESSAGE,
+                                      message_id):
+            raise MockEnvironmentError(f'message <{message_id}> '
+                                       f'not in environment')
+        if message_id in self._recalled_message_ids:
+            return False
+        self._recalled_message_ids.add(message_id)
+        self.mark_payload_dirty(PayloadType.PAYLOAD_TYPE_MESSAGE, message_id)
+        return True
+
+    def is_message_recalled(self, message_id: str) -> bool:
+        """check if the message has been recalled"""
+        return message_id in self._recalled_message_ids
 
     def get_message_payload(self, message_id: str) -> MessagePayload:
         """get a message payload by message_id"""
-        if message_id not in self._message_payload_pool:
+        self.metrics.payload_lookups.inc(labels=('message',))
+        message_payload = self._storage.get(PayloadType.PAYLOAD_TYPE_MESSAGE,
+                                            message_id)
+        if message_payload is None:
+            self.metrics.payload_misses.inc(labels=('message',))
             raise KeyError('message payload <%s> not in pool', message_id)
 
-        return self._message_payload_pool[message_id]
+        return message_payload
+
+    def _get_payload(self, payload_type: PayloadType, payload_id: str) -> Any:
+        """get the payload by type, raise error if it's not in the pool"""
+        if payload_type == PayloadType.PAYLOAD_TYPE_CONTACT:
+            return self.get_contact_payload(payload_id)
+        if payload_type == PayloadType.PAYLOAD_TYPE_ROOM:
+            return self.get_room_payload(payload_id)
+        if payload_type == PayloadType.PAYLOAD_TYPE_MESSAGE:
+            message_payload = self._storage.get(
+                PayloadType.PAYLOAD_TYPE_MESSAGE, payload_id)
+            if message_payload is None:
+                raise MockEnvironmentError(f'message <{payload_id}> '
+                                           f'not in environment')
+            return message_payload
+        raise MockEnvironmentError(f'payload type <{payload_type}> is not '
+                                   f'versioned')
+
+    def _stores_version(self, payload_type: PayloadType) -> bool:
+        """the versions are kept in the storage if it can, the millions of
+        messages don't fit in memory, and they survive the reuse"""
+        return payload_type in self._payload_versions and \
+            self._storage.keeps_versions
+
+    def _bump_version(self, payload_type: PayloadType, payload_id: str) -> int:
+        """give the payload the next version of the clock, the caller puts
+        the payload with the version if it's kept in the storage"""
+        version = next(self._version_clock)
+        if not self._stores_version(payload_type):
+            self._payload_versions[payload_type][payload_id] = version
+        return version
+
+    def _get_version(self, payload_type: PayloadType, payload_id: str) -> int:
+        """the version of the payload from the storage or the memory"""
+        if self._stores_version(payload_type):
+            return self._storage.get_version(payload_type, payload_id)
+        return self._payload_versions[payload_type].get(payload_id, 0)
+
+    def add_dirty_listener(self, listener: DirtyListener):
+        """listen to the payload dirty notification
+
+        the listener will be called with (payload_type, payload_id, version)
+        """
+        self._dirty_listeners.append(listener)
+
+    def remove_dirty_listener(self, listener: DirtyListener):
+        """stop listening to the payload dirty notification"""
+        if listener in self._dirty_listeners:
+            self._dirty_listeners.remove(listener)
+
+    def mark_payload_dirty(self, payload_type: PayloadType,
+                           payload_id: str, payload: Any = None) -> int:
+        """bump the version of the payload and notify the dirty listeners
+
+        pass the payload if it's changed in place, so it's written to the
+        storage again, the storage may not hold the same object any more.
+
+        Returns:
+            int: the new version of the payload
+        """
+        if payload_type not in self._payload_versions:
+            raise MockEnvironmentError(f'payload type <{payload_type}> is '
+                                       f'not versioned')
+        version = self._bump_version(payload_type, payload_id)
+        if payload is None and self._stores_version(payload_type):
+            payload = self._get_payload(payload_type, payload_id)
+        if payload is not None:
+            self._put_payload(payload_type, payload, version)
+        if self._change_feed is not None:
+            self._change_feed.append(CHANGE_UPDATE, payload_type, payload_id)
+        for listener in list(self._dirty_listeners):
+            listener(payload_type, payload_id, version)
+        return version
+
+    def mark_payloads_dirty(self, payload_type: PayloadType,
+                            payloads: List[Any]) -> int:
+        """bump the versions of the changed payloads, write them to the
+        storage, and notify the dirty listeners once with ALL_PAYLOADS
+
+        Returns:
+            int: the version of the last payload
+        """
+        if payload_type not in self._payload_versions:
+            raise MockEnvironmentError(f'payload type <{payload_type}> is '
+                                       f'not versioned')
+        version = 0
+        for payload in payloads:
+            version = self._bump_version(payload_type, payload.id)
+            self._put_payload(payload_type, payload, version)
+            if self._change_feed is not None:
+                self._change_feed.append(CHANGE_UPDATE, payload_type,
+                                         payload.id)
+        for listener in list(self._dirty_listeners):
+            listener(payload_type, ALL_PAYLOADS, version)
+        return version
+
+    def _put_payload(self, payload_type: PayloadType, payload: Any,
+                     version: int):
+        """write the payload to the storage, the members of room are left
+        out, they are kept in the member store only"""
+        if payload_type == PayloadType.PAYLOAD_TYPE_ROOM:
+            payload = replace(payload, member_ids=[])
+        self._storage.put(payload_type, payload, version)
+
+    def enable_change_feed(self, capacity: int = 100000) -> ChangeFeed:
+        """record the changes of contacts, rooms, members and messages from
+        now on, the feed which is enabled is returned again"""
+        if self._change_feed is None:
+            self._change_feed = ChangeFeed(capacity)
+        return self._change_feed
+
+    @property
+    def change_feed(self) -> ChangeFeed:
+        """get the change feed of the environment"""
+        if self._change_feed is None:
+            raise MockEnvironmentError('change feed is not enabled, please '
+                                       'call enable_change_feed first')
+        return self._change_feed
+
+    def _publish_member(self, op: str, room_id: str, contact_id: str):
+        if self._change_feed is not None:
+            self._change_feed.append(op, PayloadType.PAYLOAD_TYPE_ROOM_MEMBER,
+                                     contact_id, room_id)
+
+    def get_payload_version(self, payload_type: PayloadType,
+                            payload_id: str) -> int:
+        """get the current version of the payload"""
+        self._get_payload(payload_type, payload_id)
+        return self._get_version(payload_type, payload_id)
+
+    def get_payload_if_newer(self, payload_type: PayloadType,
+                             payload_id: str,
+                             version: int) -> Optional[VersionedPayload]:
+        """conditional fetch of the payload
+
+        Args:
+            payload_type (PayloadType): contact, room or message
+            payload_id (str): the union identification for payload
+            version (int): the version which the caller has cached
+
+        Returns:
+            Optional[VersionedPayload]: None if the cached version is still
+                the latest one, else the payload with its current version
+        """
+        payload = self._get_payload(payload_type, payload_id)
+        current_version = self._get_version(payload_type, payload_id)
+        if current_version <= version:
+            return None
+        return VersionedPayload(version=current_version, payload=payload)
+
+    def _storage_usage(self, payload_type: PayloadType) -> PoolUsage:
+        """the count of stored payloads and the bytes of the ones which are
+        held in memory"""
+        return PoolUsage(
+            count=self._storage.count(payload_type),
+            bytes=estimate_pool_bytes(self._storage.resident(payload_type)))
+
+    def memory_usage(self) -> Dict[str, PoolUsage]:
+        """live object counts and estimated bytes of every pool"""
+        tag_stores = (self._contact_tag_store, self._favorite_tag_store)
+        indexes = (self._weixin_index, self._phone_index,
+                   self._indexed_search_keys, self._contact_ids,
+                   self._contact_indexes, self._room_ids, self._room_indexes)
+        versions = self._payload_versions.values()
+        return {
+            'contacts': self._storage_usage(PayloadType.PAYLOAD_TYPE_CONTACT),
+            'rooms': self._storage_usage(PayloadType.PAYLOAD_TYPE_ROOM),
+            'messages': self._storage_usage(PayloadType.PAYLOAD_TYPE_MESSAGE),
+            'friendships': PoolUsage(
+                count=len(self._friendship_payload_pool),
+                bytes=estimate_pool_bytes(self._friendship_payload_pool)),
+            'room_members': PoolUsage(
+                count=self._room_member_store.member_count(),
+                bytes=self._room_member_store.nbytes()),
+            'tags': PoolUsage(
+                count=sum(len(tag_store) for tag_store in tag_stores),
+                bytes=sum(tag_store.nbytes() for tag_store in tag_stores)),
+            # the index containers only, the ids are shared with payloads
+            'indexes': PoolUsage(
+                count=sum(len(index) for index in indexes),
+                bytes=sum(sys.getsizeof(index) for index in indexes)),
+            'social_graph': PoolUsage(
+                count=self._social_graph.edge_count
+                if self._social_graph else 0,
+                bytes=self._social_graph.nbytes()
+                if self._social_graph else 0),
+            'versions': PoolUsage(
+                count=sum(len(version) for version in versions),
+                bytes=sum(sys.getsizeof(version) for version in versions)),
+        }
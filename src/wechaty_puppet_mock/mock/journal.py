@@ -0,0 +1,240 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import os
+import struct
+import time
+import zlib
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import (
+    BinaryIO,
+    Iterator,
+    List,
+    Optional,
+    Tuple
+)
+
+from wechaty_puppet import get_logger     # type: ignore
+
+from wechaty_puppet_mock.exceptions import WechatyPuppetMockError
+
+log = get_logger('EventJournal')
+
+# seq, timestamp, event type, payload length
+_HEADER = struct.Struct('<QdII')
+_CRC = struct.Struct('<I')
+# remember the offset of every N-th record, so the reader seeks near the
+# cursor instead of scanning the whole file
+_INDEX_INTERVAL = 1024
+
+
+@dataclass
+class JournalEntry:
+    """one event in the journal"""
+    seq: int
+    timestamp: float
+    type: int
+    payload: str
+
+
+@dataclass
+class ReplayStats:
+    """the catch-up of the restarted puppet from the journal"""
+    from_seq: int
+    replayed: int = 0
+    # the live events which arrived during the replay
+    buffered: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """the replayed events per second"""
+        return self.replayed / self.seconds if self.seconds else 0.0
+
+
+class EventJournal:
+    """the append-only file of the events emitted by mocker
+
+    every record is framed with its sequence and a crc32, a torn record at
+    the tail, eg: the process is killed in the middle of a write, is
+    truncated when the journal is opened again. The records are fsynced in
+    batches: after `fsync_batch` records, or `fsync_interval` seconds after
+    the first record which is not synced.
+
+    Args:
+        path (str): the journal file, it's appended if exists
+        fsync_batch (int): the count of records which triggers a fsync
+        fsync_interval (float): the max seconds before the record is synced
+    """
+
+    def __init__(self, path: str, fsync_batch: int = 1000,
+                 fsync_interval: float = 0.05):
+        if fsync_batch <= 0 or fsync_interval < 0:
+            raise WechatyPuppetMockError('fsync_batch must be positive and '
+                                         'fsync_interval must not be '
+                                         'negative')
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+
+        self.last_seq = 0
+        self.durable_seq = 0
+        self.fsyncs = 0
+        self._index: List[Tuple[int, int]] = []
+        self._unsynced = 0
+        self._first_unsynced_time = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._recover()
+        self._file: Optional[BinaryIO] = open(path, 'ab')
+
+    def _recover(self):
+        """scan the records to rebuild the index, and cut the torn tail"""
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, 'rb') as file:
+            for entry, end in self._scan(file, 0):
+                if entry.seq % _INDEX_INTERVAL == 1:
+                    self._index.append((entry.seq, offset))
+                self.last_seq = entry.seq
+                offset = end
+            size = file.seek(0, os.SEEK_END)
+        if offset < size:
+            log.warning('truncate the torn tail of journal <%s> at <%s>',
+                        self.path, offset)
+            os.truncate(self.path, offset)
+        self.durable_seq = self.last_seq
+
+    @staticmethod
+    def _scan(file: BinaryIO, offset: int
+              ) -> Iterator[Tuple[JournalEntry, int]]:
+        """read the valid records from offset, with the end offset of them"""
+        file.seek(offset)
+        while True:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            seq, timestamp, event_type, length = _HEADER.unpack(header)
+            body = file.read(length + _CRC.size)
+            if len(body) < length + _CRC.size:
+                return
+            data = body[:length]
+            if _CRC.unpack(body[length:])[0] != zlib.crc32(header + data):
+                return
+            offset += _HEADER.size + len(body)
+            yield JournalEntry(seq, timestamp, event_type,
+                               data.decode('utf-8')), offset
+
+    @property
+    def file(self) -> BinaryIO:
+        """the file which is appended"""
+        if self._file is None:
+            raise WechatyPuppetMockError(f'journal <{self.path}> is closed')
+        return self._file
+
+    def append(self, event_type: int, payload: str) -> int:
+        """append the event
+
+        Returns:
+            int: the sequence of the event
+        """
+        file = self.file
+        seq = self.last_seq + 1
+        if seq % _INDEX_INTERVAL == 1:
+            self._index.append((seq, file.tell()))
+        data = payload.encode('utf-8')
+        header = _HEADER.pack(seq, time.time(), event_type, len(data))
+        file.write(header)
+        file.write(data)
+        file.write(_CRC.pack(zlib.crc32(header + data)))
+        self.last_seq = seq
+
+        self._unsynced += 1
+        now = time.monotonic()
+        if self._unsynced == 1:
+            self._first_unsynced_time = now
+            self._schedule_sync()
+        if self._unsynced >= self.fsync_batch or \
+                now - self._first_unsynced_time >= self.fsync_interval:
+            self.sync()
+        return seq
+
+    def _schedule_sync(self):
+        """sync the quiet tail of the records in the loop, if there is one"""
+        if self._timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._timer = loop.call_later(self.fsync_interval, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        if self._file is not None:
+            self.sync()
+
+    def sync(self):
+        """flush and fsync the appended records"""
+        if not self._unsynced:
+            return
+        file = self.file
+        file.flush()
+        os.fsync(file.fileno())
+        self.fsyncs += 1
+        self._unsynced = 0
+        self.durable_seq = self.last_seq
+
+    def read(self, after_seq: int = 0) -> Iterator[JournalEntry]:
+        """iterate the events whose sequence is bigger than after_seq, the
+        events appended during the iteration are included"""
+        if self._file is not None:
+            self._file.flush()
+        # the last indexed record which is not after the wanted one
+        position = bisect_right(self._index, (after_seq + 1, sys.maxsize))
+        offset = self._index[position - 1][1] if position else 0
+        with open(self.path, 'rb') as file:
+            while True:
+                entries = 0
+                for entry, offset in self._scan(file, offset):
+                    entries += 1
+                    if entry.seq > after_seq:
+                        after_seq = entry.seq
+                        yield entry
+                if not entries or self._file is None:
+                    return
+                # the records are appended while the events are yielded
+                self._file.flush()
+
+    def close(self):
+        """sync and close the journal"""
+        if self._file is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.sync()
+        self._file.close()
+        self._file = None
@@ -22,9 +22,13 @@ from typing import (
     Dict,
     Type,
     List,
+    Sequence,
+    Tuple,
     Union,
     TYPE_CHECKING
 )
+import asyncio
+import time
 from uuid import uuid4
 from collections import defaultdict
 from pyee import AsyncIOEventEmitter    # type: ignore
@@ -41,6 +45,10 @@ from wechaty_puppet import (    # type: ignore
     FileBox,
     MessageType
 )
+from wechaty_puppet.schemas.types import (     # type: ignore
+    FriendshipType,
+    PayloadType
+)
 from wechaty import (   # type: ignore
     Contact,
     Room,
@@ -50,17 +58,44 @@ from wechaty import (   # type: ignore
 if TYPE_CHECKING:
     from wechaty import Contact, Wechaty
 
-from wechaty_puppet_mock.mock.environment import EnvironmentMock
+from wechaty_puppet_mock.mock.accessory_cache import (
+    AccessoryCache,
+    AccessoryCacheStats
+)
+from wechaty_puppet_mock.mock.content import ContentGenerator
+from wechaty_puppet_mock.mock.environment import (
+    ALL_PAYLOADS,
+    EnvironmentMock
+)
+from wechaty_puppet_mock.mock.journal import EventJournal
+from wechaty_puppet_mock.mock.threadsafe import ThreadSafeMocker
 from wechaty_puppet_mock.exceptions import WechatyPuppetMockError
+from wechaty_puppet_mock.metrics import METRICS, MockMetrics
 
 log = get_logger('Mocker')
 
+# event type -> metric labels, so the names are not looked up on every emit
+_EVENT_LABELS: Dict[int, Tuple[str]] = {}
+
+
+def _event_labels(event_type: int) -> Tuple[str]:
+    labels = _EVENT_LABELS.get(event_type)
+    if labels is None:
+        try:
+            name = EventType(event_type).name
+        except ValueError:
+            name = str(event_type)
+        labels = _EVENT_LABELS[event_type] = (name,)
+    return labels
+
 
 @dataclass
 class MockerResponse:
     """this is the common data-structure for mocker"""
     type: int
     payload: str
+    # the sequence in the journal, 0 if it's not journaled
+    seq: int = 0
 
 
 class Mocker(AsyncIOEventEmitter):
@@ -70,7 +105,7 @@ class Mocker(AsyncIOEventEmitter):
         self.id: str = str(uuid4())
 
         # login user is set when the method login
-        self._login_user: Optional[Contact] = None
+        self._login_user_id: Optional[str] = None
         self.has_login: bool = False
 
         self._contact_payload_pool: Dict[str, ContactPayload] = \
@@ -81,16 +116,43 @@ class Mocker(AsyncIOEventEmitter):
             defaultdict(MessagePayload)
 
         self._environment: Optional[EnvironmentMock] = None
+        self._threadsafe: Optional[ThreadSafeMocker] = None
+        self.metrics: MockMetrics = METRICS
+        self._accessories = AccessoryCache(self.metrics)
+        self.journal: Optional[EventJournal] = None
+        # the default generator of send_random_message, created on demand
+        self.content_generator: Optional[ContentGenerator] = None
         self.Contact: Type[Contact] = Contact
         self.Room: Type[Room] = Room
         self.Message: Type[Message] = Message
 
+    def emit(self, event, *args, **kwargs) -> bool:
+        """emit the event, the stream responses are counted by event type"""
+        if event != 'stream' or not args:
+            return super().emit(event, *args, **kwargs)
+        response = args[0]
+        if self.journal is not None:
+            response.seq = self.journal.append(response.type,
+                                               response.payload)
+        labels = _event_labels(response.type)
+        start_time = time.perf_counter()
+        handled = super().emit(event, *args, **kwargs)
+        self.metrics.events_emitted.inc(labels=labels)
+        self.metrics.event_dispatch_seconds.observe(
+            time.perf_counter() - start_time, labels)
+        return handled
+
     @property
     def login_user(self) -> Contact:
         """get the login user contact"""
-        if not self._login_user:
+        return self.load_contact(self.login_user_id)
+
+    @property
+    def login_user_id(self) -> str:
+        """get the login user contact id"""
+        if not self._login_user_id:
             raise WechatyPuppetMockError('please login before get login user')
-        return self._login_user
+        return self._login_user_id
 
     def init(self, puppet: Puppet, wechaty):
         """init the puppet """
@@ -121,24 +183,91 @@ class Mocker(AsyncIOEventEmitter):
     def use(self, environment: EnvironmentMock):
         """use the environment to support rooms contacts"""
         log.info('use the environment <{%s}>', environment)
+        if self._environment:
+            self._environment.remove_dirty_listener(self._emit_dirty)
         self._environment = environment
+        environment.metrics = self.metrics
+        self._accessories.clear()
+        environment.add_dirty_listener(self._emit_dirty)
+
+    def use_metrics(self, metrics: MockMetrics):
+        """report the events, lookups and cache of the mocker and its
+        environment to the metrics"""
+        self.metrics = metrics
+        self._accessories.metrics = metrics
+        if self._environment:
+            self._environment.metrics = metrics
+
+    def use_journal(self, journal: Optional[EventJournal]):
+        """append every stream event to the journal before it's emitted, so
+        a restarted puppet can replay the events after its cursor"""
+        self.journal = journal
+
+    def _emit_dirty(self, payload_type: PayloadType, payload_id: str,
+                    version: int):
+        """emit the dirty event when payload in environment changed"""
+        log.debug('payload <%s> dirty with version <%s>', payload_id, version)
+        if payload_id == ALL_PAYLOADS:
+            self._accessories.clear(payload_type)
+        else:
+            self._accessories.invalidate(payload_type, payload_id)
+        response = MockerResponse(
+            type=int(EventType.EVENT_TYPE_DIRTY),
+            payload=json.dumps({
+                'payloadType': int(payload_type),
+                'payloadId': payload_id,
+                'version': version
+            })
+        )
+        self.emit('stream', response)
+
+    def threadsafe(self, loop: Optional[asyncio.AbstractEventLoop] = None,
+                   batch_size: int = 256) -> ThreadSafeMocker:
+        """get the facade which injects the events from any thread, call it
+        in the loop thread, or pass the loop which the mocker runs in"""
+        if self._threadsafe is None or self._threadsafe.loop.is_closed():
+            self._threadsafe = ThreadSafeMocker(
+                self, loop or asyncio.get_event_loop(), batch_size)
+        return self._threadsafe
+
+    @property
+    def accessory_cache_stats(self) -> AccessoryCacheStats:
+        """the hits and misses of the accessory cache"""
+        return self._accessories.stats
+
+    def load_contact(self, contact_id: str) -> Contact:
+        """get the contact with payload attached, the instance is reused
+        while it is referenced and the payload is not changed"""
+        return self._accessories.get(
+            PayloadType.PAYLOAD_TYPE_CONTACT, self.Contact, contact_id,
+            self.environment.get_contact_payload)
+
+    def load_room(self, room_id: str) -> Room:
+        """get the room with payload attached"""
+        return self._accessories.get(
+            PayloadType.PAYLOAD_TYPE_ROOM, self.Room, room_id,
+            self.environment.get_room_payload)
+
+    def load_message(self, message_id: str) -> Message:
+        """get the message with payload attached"""
+        return self._accessories.get(
+            PayloadType.PAYLOAD_TYPE_MESSAGE, self.Message, message_id,
+            self.environment.get_message_payload)
 
     def new_room(self) -> Room:
         """create random room"""
         payload = self.environment.new_room_payload()
-        room = self.Room.load(payload.id)
-        room.payload = payload
+        room = self.load_room(payload.id)
 
-        log.info('create random room <%s>', room)
+        log.info('create random room <%s>', payload.id)
         return room
 
     def new_contact(self) -> Contact:
         """create random contact"""
         payload = self.environment.new_contact_payload()
-        contact = self.Contact.load(payload.id)
-        contact.payload = contact
+        contact = self.load_contact(payload.id)
 
-        log.info('create random contact <%s>')
+        log.info('create random contact <%s>', payload.id)
         return contact
 
     def scan(self, scan_code: str):
@@ -164,18 +293,21 @@ class Mocker(AsyncIOEventEmitter):
             type=int(EventType.EVENT_TYPE_LOGIN),
             payload=json.dumps(login_event_payload)
         )
+        self._login_user_id = user_id
+        self.has_login = True
         self.emit('stream', response)
 
     def logout(self):
         """emit the logout user event"""
-        log.info(f'mock the user <{self.login_user}> logout event')
+        log.info(f'mock the user <{self.login_user_id}> logout event')
         response = MockerResponse(
             type=int(EventType.EVENT_TYPE_LOGOUT),
             payload=json.dumps({
-                'contactId': self.login_user.contact_id
+                'contactId': self.login_user_id
             })
         )
-        self._login_user = None
+        self._login_user_id = None
+        self.has_login = False
         self.emit('stream', response)
 
     def send_message(self,
@@ -188,25 +320,71 @@ class Mocker(AsyncIOEventEmitter):
 
         In this version, we will only support str and FileBox message type
         """
+        if isinstance(conversation, Contact):
+            conversation_id = conversation.contact_id
+        else:
+            conversation_id = conversation.room_id
+
+        if isinstance(msg, str):
+            return self.send_message_payload(
+                talker_id=talker.contact_id,
+                conversation_id=conversation_id,
+                msg_type=msg_type,
+                text=msg
+            )
+
+        if msg_type == MessageType.MESSAGE_TYPE_TEXT:
+            msg_type = MessageType.MESSAGE_TYPE_ATTACHMENT
+        # message_file read the file-box from the text field
+        return self.send_message_payload(
+            talker_id=talker.contact_id,
+            conversation_id=conversation_id,
+            msg_type=msg_type,
+            text=msg.to_json_str(),
+            filename=msg.name
+        )
+
+    def send_message_payload(self,
+                             talker_id: str,
+                             conversation_id: str,
+                             msg_type: MessageType,
+                             text: str = '',
+                             filename: str = '',
+                             mention_ids: Optional[List[str]] = None,
+                             origin_id: Optional[str] = None) -> str:
+        """the typed send pipeline which all of the message kinds go through
+
+        Args:
+            talker_id (str): the contact who send the message
+            conversation_id (str): room_id or contact_id
+            msg_type (MessageType): the type of message
+            text (str): the content of the message, the file-box json, the
+                contact_id, the url or the mini-program json by msg_type
+            filename (str): the name of the file
+            mention_ids (Optional[List[str]]): the contact ids mentioned
+            origin_id (Optional[str]): the forwarded message id
+
+        Returns:
+            str: the message id
+        """
         log.info('mock send message event')
         message_payload = MessagePayload(
             id=str(uuid4()),
-            from_id=talker.contact_id,
+            from_id=talker_id,
             timestamp=int(datetime.now().timestamp() * 1000),
-            type=msg_type
+            type=msg_type,
+            text=text,
+            filename=filename,
+            mention_ids=mention_ids or []
         )
-        if isinstance(conversation, Contact):
-            message_payload.to_id = conversation.contact_id
-        else:
-            message_payload.room_id = conversation.room_id
-
-        if isinstance(msg, str):
-            message_payload.text = msg
+        if self.environment.is_room_id(conversation_id):
+            message_payload.room_id = conversation_id
         else:
-            message_payload.filename = msg.name
+            message_payload.to_id = conversation_id
 
         # save the message payload to environment
-        self.environment.add_message_payload(message_payload)
+        self.environment.add_message_payload(message_payload,
+                                             origin_id=origin_id)
 
         response = MockerResponse(
             type=int(EventType.EVENT_TYPE_MESSAGE),
@@ -217,33 +395,198 @@ class Mocker(AsyncIOEventEmitter):
         self.emit('stream', response)
         return message_payload.id
 
+    def send_random_message(self, talker_id: str, conversation_id: str,
+                            generator: Optional[ContentGenerator] = None
+                            ) -> str:
+        """send the text generated from the corpus, the room messages may
+        mention the members of the room
+
+        Returns:
+            str: the message id
+        """
+        if generator is None:
+            if self.content_generator is None:
+                self.content_generator = ContentGenerator()
+            generator = self.content_generator
+
+        member_ids: Sequence[str] = []
+        if self.environment.is_room_id(conversation_id):
+            # sample the mentions from the store instead of copying all of
+            # the members, the talker doesn't mention itself
+            member_ids = self.environment.get_room_member_view(
+                conversation_id, exclude_id=talker_id)
+        content = generator.generate(
+            member_ids,
+            lambda contact_id: self.environment.get_contact_payload(
+                contact_id).name)
+        return self.send_message_payload(
+            talker_id=talker_id,
+            conversation_id=conversation_id,
+            msg_type=MessageType.MESSAGE_TYPE_TEXT,
+            text=content.text,
+            mention_ids=content.mention_ids
+        )
+
+    def recall_message(self, message_id: str) -> bool:
+        """recall the message and emit the recalled message event
+
+        Returns:
+            bool: False if the message has been recalled
+        """
+        if not self.environment.recall_message(message_id):
+            return False
+
+        message_payload = self.environment.get_message_payload(message_id)
+        self.send_message_payload(
+            talker_id=message_payload.from_id,
+            conversation_id=message_payload.room_id or message_payload.to_id,
+            msg_type=MessageType.MESSAGE_TYPE_RECALLED,
+            text=message_id
+        )
+        return True
+
+    def forward_message(self, talker_id: str, conversation_id: str,
+                        message_id: str) -> str:
+        """forward the message to the conversation
+
+        the new payload shares the content of the original one instead of
+        copying it, and keeps the reference to the original message
+        """
+        message_payload = self.environment.get_message_payload(message_id)
+        return self.send_message_payload(
+            talker_id=talker_id,
+            conversation_id=conversation_id,
+            msg_type=message_payload.type,
+            text=message_payload.text,
+            filename=message_payload.filename,
+            origin_id=message_id
+        )
+
     def add_contact_to_room(self, contact_ids: Union[str, List[str]],
                             room_id: str, inviter_id: Optional[str] = None):
         """add contact to the room"""
 
         if not inviter_id:
-            inviter_id = self.login_user.contact_id
-
-        room_payload = self.environment.get_room_payload(room_id)
+            inviter_id = self.login_user_id
 
         if isinstance(contact_ids, str):
             contact_ids = [contact_ids]
 
-        for contact_id in contact_ids:
-            if contact_id in room_payload.member_ids:
-                continue
-            room_payload.member_ids.append(contact_id)
-
-        self.environment.update_room_payload(room_payload)
+        added_ids = self.environment.add_room_members(
+            room_id=room_id,
+            contact_ids=contact_ids,
+            inviter_id=inviter_id
+        )
+        # nobody joins if all of the contacts are members already
+        if not added_ids:
+            return
 
         response = MockerResponse(
             type=int(EventType.EVENT_TYPE_ROOM_JOIN),
             payload=json.dumps({
-                'roomId': room_payload.id,
+                'roomId': room_id,
                 'inviterId': inviter_id,
                 'timestamp': datetime.now().timestamp() * 1000,
-                'inviteeIdList': contact_ids
+                'inviteeIdList': added_ids
             })
         )
 
         self.emit('stream', response)
+
+    def remove_contact_from_room(self, contact_ids: Union[str, List[str]],
+                                 room_id: str,
+                                 remover_id: Optional[str] = None):
+        """remove contact from the room"""
+
+        if not remover_id:
+            remover_id = self.login_user_id
+
+        if isinstance(contact_ids, str):
+            contact_ids = [contact_ids]
+
+        removed_ids = self.environment.remove_room_members(
+            room_id=room_id,
+            contact_ids=contact_ids
+        )
+        if not removed_ids:
+            return
+
+        response = MockerResponse(
+            type=int(EventType.EVENT_TYPE_ROOM_LEAVE),
+            payload=json.dumps({
+                'roomId': room_id,
+                'removerId': remover_id,
+                'timestamp': datetime.now().timestamp() * 1000,
+                'removeeIdList': removed_ids
+            })
+        )
+
+        self.emit('stream', response)
+
+    def send_friendship_request(self, contact_id: Optional[str] = None,
+                                hello: str = '') -> str:
+        """mock the contact send friendship request to the login user
+
+        if contact_id is None, a new stranger contact will be created
+        """
+        if not contact_id:
+            contact_id = self.environment.new_contact_payload(
+                friend=False).id
+        friendship_payload = self.environment.new_friendship_payload(
+            contact_id=contact_id,
+            hello=hello
+        )
+        self._emit_friendship(friendship_payload.id)
+        return friendship_payload.id
+
+    async def send_friendship_requests(self, count: int,
+                                       rate: Optional[float] = None,
+                                       hello: str = '') -> List[str]:
+        """mock the friendship-request storm from new strangers
+
+        Args:
+            count (int): the number of friendship requests
+            rate (Optional[float]): requests per second, None means as fast
+                as possible
+            hello (str): the hello message of every request
+
+        Returns:
+            List[str]: the friendship ids
+        """
+        loop = asyncio.get_event_loop()
+        start_time = loop.time()
+        friendship_ids: List[str] = []
+        for index in range(count):
+            delay = 0.0
+            if rate:
+                delay = start_time + index / rate - loop.time()
+            # always yield to the loop, so the listeners can consume the
+            # friendship event between the requests
+            await asyncio.sleep(max(delay, 0))
+            friendship_ids.append(self.send_friendship_request(hello=hello))
+        return friendship_ids
+
+    def accept_friendship(self, friendship_id: str):
+        """accept the friendship request and emit the confirm event"""
+        self.environment.accept_friendship(friendship_id)
+        self._emit_friendship(friendship_id)
+
+    def add_friendship(self, contact_id: str, hello: str = '') -> str:
+        """the login user send friendship request to the contact"""
+        friendship_payload = self.environment.new_friendship_payload(
+            contact_id=contact_id,
+            hello=hello,
+            friendship_type=FriendshipType.FRIENDSHIP_TYPE_VERIFY
+        )
+        return friendship_payload.id
+
+    def _emit_friendship(self, friendship_id: str):
+        """emit the friendship event"""
+        log.info('mock the friendship <%s> event', friendship_id)
+        response = MockerResponse(
+            type=int(EventType.EVENT_TYPE_FRIENDSHIP),
+            payload=json.dumps({
+                'friendshipId': friendship_id
+            })
+        )
+        self.emit('stream', response)
@@ -0,0 +1,87 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import (
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union
+)
+
+IdT = TypeVar('IdT')
+
+
+@dataclass
+class ParetoRoomSize:
+    """heavy-tailed room sizes: most rooms are small, a few are huge"""
+    alpha: float = 1.5
+    minimum: int = 3
+    maximum: int = 500
+
+    def sample(self, rand: random.Random, population: int) -> int:
+        """the size of room, which is not larger than the population"""
+        size = int(self.minimum * rand.paretovariate(self.alpha))
+        return min(self.maximum, size, population)
+
+
+@dataclass
+class LogNormalRoomSize:
+    """room sizes around the median with a long tail"""
+    median: float = 20.0
+    sigma: float = 1.0
+    minimum: int = 1
+    maximum: int = 500
+
+    def sample(self, rand: random.Random, population: int) -> int:
+        """the size of room, which is not larger than the population"""
+        size = int(rand.lognormvariate(0, self.sigma) * self.median)
+        return min(max(self.minimum, min(self.maximum, size)), population)
+
+
+@dataclass
+class UniformRoomSize:
+    """room sizes between low and high, the population if high is None"""
+    low: int = 0
+    high: Optional[int] = None
+
+    def sample(self, rand: random.Random, population: int) -> int:
+        """the size of room, which is not larger than the population"""
+        high = population if self.high is None else \
+            min(self.high, population)
+        return rand.randint(min(self.low, high), high)
+
+
+RoomSize = Union[ParetoRoomSize, LogNormalRoomSize, UniformRoomSize]
+
+
+def sample_ids(ids: Sequence[IdT], k: int,
+               rand: random.Random) -> List[IdT]:
+    """sample k distinct ids from the indexable ids, eg: the contact ids or
+    the neighbor nodes
+
+    random.sample picks the positions of a sequence directly, so it costs
+    O(k) instead of copying all of the ids, unless k is close to the count
+    of ids.
+    """
+    return rand.sample(ids, min(k, len(ids)))
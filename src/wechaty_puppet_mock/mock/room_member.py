@@ -0,0 +1,284 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple
+)
+
+
+class IdInterner:
+    """map the string ids to small integers and back"""
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._indexes: Dict[str, int] = {}
+
+    def intern(self, payload_id: str) -> int:
+        """get the index of id, the id will be interned if it's new"""
+        index = self._indexes.get(payload_id)
+        if index is None:
+            index = len(self._ids)
+            self._indexes[payload_id] = index
+            self._ids.append(payload_id)
+        return index
+
+    def intern_many(self, payload_ids: List[str]) -> List[int]:
+        """get the indexes of ids, the new ids will be interned"""
+        indexes = self._indexes
+        try:
+            return [indexes[payload_id] for payload_id in payload_ids]
+        except KeyError:
+            return [self.intern(payload_id) for payload_id in payload_ids]
+
+    def index_of(self, payload_id: str) -> Optional[int]:
+        """get the index of id without interning it"""
+        return self._indexes.get(payload_id)
+
+    def id_of(self, index: int) -> str:
+        """get the id of the index"""
+        return self._ids[index]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+@dataclass
+class RoomMemberRecord:
+    """the decoded member info of the room"""
+    contact_id: str
+    inviter_id: str
+    join_time: int
+    room_alias: str = ''
+
+
+class _RoomMembers:
+    """members of one room, stored as parallel arrays sorted by contact"""
+    __slots__ = ('contacts', 'inviters', 'join_times')
+
+    def __init__(self):
+        self.contacts = array('I')
+        self.inviters = array('I')
+        # seconds since epoch, uint32 is enough until 2106
+        self.join_times = array('I')
+
+    def find(self, contact_index: int) -> Tuple[int, bool]:
+        position = bisect_left(self.contacts, contact_index)
+        found = position < len(self.contacts) and \
+            self.contacts[position] == contact_index
+        return position, found
+
+
+class _MemberView(Sequence[str]):
+    """the read-only member ids over the contact array of a room, the
+    position of skip is left out"""
+
+    def __init__(self, contacts: array, id_of: Callable[[int], str],
+                 skip: Optional[int] = None):
+        self._contacts = contacts
+        self._id_of = id_of
+        self._skip = skip
+
+    def __len__(self) -> int:
+        return len(self._contacts) - (self._skip is not None)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[index]
+                    for index in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('member position out of range')
+        if self._skip is not None and position >= self._skip:
+            position += 1
+        return self._id_of(self._contacts[position])
+
+
+class RoomMemberStore:
+    """room member store keyed by (room_id, contact_id)
+
+    all of the ids are interned, every member costs 12 bytes in the arrays of
+    its room, and the room alias is kept in a sparse dict because most of
+    the members never set it.
+    """
+
+    def __init__(self):
+        self._interner = IdInterner()
+        self._rooms: Dict[int, _RoomMembers] = {}
+        self._room_aliases: Dict[Tuple[int, int], str] = {}
+
+    def add(self, room_id: str, contact_id: str, inviter_id: str,
+            join_time: float) -> bool:
+        """add the member to room
+
+        Returns:
+            bool: False if the contact is already the member of room
+        """
+        room_index = self._interner.intern(room_id)
+        members = self._rooms.get(room_index)
+        if members is None:
+            members = self._rooms[room_index] = _RoomMembers()
+
+        contact_index = self._interner.intern(contact_id)
+        position, found = members.find(contact_index)
+        if found:
+            return False
+        members.contacts.insert(position, contact_index)
+        members.inviters.insert(position, self._interner.intern(inviter_id))
+        members.join_times.insert(position, int(join_time))
+        return True
+
+    def add_many(self, room_id: str, contact_ids: List[str],
+                 inviter_id: str, join_time: float) -> int:
+        """add the members to room, the arrays of a new room are built at
+        once instead of inserting the members one by one
+
+        Returns:
+            int: the count of the added members
+        """
+        room_index = self._interner.intern(room_id)
+        if room_index in self._rooms:
+            return sum(self.add(room_id, contact_id, inviter_id, join_time)
+                       for contact_id in contact_ids)
+
+        contact_indexes = sorted(set(
+            self._interner.intern_many(contact_ids)))
+        members = self._rooms[room_index] = _RoomMembers()
+        count = len(contact_indexes)
+        members.contacts = array('I', contact_indexes)
+        members.inviters = array('I', [self._interner.intern(inviter_id)]) \
+            * count
+        members.join_times = array('I', [int(join_time)]) * count
+        return count
+
+    def remove(self, room_id: str, contact_id: str) -> bool:
+        """remove the member from room
+
+        Returns:
+            bool: False if the contact is not the member of room
+        """
+        room_index = self._interner.index_of(room_id)
+        contact_index = self._interner.index_of(contact_id)
+        if room_index is None or contact_index is None or \
+                room_index not in self._rooms:
+            return False
+        members = self._rooms[room_index]
+        position, found = members.find(contact_index)
+        if not found:
+            return False
+        del members.contacts[position]
+        del members.inviters[position]
+        del members.join_times[position]
+        self._room_aliases.pop((room_index, contact_index), None)
+        return True
+
+    def get(self, room_id: str, contact_id: str
+            ) -> Optional[RoomMemberRecord]:
+        """get the member info, None if the contact is not in room"""
+        room_index = self._interner.index_of(room_id)
+        contact_index = self._interner.index_of(contact_id)
+        if room_index is None or contact_index is None or \
+                room_index not in self._rooms:
+            return None
+        members = self._rooms[room_index]
+        position, found = members.find(contact_index)
+        if not found:
+            return None
+        return RoomMemberRecord(
+            contact_id=contact_id,
+            inviter_id=self._interner.id_of(members.inviters[position]),
+            join_time=members.join_times[position],
+            room_alias=self._room_aliases.get(
+                (room_index, contact_index), '')
+        )
+
+    def set_alias(self, room_id: str, contact_id: str, room_alias: str
+                  ) -> bool:
+        """set the alias of member in room
+
+        Returns:
+            bool: False if the contact is not the member of room
+        """
+        if self.get(room_id, contact_id) is None:
+            return False
+        key = (self._interner.intern(room_id),
+               self._interner.intern(contact_id))
+        if room_alias:
+            self._room_aliases[key] = room_alias
+        else:
+            self._room_aliases.pop(key, None)
+        return True
+
+    def contains(self, room_id: str, contact_id: str) -> bool:
+        """check if the contact is the member of room"""
+        room_index = self._interner.index_of(room_id)
+        contact_index = self._interner.index_of(contact_id)
+        if room_index is None or contact_index is None or \
+                room_index not in self._rooms:
+            return False
+        return self._rooms[room_index].find(contact_index)[1]
+
+    def member_ids(self, room_id: str) -> List[str]:
+        """get the member ids of room"""
+        room_index = self._interner.index_of(room_id)
+        if room_index is None or room_index not in self._rooms:
+            return []
+        id_of = self._interner.id_of
+        return [id_of(index) for index in self._rooms[room_index].contacts]
+
+    def member_view(self, room_id: str,
+                    exclude_id: Optional[str] = None) -> Sequence[str]:
+        """get the member ids of room without copying them, eg: to sample a
+        few members of a huge room, the contact of exclude_id is left out
+
+        the view follows the later changes of room, read it right away.
+        """
+        room_index = self._interner.index_of(room_id)
+        if room_index is None or room_index not in self._rooms:
+            return []
+        members = self._rooms[room_index]
+        skip: Optional[int] = None
+        contact_index = None if exclude_id is None else \
+            self._interner.index_of(exclude_id)
+        if contact_index is not None:
+            position, found = members.find(contact_index)
+            if found:
+                skip = position
+        return _MemberView(members.contacts, self._interner.id_of, skip)
+
+    def member_count(self) -> int:
+        """the total count of members over all of the rooms"""
+        return sum(len(members.contacts) for members in self._rooms.values())
+
+    def nbytes(self) -> int:
+        """the estimated bytes of the member arrays"""
+        return sum(
+            members.contacts.itemsize * len(members.contacts) * 3
+            for members in self._rooms.values()
+        )
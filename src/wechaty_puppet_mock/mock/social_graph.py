@@ -0,0 +1,194 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import random
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import (
+    List,
+    Optional,
+    Sequence
+)
+
+from wechaty_puppet_mock.exceptions import MockEnvironmentError
+
+
+class SocialGraph:
+    """undirected graph over the contact indexes in CSR layout
+
+    the neighbors of node i are `neighbors[offsets[i]:offsets[i + 1]]`,
+    sorted and without duplicates, so every edge costs 8 bytes (stored in
+    both directions) and the lookups are bisects over the slice.
+    """
+
+    def __init__(self, offsets: array, neighbors: array,
+                 community_starts: Optional[Sequence[int]] = None):
+        self.offsets = offsets
+        self.neighbors = neighbors
+        # the first node of every community, the nodes are grouped by
+        # community in contiguous ranges
+        self.community_starts = array('I', community_starts or [0])
+
+    @classmethod
+    def from_edges(cls, node_count: int, sources: Sequence[int],
+                   targets: Sequence[int],
+                   community_starts: Optional[Sequence[int]] = None
+                   ) -> SocialGraph:
+        """build the graph from the undirected edges, the self loops and the
+        duplicated edges are dropped"""
+        adjacency: List[List[int]] = [[] for _ in range(node_count)]
+        for source, target in zip(sources, targets):
+            if source != target:
+                adjacency[source].append(target)
+                adjacency[target].append(source)
+
+        offsets = array('I', [0])
+        neighbors = array('I')
+        for node_neighbors in adjacency:
+            neighbors.extend(sorted(set(node_neighbors)))
+            offsets.append(len(neighbors))
+        return cls(offsets, neighbors, community_starts)
+
+    @property
+    def node_count(self) -> int:
+        """the count of nodes"""
+        return len(self.offsets) - 1
+
+    @property
+    def edge_count(self) -> int:
+        """the count of undirected edges"""
+        return len(self.neighbors) // 2
+
+    def nbytes(self) -> int:
+        """the bytes of the adjacency arrays"""
+        count = len(self.offsets) + len(self.neighbors) \
+            + len(self.community_starts)
+        return count * self.offsets.itemsize
+
+    def _check(self, node: int):
+        if not 0 <= node < self.node_count:
+            raise MockEnvironmentError(f'node <{node}> not in social graph')
+
+    def degree(self, node: int) -> int:
+        """the count of neighbors"""
+        self._check(node)
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def neighbors_of(self, node: int) -> array:
+        """the sorted neighbors of node"""
+        self._check(node)
+        return self.neighbors[self.offsets[node]:self.offsets[node + 1]]
+
+    def connected(self, node: int, other: int) -> bool:
+        """check if there is an edge between the nodes"""
+        self._check(node)
+        start, end = self.offsets[node], self.offsets[node + 1]
+        position = bisect_left(self.neighbors, other, start, end)
+        return position < end and self.neighbors[position] == other
+
+    def mutual_neighbors(self, node: int, other: int) -> List[int]:
+        """the sorted neighbors shared by the nodes"""
+        first, second = self.neighbors_of(node), self.neighbors_of(other)
+        if len(first) > len(second):
+            first, second = second, first
+        return sorted(set(first).intersection(second))
+
+    def community_of(self, node: int) -> int:
+        """the index of the community which the node belongs to"""
+        self._check(node)
+        return bisect_right(self.community_starts, node) - 1
+
+    def community_range(self, community: int) -> range:
+        """the nodes of the community"""
+        start = self.community_starts[community]
+        end = self.community_starts[community + 1] \
+            if community + 1 < len(self.community_starts) else self.node_count
+        return range(start, end)
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def generate_social_graph(node_count: int,
+                          mean_degree: float = 20.0,
+                          degree_alpha: float = 2.5,
+                          community_size: int = 200,
+                          mixing: float = 0.1,
+                          seed: Optional[int] = None) -> SocialGraph:
+    """generate the graph with power-law degrees and communities
+
+    every node gets the expected degree from the pareto distribution, and
+    its half-edges are paired with the half-edges drawn at random (close to
+    the configuration model), so the degrees follow the power law. The
+    nodes are split into contiguous communities with pareto sizes, most of
+    the half-edges are paired in the community and the `mixing` part of
+    them over the whole graph.
+
+    Args:
+        node_count (int): the count of contacts
+        mean_degree (float): the expected mean count of neighbors
+        degree_alpha (float): the exponent of the degree distribution,
+            smaller is more heavy-tailed, it must be bigger than 1
+        community_size (int): the typical size of communities
+        mixing (float): the part of edges across the communities
+        seed (Optional[int]): make the graph deterministic
+    """
+    if degree_alpha <= 1:
+        raise MockEnvironmentError(
+            f'degree_alpha <{degree_alpha}> must be bigger than 1')
+    rand = random.Random(seed)
+    if node_count < 2:
+        return SocialGraph.from_edges(node_count, [], [])
+
+    # pareto with alpha = exponent - 1 gives the degree exponent, and the
+    # hubs are capped at the structural cutoff
+    weights = [rand.paretovariate(degree_alpha - 1) for _ in range(node_count)]
+    scale = mean_degree * node_count / sum(weights)
+    max_degree = max(1, int((mean_degree * node_count) ** 0.5))
+
+    community_starts = [0]
+    while True:
+        size = max(2, int(community_size / 2 * rand.paretovariate(2.0)))
+        if community_starts[-1] + size >= node_count:
+            break
+        community_starts.append(community_starts[-1] + size)
+    community_ends = community_starts[1:] + [node_count]
+
+    sources, targets = array('I'), array('I')
+
+    def _pair(stubs: List[int]):
+        # every other half-edge is the source, and the target is drawn from
+        # all of the half-edges, which is much cheaper than shuffling them
+        sources.extend(stubs[::2])
+        targets.extend(rand.choices(stubs, k=len(stubs[::2])))
+
+    global_stubs: List[int] = []
+    for start, end in zip(community_starts, community_ends):
+        local_stubs: List[int] = []
+        for node in range(start, end):
+            degree = min(max_degree, max(1, round(weights[node] * scale)))
+            # stochastic rounding, so the small degrees are mixed too
+            local = min(end - start - 1,
+                        int(degree * (1 - mixing) + rand.random()))
+            local_stubs.extend([node] * local)
+            global_stubs.extend([node] * (degree - local))
+        _pair(local_stubs)
+    _pair(global_stubs)
+    return SocialGraph.from_edges(node_count, sources, targets,
+                                  community_starts)
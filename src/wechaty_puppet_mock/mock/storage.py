@@ -0,0 +1,360 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import pickle
+import sqlite3
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple
+)
+
+from wechaty_puppet import get_logger     # type: ignore
+from wechaty_puppet.schemas.types import PayloadType     # type: ignore
+
+from wechaty_puppet_mock.exceptions import MockEnvironmentError
+
+log = get_logger('MockStorage')
+
+# the payload types which are kept in the storage
+STORED_PAYLOAD_TYPES = (
+    PayloadType.PAYLOAD_TYPE_CONTACT,
+    PayloadType.PAYLOAD_TYPE_ROOM,
+    PayloadType.PAYLOAD_TYPE_MESSAGE,
+)
+
+
+class StorageBackend(metaclass=ABCMeta):
+    """the payload pools behind EnvironmentMock
+
+    the payloads are the objects which the environment hands out, the
+    environment puts the payload again after it changes one in place, so the
+    backend which keeps the payloads out of process writes the change.
+
+    the backend which `keeps_versions` stores the version with the payload,
+    so the environment doesn't keep a version per payload in memory.
+
+    the other state of the environment, eg: the room members and the tags,
+    is saved as named snapshots by `put_state` when the environment is
+    flushed, and loaded by `get_state` when the world is reused.
+    """
+    keeps_versions = False
+
+    @abstractmethod
+    def get(self, payload_type: PayloadType, payload_id: str) -> Optional[Any]:
+        """get the payload, None if it's not stored"""
+
+    @abstractmethod
+    def put(self, payload_type: PayloadType, payload: Any, version: int = 0):
+        """insert or replace the payload by its id, the version is only
+        stored if the backend keeps_versions"""
+
+    def put_many(self, payload_type: PayloadType, payloads: Iterable[Any]):
+        """insert or replace the payloads"""
+        for payload in payloads:
+            self.put(payload_type, payload)
+
+    def contains(self, payload_type: PayloadType, payload_id: str) -> bool:
+        """check if the payload is stored"""
+        return self.get(payload_type, payload_id) is not None
+
+    def get_version(self, payload_type: PayloadType, payload_id: str) -> int:
+        """the stored version of the payload, 0 if there is none"""
+        # pylint: disable=unused-argument
+        return 0
+
+    def max_version(self) -> int:
+        """the biggest stored version of all payloads"""
+        return 0
+
+    @abstractmethod
+    def get_state(self, name: str) -> Optional[Any]:
+        """get the saved snapshot of the state, None if it's not saved"""
+
+    @abstractmethod
+    def put_state(self, name: str, state: Any):
+        """save the snapshot of the state, replacing the old one"""
+
+    @abstractmethod
+    def count(self, payload_type: PayloadType) -> int:
+        """the count of stored payloads"""
+
+    @abstractmethod
+    def iter_payloads(self, payload_type: PayloadType) -> Iterator[Any]:
+        """iterate the payloads in the order of insertion"""
+
+    @abstractmethod
+    def resident(self, payload_type: PayloadType) -> Dict[str, Any]:
+        """the payloads which are held in memory, for memory accounting"""
+
+    def flush(self):
+        """write the pending payloads"""
+
+    def close(self):
+        """flush and release the storage"""
+        self.flush()
+
+
+class MemoryStorage(StorageBackend):
+    """keep all of the payloads in dicts, the default storage"""
+
+    def __init__(self):
+        self._pools: Dict[PayloadType, Dict[str, Any]] = {
+            payload_type: {} for payload_type in STORED_PAYLOAD_TYPES
+        }
+        self._states: Dict[str, Any] = {}
+
+    def get(self, payload_type: PayloadType, payload_id: str) -> Optional[Any]:
+        return self._pools[payload_type].get(payload_id)
+
+    def put(self, payload_type: PayloadType, payload: Any, version: int = 0):
+        self._pools[payload_type][payload.id] = payload
+
+    def contains(self, payload_type: PayloadType, payload_id: str) -> bool:
+        return payload_id in self._pools[payload_type]
+
+    def count(self, payload_type: PayloadType) -> int:
+        return len(self._pools[payload_type])
+
+    def iter_payloads(self, payload_type: PayloadType) -> Iterator[Any]:
+        return iter(list(self._pools[payload_type].values()))
+
+    def resident(self, payload_type: PayloadType) -> Dict[str, Any]:
+        return self._pools[payload_type]
+
+    def get_state(self, name: str) -> Optional[Any]:
+        return self._states.get(name)
+
+    def put_state(self, name: str, state: Any):
+        self._states[name] = state
+
+
+_TABLES: Dict[PayloadType, str] = {
+    PayloadType.PAYLOAD_TYPE_CONTACT: 'contact',
+    PayloadType.PAYLOAD_TYPE_ROOM: 'room',
+    PayloadType.PAYLOAD_TYPE_MESSAGE: 'message',
+}
+
+
+class _Statements:
+    """the sql of one table, the same strings are reused so sqlite3 keeps
+    them prepared in the statement cache"""
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, table: str):
+        self.create = f'CREATE TABLE IF NOT EXISTS {table} (' \
+            f'seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, ' \
+            f'data BLOB NOT NULL, version INTEGER NOT NULL DEFAULT 0)'
+        self.select = f'SELECT data FROM {table} WHERE id = ?'
+        self.exists = f'SELECT 1 FROM {table} WHERE id = ?'
+        self.version = f'SELECT version FROM {table} WHERE id = ?'
+        self.max_version = f'SELECT MAX(version) FROM {table}'
+        self.upsert = f'INSERT INTO {table} (id, data, version) ' \
+            f'VALUES (?, ?, ?) ON CONFLICT(id) DO UPDATE SET ' \
+            f'data = excluded.data, version = excluded.version'
+        self.count = f'SELECT COUNT(*) FROM {table}'
+        self.scan = f'SELECT id, data FROM {table} ORDER BY seq'
+
+
+# the snapshots of the environment state, see StorageBackend.put_state
+_STATE_CREATE = 'CREATE TABLE IF NOT EXISTS state (' \
+    'name TEXT PRIMARY KEY, data BLOB NOT NULL)'
+_STATE_SELECT = 'SELECT data FROM state WHERE name = ?'
+_STATE_UPSERT = 'INSERT INTO state (name, data) VALUES (?, ?) ' \
+    'ON CONFLICT(name) DO UPDATE SET data = excluded.data'
+
+
+class SQLiteStorage(StorageBackend):
+    """keep the payloads in a sqlite file, so the world can be larger than
+    the memory and be reused across the runs
+
+    the writes are buffered and inserted in one transaction per batch, and
+    the recently used payloads are kept in a LRU cache, so the hot ones are
+    the same objects without decoding them again.
+
+    Args:
+        path (str): the database file, ':memory:' for a throwaway one
+        batch_size (int): the count of pending writes which triggers a flush
+        cache_size (int): the count of payloads in the read cache
+        synchronous (str): the sqlite synchronous pragma, NORMAL is durable
+            in WAL mode except for the last transactions on power loss
+    """
+
+    keeps_versions = True
+
+    def __init__(self, path: str, batch_size: int = 1000,
+                 cache_size: int = 10000, synchronous: str = 'NORMAL'):
+        if batch_size <= 0 or cache_size <= 0:
+            raise MockEnvironmentError('batch_size and cache_size must be '
+                                       'positive')
+        self.path = path
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+
+        self._connection: Optional[sqlite3.Connection] = sqlite3.connect(
+            path, isolation_level=None, cached_statements=64)
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        self._connection.execute(f'PRAGMA synchronous = {synchronous}')
+        self._statements = {
+            payload_type: _Statements(table)
+            for payload_type, table in _TABLES.items()
+        }
+        for statements in self._statements.values():
+            self._connection.execute(statements.create)
+        self._connection.execute(_STATE_CREATE)
+
+        # payload id -> (payload, version) which are not written yet
+        self._pending: Dict[PayloadType, Dict[str, Tuple[Any, int]]] = {
+            payload_type: {} for payload_type in STORED_PAYLOAD_TYPES
+        }
+        self._pending_count = 0
+        self._cache: OrderedDict[Tuple[PayloadType, str], Any] = \
+            OrderedDict()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """the connection of the opened database"""
+        if self._connection is None:
+            raise MockEnvironmentError(f'storage <{self.path}> is closed')
+        return self._connection
+
+    def _cache_payload(self, key: Tuple[PayloadType, str], payload: Any):
+        self._cache[key] = payload
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, payload_type: PayloadType, payload_id: str) -> Optional[Any]:
+        key = (payload_type, payload_id)
+        payload = self._cache.get(key)
+        if payload is not None:
+            self._cache.move_to_end(key)
+            return payload
+        pending = self._pending[payload_type].get(payload_id)
+        if pending is not None:
+            return pending[0]
+
+        row = self.connection.execute(
+            self._statements[payload_type].select, (payload_id,)).fetchone()
+        if row is None:
+            return None
+        payload = pickle.loads(row[0])
+        self._cache_payload(key, payload)
+        return payload
+
+    def put(self, payload_type: PayloadType, payload: Any, version: int = 0):
+        pending = self._pending[payload_type]
+        if payload.id not in pending:
+            self._pending_count += 1
+        pending[payload.id] = (payload, version)
+        self._cache_payload((payload_type, payload.id), payload)
+        if self._pending_count >= self.batch_size:
+            self.flush()
+
+    def contains(self, payload_type: PayloadType, payload_id: str) -> bool:
+        if (payload_type, payload_id) in self._cache or \
+                payload_id in self._pending[payload_type]:
+            return True
+        return self.connection.execute(
+            self._statements[payload_type].exists,
+            (payload_id,)).fetchone() is not None
+
+    def get_version(self, payload_type: PayloadType, payload_id: str) -> int:
+        pending = self._pending[payload_type].get(payload_id)
+        if pending is not None:
+            return pending[1]
+        row = self.connection.execute(
+            self._statements[payload_type].version, (payload_id,)).fetchone()
+        return row[0] if row else 0
+
+    def max_version(self) -> int:
+        self.flush()
+        return max(self.connection.execute(
+            statements.max_version).fetchone()[0] or 0
+            for statements in self._statements.values())
+
+    def get_state(self, name: str) -> Optional[Any]:
+        row = self.connection.execute(_STATE_SELECT, (name,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def put_state(self, name: str, state: Any):
+        self.connection.execute(_STATE_UPSERT, (
+            name, pickle.dumps(state, pickle.HIGHEST_PROTOCOL)))
+
+    def count(self, payload_type: PayloadType) -> int:
+        self.flush()
+        return self.connection.execute(
+            self._statements[payload_type].count).fetchone()[0]
+
+    def iter_payloads(self, payload_type: PayloadType) -> Iterator[Any]:
+        self.flush()
+        cursor = self.connection.execute(self._statements[payload_type].scan)
+        for payload_id, data in cursor:
+            payload = self._cache.get((payload_type, payload_id))
+            yield payload if payload is not None else pickle.loads(data)
+
+    def resident(self, payload_type: PayloadType) -> Dict[str, Any]:
+        resident = {
+            payload_id: payload
+            for (cached_type, payload_id), payload in self._cache.items()
+            if cached_type == payload_type
+        }
+        resident.update((payload_id, payload) for payload_id, (payload, _)
+                        in self._pending[payload_type].items())
+        return resident
+
+    def flush(self):
+        if not self._pending_count:
+            return
+        connection = self.connection
+        connection.execute('BEGIN')
+        try:
+            for payload_type, pending in self._pending.items():
+                if not pending:
+                    continue
+                connection.executemany(
+                    self._statements[payload_type].upsert,
+                    [(payload_id, pickle.dumps(payload,
+                                               pickle.HIGHEST_PROTOCOL),
+                      version)
+                     for payload_id, (payload, version) in pending.items()])
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        log.debug('flush <%s> payloads to <%s>', self._pending_count,
+                  self.path)
+        for pending in self._pending.values():
+            pending.clear()
+        self._pending_count = 0
+
+    def close(self):
+        if self._connection is None:
+            return
+        self.flush()
+        self._connection.close()
+        self._connection = None
+        self._cache.clear()
@@ -0,0 +1,313 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union
+)
+
+from wechaty_puppet_mock.exceptions import MockEnvironmentError
+
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+CHUNK_BYTES = (1 << CHUNK_BITS) // 8
+# the chunk with more indices is smaller as 8KB of bits than 2 bytes each
+ARRAY_MAX = 4096
+
+# the sorted low 16 bits of the indices, or the bits of the whole chunk
+Chunk = Union[array, int]
+
+
+def _values_to_bits(values: Iterable[int]) -> int:
+    data = bytearray(CHUNK_BYTES)
+    for value in values:
+        data[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(data, 'little')
+
+
+# byte -> the offsets of its set bits
+_BYTE_OFFSETS = [tuple(offset for offset in range(8) if byte >> offset & 1)
+                 for byte in range(256)]
+
+
+def _bits_to_values(bits: int) -> List[int]:
+    data = bits.to_bytes(CHUNK_BYTES, 'little')
+    return [(position << 3) + offset
+            for position, byte in enumerate(data) if byte
+            for offset in _BYTE_OFFSETS[byte]]
+
+
+def _chunk_contains(chunk: Chunk, value: int) -> bool:
+    if isinstance(chunk, int):
+        return bool(chunk >> value & 1)
+    position = bisect_left(chunk, value)
+    return position < len(chunk) and chunk[position] == value
+
+
+def _chunk_len(chunk: Chunk) -> int:
+    if isinstance(chunk, int):
+        return bin(chunk).count('1')
+    return len(chunk)
+
+
+def _filter(values: array, chunk: Chunk, keep: bool) -> array:
+    """the values which are in the chunk, or not in it if not keep"""
+    if isinstance(chunk, int):
+        data = chunk.to_bytes(CHUNK_BYTES, 'little')
+        return array('H', [value for value in values
+                           if bool(data[value >> 3] >> (value & 7) & 1)
+                           is keep])
+    members = set(chunk)
+    return array('H', [value for value in values
+                       if (value in members) is keep])
+
+
+def _copy(chunk: Chunk) -> Chunk:
+    """the arrays are changed in place, so the results don't share them"""
+    return chunk if isinstance(chunk, int) else array('H', chunk)
+
+
+def _to_bits(chunk: Chunk) -> int:
+    return chunk if isinstance(chunk, int) else _values_to_bits(chunk)
+
+
+def _compact(chunk: Chunk) -> Optional[Chunk]:
+    """the smaller form of the chunk, None if it is empty"""
+    if isinstance(chunk, int):
+        if not chunk:
+            return None
+        if _chunk_len(chunk) <= ARRAY_MAX:
+            return array('H', _bits_to_values(chunk))
+        return chunk
+    if not chunk:
+        return None
+    if len(chunk) > ARRAY_MAX:
+        return _values_to_bits(chunk)
+    return chunk
+
+
+class Bitmap:
+    """compressed bitmap over the integer contact indices
+
+    the indices are split into chunks of 65536 indices like the roaring
+    bitmap, and the empty chunks are not stored at all. the sparse chunk is
+    the sorted array of the low 16 bits, and the dense one is one python int
+    of 65536 bits, so the scattered tags pay 2 bytes per index, and the set
+    operations of the dense chunks run in C over the whole chunk.
+    """
+    __slots__ = ('_chunks',)
+
+    def __init__(self, indices: Optional[Iterable[int]] = None):
+        self._chunks: Dict[int, Chunk] = {}
+        if indices:
+            for index in indices:
+                self.add(index)
+
+    @classmethod
+    def _from_chunks(cls, chunks: Dict[int, Chunk]) -> Bitmap:
+        bitmap = cls()
+        for key, chunk in chunks.items():
+            compacted = _compact(chunk)
+            if compacted is not None:
+                bitmap._chunks[key] = compacted
+        return bitmap
+
+    def add(self, index: int):
+        """set the bit of index"""
+        key, value = index >> CHUNK_BITS, index & CHUNK_MASK
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            self._chunks[key] = array('H', [value])
+        elif isinstance(chunk, int):
+            self._chunks[key] = chunk | (1 << value)
+        else:
+            position = bisect_left(chunk, value)
+            if position < len(chunk) and chunk[position] == value:
+                return
+            chunk.insert(position, value)
+            if len(chunk) > ARRAY_MAX:
+                self._chunks[key] = _values_to_bits(chunk)
+
+    def remove(self, index: int):
+        """clear the bit of index"""
+        key, value = index >> CHUNK_BITS, index & CHUNK_MASK
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            return
+        if isinstance(chunk, int):
+            chunk &= ~(1 << value)
+            self._chunks[key] = chunk
+        else:
+            position = bisect_left(chunk, value)
+            if position < len(chunk) and chunk[position] == value:
+                del chunk[position]
+        if not chunk:
+            del self._chunks[key]
+
+    def __contains__(self, index: int) -> bool:
+        chunk = self._chunks.get(index >> CHUNK_BITS)
+        return chunk is not None and \
+            _chunk_contains(chunk, index & CHUNK_MASK)
+
+    def __len__(self) -> int:
+        return sum(_chunk_len(chunk) for chunk in self._chunks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def __iter__(self) -> Iterator[int]:
+        for key in sorted(self._chunks):
+            chunk = self._chunks[key]
+            base = key << CHUNK_BITS
+            values = _bits_to_values(chunk) if isinstance(chunk, int) \
+                else chunk
+            for value in values:
+                yield base + value
+
+    def __and__(self, other: Bitmap) -> Bitmap:
+        small, large = sorted((self._chunks, other._chunks), key=len)
+        chunks: Dict[int, Chunk] = {}
+        for key, chunk in small.items():
+            other_chunk = large.get(key)
+            if other_chunk is None:
+                continue
+            if not isinstance(chunk, int):
+                chunks[key] = _filter(chunk, other_chunk, keep=True)
+            elif isinstance(other_chunk, int):
+                chunks[key] = chunk & other_chunk
+            else:
+                chunks[key] = _filter(other_chunk, chunk, keep=True)
+        return Bitmap._from_chunks(chunks)
+
+    def __or__(self, other: Bitmap) -> Bitmap:
+        chunks: Dict[int, Chunk] = {
+            key: _copy(chunk) for key, chunk in self._chunks.items()}
+        for key, chunk in other._chunks.items():
+            own = chunks.get(key)
+            if own is None:
+                chunks[key] = _copy(chunk)
+            elif isinstance(own, int) or isinstance(chunk, int):
+                chunks[key] = _to_bits(own) | _to_bits(chunk)
+            else:
+                chunks[key] = array('H', sorted(set(own).union(chunk)))
+        return Bitmap._from_chunks(chunks)
+
+    def __sub__(self, other: Bitmap) -> Bitmap:
+        chunks: Dict[int, Chunk] = {}
+        for key, chunk in self._chunks.items():
+            other_chunk = other._chunks.get(key)
+            if other_chunk is None:
+                chunks[key] = _copy(chunk)
+            elif isinstance(chunk, int):
+                chunks[key] = chunk & ~_to_bits(other_chunk)
+            else:
+                chunks[key] = _filter(chunk, other_chunk, keep=False)
+        return Bitmap._from_chunks(chunks)
+
+    def nbytes(self) -> int:
+        """the estimated bytes of the index data"""
+        return sum((chunk.bit_length() + 7) // 8 if isinstance(chunk, int)
+                   else chunk.itemsize * len(chunk)
+                   for chunk in self._chunks.values())
+
+
+class TagStore:
+    """tag -> bitmap of the tagged contact indices"""
+
+    def __init__(self):
+        self._tags: Dict[str, Bitmap] = {}
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def nbytes(self) -> int:
+        """the estimated bytes of the bitmaps"""
+        return sum(bitmap.nbytes() for bitmap in self._tags.values())
+
+    def tag_ids(self) -> List[str]:
+        """get all of the tag ids"""
+        return list(self._tags.keys())
+
+    def add(self, tag_id: str, index: int):
+        """tag the contact index, the tag will be created if not exist"""
+        if tag_id not in self._tags:
+            self._tags[tag_id] = Bitmap()
+        self._tags[tag_id].add(index)
+
+    def remove(self, tag_id: str, index: int):
+        """untag the contact index"""
+        self.get(tag_id).remove(index)
+
+    def delete(self, tag_id: str):
+        """delete the tag"""
+        self.get(tag_id)
+        del self._tags[tag_id]
+
+    def get(self, tag_id: str) -> Bitmap:
+        """get the bitmap of the tag"""
+        if tag_id not in self._tags:
+            raise MockEnvironmentError(f'tag <{tag_id}> not in environment')
+        return self._tags[tag_id]
+
+    def tag_ids_of(self, index: int) -> List[str]:
+        """get the tag ids of the contact index"""
+        return [tag_id for tag_id, bitmap in self._tags.items()
+                if index in bitmap]
+
+    def query(self,
+              all_of: Optional[List[str]] = None,
+              any_of: Optional[List[str]] = None,
+              none_of: Optional[List[str]] = None) -> Bitmap:
+        """query the contacts by tags, eg: tagged A and B but not C
+
+        Args:
+            all_of (Optional[List[str]]): contacts must have all of the tags
+            any_of (Optional[List[str]]): contacts must have one of the tags
+            none_of (Optional[List[str]]): contacts must not have the tags
+
+        Returns:
+            Bitmap: the matched contact indices
+        """
+        if not all_of and not any_of:
+            raise MockEnvironmentError('all_of or any_of is required to '
+                                       'query the tags')
+        result: Optional[Bitmap] = None
+        for tag_id in all_of or []:
+            bitmap = self._tags.get(tag_id, Bitmap())
+            if result is None:
+                result = Bitmap() | bitmap
+            else:
+                result = result & bitmap
+        if any_of:
+            union = Bitmap()
+            for tag_id in any_of:
+                union = union | self._tags.get(tag_id, Bitmap())
+            result = union if result is None else result & union
+        assert result is not None
+        for tag_id in none_of or []:
+            result = result - self._tags.get(tag_id, Bitmap())
+        return result
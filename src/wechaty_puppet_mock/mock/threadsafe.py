@@ -0,0 +1,166 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    TYPE_CHECKING
+)
+
+from wechaty_puppet import MessageType, get_logger     # type: ignore
+
+from wechaty_puppet_mock.exceptions import WechatyPuppetMockError
+
+if TYPE_CHECKING:
+    from wechaty_puppet_mock.mock.mocker import Mocker
+
+log = get_logger('ThreadSafeMocker')
+
+Injection = Tuple[Callable[..., Any], tuple, dict, Optional[Future]]
+
+
+class ThreadSafeMocker:
+    """inject the events into the mocker from any thread
+
+    the producers only append the prepared injection to a deque, which is
+    thread-safe in CPython, and the loop drains them in batches. The loop is
+    woken up by `call_soon_threadsafe` only when no drain is scheduled, so a
+    burst of injections costs one wakeup per batch instead of one per event.
+
+    Args:
+        mocker (Mocker): the mocker which runs in the loop
+        loop (asyncio.AbstractEventLoop): the loop which the mocker runs in
+        batch_size (int): the max injections handled in one loop callback
+    """
+
+    def __init__(self, mocker: Mocker, loop: asyncio.AbstractEventLoop,
+                 batch_size: int = 256):
+        self.mocker = mocker
+        self.loop = loop
+        self.batch_size = batch_size
+
+        self._injections: Deque[Injection] = deque()
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self.drained = 0
+        self.batches = 0
+
+    def pending(self) -> int:
+        """the count of injections waiting for the loop"""
+        return len(self._injections)
+
+    def submit(self, func: Callable[..., Any], *args,
+               wait_result: bool = True, **kwargs) -> Optional[Future]:
+        """call the function in the loop, the arguments should be prepared
+        in the producer thread
+
+        Returns:
+            Optional[Future]: the result of the function, None if not
+                wait_result
+        """
+        if self.loop.is_closed():
+            raise WechatyPuppetMockError('the loop of mocker is closed')
+        future: Optional[Future] = Future() if wait_result else None
+        self._injections.append((func, args, kwargs, future))
+        with self._lock:
+            if self._scheduled:
+                return future
+            self._scheduled = True
+        self.loop.call_soon_threadsafe(self._drain)
+        return future
+
+    def _drain(self):
+        """run the batch of injections in the loop"""
+        handled = 0
+        while handled < self.batch_size:
+            try:
+                func, args, kwargs, future = self._injections.popleft()
+            except IndexError:
+                break
+            handled += 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:    # pylint: disable=broad-except
+                if future is None:
+                    log.exception('injection <%s> failed', func)
+                else:
+                    future.set_exception(e)
+                continue
+            if future is not None:
+                future.set_result(result)
+        self.drained += handled
+        self.batches += 1
+
+        with self._lock:
+            if not self._injections:
+                self._scheduled = False
+                return
+        # let the other callbacks of the loop run between the batches
+        self.loop.call_soon(self._drain)
+
+    def send_message_payload(self, talker_id: str, conversation_id: str,
+                             msg_type: MessageType =
+                             MessageType.MESSAGE_TYPE_TEXT,
+                             text: str = '', filename: str = '',
+                             mention_ids: Optional[List[str]] = None,
+                             wait_result: bool = True) -> Optional[Future]:
+        """Mocker.send_message_payload from any thread, the future has the
+        id of message"""
+        return self.submit(self.mocker.send_message_payload, talker_id,
+                           conversation_id, msg_type, text=text,
+                           filename=filename, mention_ids=mention_ids,
+                           wait_result=wait_result)
+
+    def scan(self, scan_code: str) -> Optional[Future]:
+        """Mocker.scan from any thread"""
+        return self.submit(self.mocker.scan, scan_code)
+
+    def login(self, user_id: str) -> Optional[Future]:
+        """Mocker.login from any thread"""
+        return self.submit(self.mocker.login, user_id)
+
+    def logout(self) -> Optional[Future]:
+        """Mocker.logout from any thread"""
+        return self.submit(self.mocker.logout)
+
+    def add_contact_to_room(self, contact_ids: Union[str, List[str]],
+                            room_id: str, inviter_id: Optional[str] = None
+                            ) -> Optional[Future]:
+        """Mocker.add_contact_to_room from any thread"""
+        return self.submit(self.mocker.add_contact_to_room, contact_ids,
+                           room_id, inviter_id)
+
+    def remove_contact_from_room(self, contact_ids: Union[str, List[str]],
+                                 room_id: str,
+                                 remover_id: Optional[str] = None
+                                 ) -> Optional[Future]:
+        """Mocker.remove_contact_from_room from any thread"""
+        return self.submit(self.mocker.remove_contact_from_room, contact_ids,
+                           room_id, remover_id)
@@ -0,0 +1,282 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence
+)
+
+from wechaty_puppet import (    # type: ignore
+    EventType,
+    MessagePayload,
+    MessageType,
+    get_logger
+)
+
+from wechaty_puppet_mock.fault import Latency, LogNormalLatency
+from wechaty_puppet_mock.mock.mocker import Mocker, MockerResponse
+
+log = get_logger('SimulatedUser')
+
+# (user, message from bot) -> the reply text, None means no reply
+ReplyPolicy = Callable[['SimulatedUser', MessagePayload], Optional[str]]
+
+
+class FixedReply:
+    """always reply the same text, eg: ding to keep the ding-dong going"""
+
+    def __init__(self, text: str = 'ding'):
+        self.text = text
+
+    def __call__(self, user: SimulatedUser,
+                 payload: MessagePayload) -> Optional[str]:
+        return self.text
+
+
+class ScriptedReply:
+    """reply the texts of the script one by one, and leave the conversation
+    at the end of script if not repeat"""
+
+    def __init__(self, texts: Sequence[str], repeat: bool = True):
+        self.texts = list(texts)
+        self.repeat = repeat
+        self._positions: Dict[str, int] = {}
+
+    def __call__(self, user: SimulatedUser,
+                 payload: MessagePayload) -> Optional[str]:
+        position = self._positions.get(user.contact_id, 0)
+        if position >= len(self.texts):
+            if not self.repeat:
+                return None
+            position = 0
+        self._positions[user.contact_id] = position + 1
+        return self.texts[position]
+
+
+class RandomDrop:
+    """lose the interest with the probability, otherwise reply by the policy"""
+
+    def __init__(self, policy: ReplyPolicy, probability: float):
+        self.policy = policy
+        self.probability = probability
+
+    def __call__(self, user: SimulatedUser,
+                 payload: MessagePayload) -> Optional[str]:
+        if user.random.random() < self.probability:
+            return None
+        return self.policy(user, payload)
+
+
+@dataclass
+class SimulationStats:
+    """the messages between the simulated users and the bot"""
+    sent: int = 0
+    received: int = 0
+    ignored: int = 0
+
+
+class SimulatedUser:
+    """the user bound to a contact, who replies to the bot after thinking
+
+    Args:
+        simulation (UserSimulation): the simulation which routes the messages
+        contact_id (str): the contact of the user
+        room_id (Optional[str]): talk in the room, or talk to the bot directly
+        think_time (Latency): the seconds before the user replies
+        policy (ReplyPolicy): decide what to reply
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, simulation: UserSimulation, contact_id: str,
+                 room_id: Optional[str], think_time: Latency,
+                 policy: ReplyPolicy, seed: Optional[int] = None):
+        self.simulation = simulation
+        self.contact_id = contact_id
+        self.room_id = room_id
+        self.think_time = think_time
+        self.policy = policy
+        self.random = random.Random(
+            None if seed is None else f'{seed}:{contact_id}')
+
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._last_sent_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def conversation_id(self) -> str:
+        """the room, or the login user for the direct chat"""
+        return self.room_id or self.simulation.mocker.login_user_id
+
+    def say(self, text: str):
+        """send the message to the bot"""
+        self.simulation.before_say(self)
+        self._last_sent_at = time.perf_counter()
+        self.simulation.mocker.send_message_payload(
+            talker_id=self.contact_id,
+            conversation_id=self.conversation_id,
+            msg_type=MessageType.MESSAGE_TYPE_TEXT,
+            text=text
+        )
+        self.simulation.stats.sent += 1
+
+    def receive(self, payload: MessagePayload):
+        """the bot replies to the user"""
+        if self._last_sent_at is not None:
+            self.simulation.response_times_ms.append(
+                (time.perf_counter() - self._last_sent_at) * 1000)
+            self._last_sent_at = None
+        self._inbox.put_nowait(payload)
+
+    async def run(self, opening: Optional[str] = None):
+        """say the opening, and reply to the bot until the task cancelled"""
+        if opening is not None:
+            # spread the openings of the users over one think time
+            await asyncio.sleep(self.think_time.sample(self.random))
+            self.say(opening)
+        while True:
+            payload = await self._inbox.get()
+            await asyncio.sleep(self.think_time.sample(self.random))
+            text = self.policy(self, payload)
+            if text is None:
+                self.simulation.stats.ignored += 1
+                continue
+            self.say(text)
+
+
+class UserSimulation:
+    """closed-loop users who talk to the bot, every user is one asyncio task
+
+    the messages sent by the bot are routed to the user of the direct chat,
+    or in the room, to the mentioned users, or the user who has waited for
+    the reply longest.
+
+    Args:
+        mocker (Mocker): the mocker which the users send messages with
+        think_time (Optional[Latency]): the default think time, 1 second in
+            median and long-tailed
+        policy (Optional[ReplyPolicy]): the default policy, reply ding
+        seed (Optional[int]): make the users deterministic
+    """
+
+    def __init__(self, mocker: Mocker, think_time: Optional[Latency] = None,
+                 policy: Optional[ReplyPolicy] = None,
+                 seed: Optional[int] = None, capacity: int = 100000):
+        self.mocker = mocker
+        self.think_time = think_time or LogNormalLatency(median=1.0)
+        self.policy = policy or FixedReply()
+        self.seed = seed
+        self.stats = SimulationStats()
+        self.response_times_ms: Deque[float] = deque(maxlen=capacity)
+
+        self.users: Dict[str, SimulatedUser] = {}
+        self._direct_users: Dict[str, SimulatedUser] = {}
+        self._room_users: Dict[str, Dict[str, SimulatedUser]] = {}
+        # the users in the room who are waiting for the reply, in order
+        self._waiting_users: Dict[str, Deque[SimulatedUser]] = {}
+
+    # pylint: disable=too-many-arguments
+    def add_user(self, contact_id: str, room_id: Optional[str] = None,
+                 think_time: Optional[Latency] = None,
+                 policy: Optional[ReplyPolicy] = None) -> SimulatedUser:
+        """bind the simulated user to the contact"""
+        user = SimulatedUser(self, contact_id, room_id,
+                             think_time or self.think_time,
+                             policy or self.policy, seed=self.seed)
+        key = f'{room_id}:{contact_id}' if room_id else contact_id
+        self.users[key] = user
+        if room_id:
+            self._room_users.setdefault(room_id, {})[contact_id] = user
+        else:
+            self._direct_users[contact_id] = user
+        return user
+
+    def add_users(self, contact_ids: Iterable[str],
+                  room_id: Optional[str] = None) -> List[SimulatedUser]:
+        """bind the simulated users to the contacts"""
+        return [self.add_user(contact_id, room_id)
+                for contact_id in contact_ids]
+
+    def before_say(self, user: SimulatedUser):
+        """remember who is waiting for the reply in the room"""
+        if user.room_id:
+            self._waiting_users.setdefault(user.room_id, deque()).append(user)
+
+    def start(self, opening: Optional[str] = 'ding'):
+        """start the tasks of the users, who say the opening to the bot"""
+        self.mocker.on('stream', self._on_stream)
+        loop = asyncio.get_event_loop()
+        for key, user in self.users.items():
+            if user.task is None or user.task.done():
+                user.task = loop.create_task(user.run(opening))
+                # the task names are only supported since python 3.8
+                if hasattr(user.task, 'set_name'):
+                    user.task.set_name(f'simulated-user-{key}')
+
+    async def stop(self):
+        """cancel the tasks of the users"""
+        self.mocker.remove_listener('stream', self._on_stream)
+        tasks = [user.task for user in self.users.values() if user.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for user in self.users.values():
+            user.task = None
+
+    def _on_stream(self, response: MockerResponse):
+        if response.type != int(EventType.EVENT_TYPE_MESSAGE) or \
+                not self.mocker.has_login:
+            return
+        message_id = json.loads(response.payload)['messageId']
+        payload = self.mocker.environment.get_message_payload(message_id)
+        if payload.from_id != self.mocker.login_user_id:
+            return
+
+        if not payload.room_id:
+            user = self._direct_users.get(payload.to_id)
+            if user:
+                self.stats.received += 1
+                user.receive(payload)
+            return
+
+        room_users = self._room_users.get(payload.room_id, {})
+        waiting_users = self._waiting_users.get(payload.room_id, deque())
+        receivers = [room_users[mention_id]
+                     for mention_id in payload.mention_ids or []
+                     if mention_id in room_users]
+        for user in receivers:
+            if user in waiting_users:
+                waiting_users.remove(user)
+        if not receivers and waiting_users:
+            receivers = [waiting_users.popleft()]
+        for user in receivers:
+            self.stats.received += 1
+            user.receive(payload)
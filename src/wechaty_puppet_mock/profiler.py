@@ -0,0 +1,292 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+
+from wechaty_puppet import get_logger     # type: ignore
+
+log = get_logger('SamplingProfiler')
+
+# the first matched prefix of the module name is the layer of the frame
+DEFAULT_LAYERS: List[Tuple[str, str]] = [
+    ('wechaty_puppet_mock.mock.', 'mocker'),
+    ('wechaty_puppet_mock', 'puppet'),
+    ('wechaty_puppet', 'puppet'),
+    ('wechaty', 'accessory'),
+    ('pyee', 'event_loop'),
+    ('asyncio', 'event_loop'),
+]
+# the loop is waiting for the events
+IDLE_LAYER = 'idle'
+# the code which is not in any layer and not in the installed libraries
+BOT_LAYER = 'bot'
+
+_STDLIB_PATH = os.path.normcase(sysconfig.get_paths()['stdlib'])
+
+
+@dataclass
+class ProfilerOptions:
+    """the options of the sampling profiler
+
+    Args:
+        interval (float): the seconds between two samples
+        output_dir (Optional[str]): write the collapsed stacks and the layer
+            breakdown into the directory when the puppet stops
+        name (str): the prefix of the output files
+        layers (List[Tuple[str, str]]): the module prefix -> layer rules
+        max_depth (int): the max frames of every sampled stack
+    """
+    interval: float = 0.005
+    output_dir: Optional[str] = None
+    name: str = 'profile'
+    layers: List[Tuple[str, str]] = field(
+        default_factory=lambda: list(DEFAULT_LAYERS))
+    max_depth: int = 128
+
+
+@dataclass
+class LayerTime:
+    """the samples attributed to one layer"""
+    samples: int
+    seconds: float
+    ratio: float
+
+
+@dataclass
+class ProfileReport:
+    """the samples of one run"""
+    duration: float
+    samples: int
+    layers: Dict[str, LayerTime]
+    # root first `frame;frame;frame` -> samples, the flamegraph input
+    stacks: Dict[str, int]
+
+    def collapsed(self) -> str:
+        """the collapsed stacks for flamegraph.pl, speedscope and so on"""
+        return ''.join(f'{stack} {count}\n'
+                       for stack, count in sorted(self.stacks.items()))
+
+    def format(self) -> str:
+        """the readable per-layer breakdown"""
+        lines = [f'{self.samples} samples in {self.duration:.3f}s']
+        for layer, layer_time in sorted(self.layers.items(),
+                                        key=lambda item: -item[1].samples):
+            lines.append(f'{layer:>12} {layer_time.ratio:7.2%} '
+                         f'{layer_time.seconds:9.3f}s')
+        return '\n'.join(lines)
+
+    def to_dict(self) -> Dict:
+        """the json-serializable breakdown"""
+        return {
+            'duration': self.duration,
+            'samples': self.samples,
+            'layers': {
+                layer: {'samples': layer_time.samples,
+                        'seconds': layer_time.seconds,
+                        'ratio': layer_time.ratio}
+                for layer, layer_time in self.layers.items()
+            }
+        }
+
+
+class SamplingProfiler:
+    """sample the stack of the event loop thread from a daemon thread
+
+    a sample only keeps the code objects of the stack, the names and layers
+    are resolved once per code object when the report is built, so the
+    sampling thread holds the GIL as short as possible.
+
+    every sample is attributed to the innermost frame which is in a layer or
+    in the bot code: the libraries like json or faker are charged to their
+    caller, and the samples where the loop waits in the selector are idle.
+    The bot which is installed as a package needs its own layer rule.
+    """
+
+    def __init__(self, options: Optional[ProfilerOptions] = None):
+        self.options = options or ProfilerOptions()
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._target_thread_id: Optional[int] = None
+        self._start_time = 0.0
+        self._duration = 0.0
+        self._code_info: Dict[CodeType, Tuple[str, Optional[str]]] = {}
+
+    @property
+    def running(self) -> bool:
+        """the profiler is sampling"""
+        return self._thread is not None
+
+    def start(self, thread_id: Optional[int] = None):
+        """start sampling the thread, the current one by default"""
+        if self.running:
+            return
+        self._target_thread_id = thread_id or threading.get_ident()
+        self._stopped.clear()
+        self._start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_forever,
+                                        daemon=True,
+                                        name='wechaty-mock-profiler')
+        self._thread.start()
+
+    def stop(self) -> ProfileReport:
+        """stop sampling and build the report"""
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+            self._duration += time.perf_counter() - self._start_time
+        return self.report()
+
+    def _sample_forever(self):
+        while not self._stopped.wait(self.options.interval):
+            # pylint: disable=protected-access
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is not None:
+                self.sample(frame)
+
+    def sample(self, frame: Optional[FrameType]):
+        """record the stack which ends with the frame"""
+        codes = []
+        depth = self.options.max_depth
+        while frame is not None and depth:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+            depth -= 1
+        self._stacks[tuple(codes)] += 1
+        self._samples += 1
+
+    def _get_code_info(self, code: CodeType) -> Tuple[str, Optional[str]]:
+        """the label and layer of the code, None layer for libraries"""
+        info = self._code_info.get(code)
+        if info is not None:
+            return info
+        module = _module_name(code)
+        layer: Optional[str] = None
+        for prefix, prefix_layer in self.options.layers:
+            if module == prefix or module.startswith(prefix) and (
+                    prefix.endswith('.') or module[len(prefix)] == '.'):
+                layer = prefix_layer
+                break
+        if layer is None and not _is_library(code.co_filename):
+            layer = BOT_LAYER
+        info = self._code_info[code] = (f'{module}:{code.co_name}', layer)
+        return info
+
+    def _get_layer(self, codes: Tuple[CodeType, ...]) -> str:
+        if codes and os.path.basename(codes[0].co_filename) == 'selectors.py':
+            return IDLE_LAYER
+        for code in codes:
+            layer = self._get_code_info(code)[1]
+            if layer is not None:
+                return layer
+        return 'event_loop'
+
+    def report(self) -> ProfileReport:
+        """the per-layer breakdown and the collapsed stacks so far"""
+        duration = self._duration
+        if self._thread is not None:
+            duration += time.perf_counter() - self._start_time
+        seconds_per_sample = duration / self._samples if self._samples \
+            else 0.0
+
+        layer_samples: Counter = Counter()
+        stacks: Counter = Counter()
+        for codes, count in list(self._stacks.items()):
+            layer_samples[self._get_layer(codes)] += count
+            stack = ';'.join(self._get_code_info(code)[0]
+                             for code in reversed(codes))
+            stacks[stack] += count
+
+        return ProfileReport(
+            duration=duration,
+            samples=self._samples,
+            layers={
+                layer: LayerTime(samples=count,
+                                 seconds=count * seconds_per_sample,
+                                 ratio=count / self._samples)
+                for layer, count in layer_samples.items()
+            },
+            stacks=dict(stacks)
+        )
+
+    def write(self, output_dir: str,
+              report: Optional[ProfileReport] = None) -> List[str]:
+        """write `<name>.collapsed` and `<name>.layers.json` into the dir
+
+        Returns:
+            List[str]: the paths of the files
+        """
+        report = report or self.report()
+        os.makedirs(output_dir, exist_ok=True)
+        collapsed_path = os.path.join(output_dir,
+                                      f'{self.options.name}.collapsed')
+        with open(collapsed_path, 'w', encoding='utf-8') as file:
+            file.write(report.collapsed())
+        layers_path = os.path.join(output_dir,
+                                   f'{self.options.name}.layers.json')
+        with open(layers_path, 'w', encoding='utf-8') as file:
+            json.dump(report.to_dict(), file, indent=2)
+        return [collapsed_path, layers_path]
+
+
+def _module_name(code: CodeType) -> str:
+    """the module of the code from its file, the frame globals are gone
+    when the report is built"""
+    filename = code.co_filename
+    if filename.startswith('<'):
+        return filename
+    path = os.path.normcase(os.path.abspath(filename))
+    for entry in sorted(sys.path, key=len, reverse=True):
+        if not entry:
+            continue
+        root = os.path.normcase(os.path.abspath(entry)) + os.sep
+        if path.startswith(root):
+            module_path = os.path.splitext(path[len(root):])[0]
+            parts = module_path.split(os.sep)
+            if parts[-1] == '__init__':
+                parts.pop()
+            return '.'.join(parts)
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def _is_library(filename: str) -> bool:
+    """the standard library or the installed packages"""
+    if filename.startswith('<'):
+        return True
+    path = os.path.normcase(os.path.abspath(filename))
+    return path.startswith(_STDLIB_PATH) or 'site-packages' in path or \
+        'dist-packages' in path
@@ -19,19 +19,23 @@ limitations under the License.
 """
 from __future__ import annotations
 
-from typing import List, Optional, Union
-from dataclasses import dataclass
+import asyncio
+import time
+import weakref
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from dataclasses import asdict, dataclass
 import json
 from pyee import AsyncIOEventEmitter    # type: ignore
 
-from wechaty import Contact, Room   # type: ignore
-
 from wechaty_puppet import (    # type: ignore
     Puppet, FileBox, RoomQueryFilter,
     MiniProgramPayload, UrlLinkPayload, MessageQueryFilter,
     PuppetOptions, EventType,
     get_logger,
-    EventMessagePayload)
+    EventMessagePayload,
+    EventFriendshipPayload,
+    EventRoomJoinPayload,
+    EventRoomLeavePayload)
 from wechaty_puppet.schemas.types import (  # type: ignore
     MessagePayload,
     ContactPayload,
@@ -39,19 +43,63 @@ from wechaty_puppet.schemas.types import (  # type: ignore
     ImageType,
     RoomInvitationPayload,
     RoomPayload,
-    RoomMemberPayload
+    RoomMemberPayload,
+    PayloadType,
+    MessageType
 )
 from wechaty_puppet_mock.exceptions import WechatyPuppetMockError
+from wechaty_puppet_mock.fault import FaultInjector
+from wechaty_puppet_mock.loop_monitor import LoopMonitor, LoopMonitorOptions
+from wechaty_puppet_mock.profiler import (
+    ProfileReport,
+    ProfilerOptions,
+    SamplingProfiler
+)
+from wechaty_puppet_mock.send_queue import SendQueue, SendQueueOptions
+from wechaty_puppet_mock.memory import listener_counts, pending_tasks_by_owner
+from wechaty_puppet_mock.metrics import (
+    METRICS,
+    Collector,
+    Gauge,
+    MetricsRegistry,
+    MockMetrics
+)
+from wechaty_puppet_mock.mock.environment import IdPage, VersionedPayload
+from wechaty_puppet_mock.mock.journal import ReplayStats
 from wechaty_puppet_mock.mock.mocker import Mocker, MockerResponse
 
 
 log = get_logger('PuppetMock')
 
+# the api of fault injection for every kind of sent message
+SEND_APIS: Dict[MessageType, str] = {
+    MessageType.MESSAGE_TYPE_TEXT: 'message_send_text',
+    MessageType.MESSAGE_TYPE_CONTACT: 'message_send_contact',
+    MessageType.MESSAGE_TYPE_ATTACHMENT: 'message_send_file',
+    MessageType.MESSAGE_TYPE_URL: 'message_send_url',
+    MessageType.MESSAGE_TYPE_MINI_PROGRAM: 'message_send_mini_program',
+}
+
 
 @dataclass
 class PuppetMockOptions(PuppetOptions):
     """options for puppet mock"""
     mocker: Optional[Mocker] = None
+    fault_injector: Optional[FaultInjector] = None
+    send_queue: Optional[SendQueueOptions] = None
+    loop_monitor: Optional[LoopMonitorOptions] = None
+    profiler: Optional[ProfilerOptions] = None
+    # report to the own registry instead of the global `REGISTRY`
+    metrics_registry: Optional[MetricsRegistry] = None
+
+
+@dataclass
+class EventDirtyPayload:
+    """the payload of dirty event, which is not in wechaty-puppet yet, the
+    payload_id is empty when all of the payloads of the type are dirty"""
+    payload_type: PayloadType
+    payload_id: str
+    version: int
 
 
 # pylint: disable=too-many-public-methods
@@ -63,9 +111,30 @@ class PuppetMock(Puppet):
         if not options.mocker:
             raise WechatyPuppetMockError('mocker in options is required')
         self.mocker: Mocker = options.mocker
+        self.metrics: MockMetrics = METRICS
+        if options.metrics_registry:
+            self.metrics = MockMetrics(options.metrics_registry)
+        self.mocker.use_metrics(self.metrics)
+        self.fault_injector: Optional[FaultInjector] = options.fault_injector
+        self.send_queue: Optional[SendQueue] = None
+        if options.send_queue:
+            self.send_queue = SendQueue(self._deliver, options.send_queue,
+                                        self.metrics)
+        self.loop_monitor: Optional[LoopMonitor] = None
+        if options.loop_monitor:
+            self.loop_monitor = LoopMonitor(options.loop_monitor, self.metrics)
+        self.profiler: Optional[SamplingProfiler] = None
+        if options.profiler:
+            self.profiler = SamplingProfiler(options.profiler)
+        self.profile_report: Optional[ProfileReport] = None
 
         self.started: bool = False
         self.emitter = AsyncIOEventEmitter()
+        # the gauges and the collectors of this puppet, removed on stop
+        self._metric_collectors: List[Tuple[Gauge, Collector]] = []
+        # the sequence of the last journaled event which is emitted
+        self.journal_cursor: int = 0
+        self._replay_buffer: Optional[List[MockerResponse]] = None
 
     async def message_image(self, message_id: str,
                             image_type: ImageType) -> FileBox:
@@ -91,92 +160,311 @@ class PuppetMock(Puppet):
                 'PuppetMock should not start without mocker'
             )
 
-        def _emit_events(response: MockerResponse):
-            """emit the events from the mocker"""
-            payload_data = json.loads(response.payload)
+        self.mocker.on('stream', self._on_stream)
+        self._register_metrics()
+        if self.loop_monitor:
+            self.loop_monitor.start()
+        if self.profiler:
+            self.profiler.start()
+
+    def _on_stream(self, response: MockerResponse):
+        """emit the live event, the events are held back while the journal
+        is replayed, and the ones which have been replayed are skipped"""
+        if self._replay_buffer is not None:
+            self._replay_buffer.append(response)
+            return
+        if response.seq:
+            if response.seq <= self.journal_cursor:
+                return
+            self.journal_cursor = response.seq
+        self._emit_events(response)
+
+    def _emit_events(self, response: MockerResponse):
+        """emit the events from the mocker"""
+        payload_data = json.loads(response.payload)
+
+        if response.type == int(EventType.EVENT_TYPE_MESSAGE):
+            log.debug('receive message info <%s>', payload_data)
+            event_message_payload = EventMessagePayload(
+                message_id=payload_data['messageId'])
+            self.emitter.emit('message', event_message_payload)
+
+        elif response.type == int(EventType.EVENT_TYPE_DIRTY):
+            log.debug('receive dirty info <%s>', payload_data)
+            event_dirty_payload = EventDirtyPayload(
+                payload_type=PayloadType(payload_data['payloadType']),
+                payload_id=payload_data['payloadId'],
+                version=payload_data['version']
+            )
+            self.emitter.emit('dirty', event_dirty_payload)
+
+        elif response.type == int(EventType.EVENT_TYPE_FRIENDSHIP):
+            log.debug('receive friendship info <%s>', payload_data)
+            event_friendship_payload = EventFriendshipPayload(
+                friendship_id=payload_data['friendshipId'])
+            self.emitter.emit('friendship', event_friendship_payload)
+
+        elif response.type == int(EventType.EVENT_TYPE_ROOM_JOIN):
+            log.debug('receive room-join info <%s>', payload_data)
+            event_room_join_payload = EventRoomJoinPayload(
+                invited_ids=payload_data['inviteeIdList'],
+                inviter_id=payload_data['inviterId'],
+                room_id=payload_data['roomId'],
+                timestamp=payload_data['timestamp']
+            )
+            self.emitter.emit('room-join', event_room_join_payload)
+
+        elif response.type == int(EventType.EVENT_TYPE_ROOM_LEAVE):
+            log.debug('receive room-leave info <%s>', payload_data)
+            event_room_leave_payload = EventRoomLeavePayload(
+                removed_ids=payload_data['removeeIdList'],
+                remover_id=payload_data['removerId'],
+                room_id=payload_data['roomId'],
+                timestamp=payload_data['timestamp']
+            )
+            self.emitter.emit('room-leave', event_room_leave_payload)
 
-            if response.type == int(EventType.EVENT_TYPE_MESSAGE):
-                log.debug('receive message info <%s>', payload_data)
-                event_message_payload = EventMessagePayload(
-                    message_id=payload_data['messageId'])
-                self.emitter.emit('message', event_message_payload)
+    async def replay_journal(self, after_seq: int,
+                             chunk_size: int = 1000) -> ReplayStats:
+        """replay the events in the journal of mocker after the cursor, eg:
+        the journal_cursor of the crashed puppet, then go on with the live
+        events
 
-        self.mocker.on('stream', _emit_events)
+        the events are emitted as fast as possible, and the loop is yielded
+        every chunk_size events, so the bot handles them meanwhile.
+
+        Returns:
+            ReplayStats: the count of events and the seconds to catch up
+        """
+        journal = self.mocker.journal
+        if journal is None:
+            raise WechatyPuppetMockError('mocker has no journal to replay')
+        if self._replay_buffer is not None:
+            raise WechatyPuppetMockError('the journal is being replayed')
+
+        log.info('replay the journal <%s> after <%s>', journal.path,
+                 after_seq)
+        stats = ReplayStats(from_seq=after_seq)
+        start_time = time.perf_counter()
+        self.journal_cursor = after_seq
+        self._replay_buffer = []
+        try:
+            for entry in journal.read(after_seq):
+                self.journal_cursor = entry.seq
+                self._emit_events(MockerResponse(
+                    type=entry.type, payload=entry.payload, seq=entry.seq))
+                stats.replayed += 1
+                if stats.replayed % chunk_size == 0:
+                    await asyncio.sleep(0)
+        finally:
+            buffered, self._replay_buffer = self._replay_buffer, None
+        stats.buffered = len(buffered)
+        for response in buffered:
+            self._on_stream(response)
+        stats.seconds = time.perf_counter() - start_time
+        return stats
+
+    def _register_metrics(self):
+        """collect the listener counts and pending tasks on export, the
+        metrics endpoint runs in another thread, so the loop is captured"""
+        if self._metric_collectors:
+            return
+        puppet_ref = weakref.ref(self)
+        loop = asyncio.get_event_loop()
+
+        def _collect_listeners() -> Dict[Tuple[str, ...], float]:
+            puppet = puppet_ref()
+            if puppet is None:
+                return {}
+            values: Dict[Tuple[str, ...], float] = {}
+            for emitter_name, emitter in (('mocker', puppet.mocker),
+                                          ('puppet', puppet.emitter)):
+                for event, count in listener_counts(emitter).items():
+                    values[(emitter_name, event)] = count
+            return values
+
+        def _collect_pending_tasks() -> Dict[Tuple[str, ...], float]:
+            if puppet_ref() is None or loop.is_closed():
+                return {}
+            return {(owner,): count for owner, count
+                    in pending_tasks_by_owner(loop).items()}
+
+        self._metric_collectors = [
+            (self.metrics.listeners, _collect_listeners),
+            (self.metrics.pending_tasks, _collect_pending_tasks)]
+        for gauge, collector in self._metric_collectors:
+            gauge.add_collector(collector)
+
+    def _unregister_metrics(self):
+        """remove the collectors, the stopped puppet is not exported"""
+        for gauge, collector in self._metric_collectors:
+            gauge.remove_collector(collector)
+        self._metric_collectors = []
 
     async def stop(self):
         """stop the account"""
         self.started = False
+        if self._on_stream in self.mocker.listeners('stream'):
+            self.mocker.remove_listener('stream', self._on_stream)
+        self._unregister_metrics()
+        if self.loop_monitor:
+            self.loop_monitor.stop()
+        if self.send_queue:
+            await self.send_queue.close()
+        if self.profiler and self.profiler.running:
+            self.profile_report = self.profiler.stop()
+            log.info('profile of the run:\n%s', self.profile_report.format())
+            if self.profiler.options.output_dir:
+                self.profiler.write(self.profiler.options.output_dir,
+                                    self.profile_report)
 
     async def contact_list(self) -> List[str]:
         """get all of the contact"""
-        return self.mocker.get_contact_ids()
+        return self.mocker.environment.get_contact_ids(limit=None).ids
+
+    async def contact_list_page(self, cursor: int = 0,
+                                limit: int = 1000) -> IdPage:
+        """get one page of contact ids, pass the next_cursor of the page to
+        get the next page"""
+        return self.mocker.environment.get_contact_ids(cursor, limit)
+
+    async def iter_contact_list(self, chunk_size: int = 1000
+                                ) -> AsyncIterator[List[str]]:
+        """iterate the contact ids in chunks"""
+        for contact_ids in self.mocker.environment.iter_contact_ids(
+                chunk_size):
+            yield contact_ids
+            # let the other tasks run between the chunks
+            await asyncio.sleep(0)
+
+    async def iter_contact_payloads(self, chunk_size: int = 1000
+                                    ) -> AsyncIterator[List[ContactPayload]]:
+        """iterate the contact payloads in chunks"""
+        environment = self.mocker.environment
+        async for contact_ids in self.iter_contact_list(chunk_size):
+            yield [environment.get_contact_payload(contact_id)
+                   for contact_id in contact_ids]
 
     async def tag_contact_delete(self, tag_id: str) -> None:
-        pass
+        """delete the contact tag"""
+        self.mocker.environment.delete_tag(tag_id)
 
     async def tag_favorite_delete(self, tag_id: str) -> None:
-        pass
+        """delete the favorite tag"""
+        self.mocker.environment.delete_tag(tag_id, favorite=True)
 
     async def tag_contact_add(self, tag_id: str, contact_id: str):
-        pass
+        """add the tag to contact"""
+        self.mocker.environment.add_contact_tag(tag_id, contact_id)
 
     async def tag_favorite_add(self, tag_id: str, contact_id: str):
-        pass
+        """add the favorite tag to contact"""
+        self.mocker.environment.add_contact_tag(tag_id, contact_id,
+                                                favorite=True)
 
     async def tag_contact_remove(self, tag_id: str, contact_id: str):
-        pass
+        """remove the tag from contact"""
+        self.mocker.environment.remove_contact_tag(tag_id, contact_id)
 
     async def tag_contact_list(self,
                                contact_id: Optional[str] = None) -> List[str]:
-        pass
+        """get all of the tag ids, or the tag ids of the contact"""
+        return self.mocker.environment.get_tag_ids(contact_id)
+
+    async def tag_contact_query(self,
+                                all_of: Optional[List[str]] = None,
+                                any_of: Optional[List[str]] = None,
+                                none_of: Optional[List[str]] = None
+                                ) -> List[str]:
+        """get the contact ids by tags, eg: tagged A and B but not C"""
+        return self.mocker.environment.query_tagged_contact_ids(
+            all_of=all_of, any_of=any_of, none_of=none_of)
+
+    async def _send(self, conversation_id: str, msg_type: MessageType,
+                    text: str = '', filename: str = '',
+                    mention_ids: Optional[List[str]] = None) -> str:
+        """send all kinds of message by login user, through the send queue
+        if it's configured"""
+        if self.fault_injector:
+            await self.fault_injector.inject(SEND_APIS[msg_type])
+        if self.send_queue:
+            return await self.send_queue.put(conversation_id, msg_type,
+                                             text, filename, mention_ids)
+        return self._deliver(conversation_id, msg_type, text, filename,
+                             mention_ids)
+
+    def _deliver(self, conversation_id: str, msg_type: MessageType,
+                 text: str = '', filename: str = '',
+                 mention_ids: Optional[List[str]] = None) -> str:
+        """deliver the message to the mocker at once"""
+        return self.mocker.send_message_payload(
+            talker_id=self.self_id(),
+            conversation_id=conversation_id,
+            msg_type=msg_type,
+            text=text,
+            filename=filename,
+            mention_ids=mention_ids
+        )
 
     async def message_send_text(self, conversation_id: str, message: str,
                                 mention_ids: List[str] = None) -> str:
         """send the text message to the specific contact/room"""
-
-        conversation: Union[Room, Contact]
-        if conversation_id.startswith('room-'):
-            conversation = self.mocker.Room.load(conversation_id)
-        else:
-            conversation = self.mocker.Contact.load(conversation_id)
-        message_id = self.mocker.send_message(
-            talker=self.mocker.login_user,
-            conversation=conversation,
-            msg=message
-        )
-        return message_id
+        return await self._send(conversation_id,
+                                MessageType.MESSAGE_TYPE_TEXT,
+                                text=message, mention_ids=mention_ids)
 
     async def message_send_contact(self, contact_id: str,
                                    conversation_id: str) -> str:
-        pass
+        """send the contact card, which is saved in text field"""
+        return await self._send(conversation_id,
+                                MessageType.MESSAGE_TYPE_CONTACT,
+                                text=contact_id)
 
     async def message_send_file(self, conversation_id: str,
                                 file: FileBox) -> str:
-        pass
+        """send the file, the file-box json is saved in text field"""
+        return await self._send(conversation_id,
+                                MessageType.MESSAGE_TYPE_ATTACHMENT,
+                                text=file.to_json_str(), filename=file.name)
 
     async def message_send_url(self, conversation_id: str, url: str) -> str:
-        pass
+        """send the url link, which is saved in text field"""
+        return await self._send(conversation_id,
+                                MessageType.MESSAGE_TYPE_URL, text=url)
 
     async def message_send_mini_program(self,
                                         conversation_id: str,
                                         mini_program: MiniProgramPayload
                                         ) -> str:
-        pass
+        """send the mini-program, the json data is saved in text field"""
+        return await self._send(conversation_id,
+                                MessageType.MESSAGE_TYPE_MINI_PROGRAM,
+                                text=json.dumps(asdict(mini_program)))
 
     async def message_search(self, query: Optional[MessageQueryFilter] = None
                              ) -> List[str]:
         pass
 
     async def message_recall(self, message_id: str) -> bool:
-        pass
+        """recall the message, which will emit the recalled message event"""
+        return self.mocker.recall_message(message_id)
 
     async def message_payload(self, message_id: str) -> MessagePayload:
         """get the message payload"""
+        if self.fault_injector:
+            await self.fault_injector.inject('message_payload')
         return self.mocker.environment.get_message_payload(
             message_id=message_id)
 
-    async def message_forward(self, to_id: str, message_id: str):
-        pass
+    async def message_forward(self, to_id: str, message_id: str) -> str:
+        """forward the message to the contact/room"""
+        if self.fault_injector:
+            await self.fault_injector.inject('message_forward')
+        return self.mocker.forward_message(
+            talker_id=self.self_id(),
+            conversation_id=to_id,
+            message_id=message_id
+        )
 
     async def message_file(self, message_id: str) -> FileBox:
         """get the file-box from message instance
@@ -200,10 +488,18 @@ class PuppetMock(Puppet):
         return message_payload.text
 
     async def message_url(self, message_id: str) -> UrlLinkPayload:
-        """get the url link """
+        """get the url link, which is saved in text field"""
+        message_payload = self.mocker.environment.get_message_payload(
+            message_id=message_id
+        )
+        return UrlLinkPayload(url=message_payload.text)
 
     async def message_mini_program(self, message_id: str) -> MiniProgramPayload:
-        pass
+        """get the mini-program, which is saved in text field"""
+        message_payload = self.mocker.environment.get_message_payload(
+            message_id=message_id
+        )
+        return MiniProgramPayload(**json.loads(message_payload.text))
 
     async def contact_alias(self, contact_id: str,
                             alias: Optional[str] = None) -> str:
@@ -217,10 +513,34 @@ class PuppetMock(Puppet):
         return alias
 
     async def contact_payload_dirty(self, contact_id: str):
-        pass
+        """mark the contact payload dirty, which will emit the dirty event"""
+        await self.dirty_payload(PayloadType.PAYLOAD_TYPE_CONTACT, contact_id)
+
+    async def dirty_payload(self, payload_type: PayloadType, payload_id: str):
+        """mark the payload dirty, which will emit the dirty event"""
+        self.mocker.environment.mark_payload_dirty(payload_type, payload_id)
+
+    async def payload_version(self, payload_type: PayloadType,
+                              payload_id: str) -> int:
+        """get the current version of the contact/room/message payload"""
+        return self.mocker.environment.get_payload_version(
+            payload_type, payload_id)
+
+    async def payload_if_newer(self, payload_type: PayloadType,
+                               payload_id: str, version: int
+                               ) -> Optional[VersionedPayload]:
+        """get the payload only if it's newer than the cached version
+
+        Returns:
+            Optional[VersionedPayload]: None if the cached one is up to date
+        """
+        return self.mocker.environment.get_payload_if_newer(
+            payload_type, payload_id, version)
 
     async def contact_payload(self, contact_id: str) -> ContactPayload:
         """get the contact payload"""
+        if self.fault_injector:
+            await self.fault_injector.inject('contact_payload')
         return self.mocker.environment.get_contact_payload(contact_id)
 
     async def contact_avatar(self, contact_id: str,
@@ -237,30 +557,59 @@ class PuppetMock(Puppet):
         self.mocker.environment.update_contact_payload(contact_payload)
 
     async def contact_tag_ids(self, contact_id: str) -> List[str]:
-        pass
+        """get the tag ids of the contact"""
+        return self.mocker.environment.get_tag_ids(contact_id)
 
     def self_id(self) -> str:
-        return self.mocker.login_user.contact_id
+        return self.mocker.login_user_id
 
     async def friendship_search(self, weixin: Optional[str] = None,
                                 phone: Optional[str] = None) -> Optional[str]:
-        pass
+        """search the contact id by weixin or phone"""
+        return self.mocker.environment.search_contact_id(
+            weixin=weixin, phone=phone)
 
     async def friendship_add(self, contact_id: str, hello: str):
-        pass
+        """send the friendship request to the contact"""
+        self.mocker.add_friendship(contact_id=contact_id, hello=hello)
 
     async def friendship_payload(self, friendship_id: str,
                                  payload: Optional[FriendshipPayload] = None
                                  ) -> FriendshipPayload:
-        pass
+        """get/save the friendship payload"""
+        if payload:
+            self.mocker.environment.update_friendship_payload(payload)
+            return payload
+        return self.mocker.environment.get_friendship_payload(friendship_id)
 
     async def friendship_accept(self, friendship_id: str):
-        pass
+        """accept the friendship request"""
+        self.mocker.accept_friendship(friendship_id)
 
     async def room_list(self) -> List[str]:
         """get the room id list"""
-        rooms = self.mocker.environment.get_room_payloads()
-        return [room.id for room in rooms]
+        return self.mocker.environment.get_room_ids(limit=None).ids
+
+    async def room_list_page(self, cursor: int = 0,
+                             limit: int = 1000) -> IdPage:
+        """get one page of room ids, pass the next_cursor of the page to
+        get the next page"""
+        return self.mocker.environment.get_room_ids(cursor, limit)
+
+    async def iter_room_list(self, chunk_size: int = 1000
+                             ) -> AsyncIterator[List[str]]:
+        """iterate the room ids in chunks"""
+        for room_ids in self.mocker.environment.iter_room_ids(chunk_size):
+            yield room_ids
+            await asyncio.sleep(0)
+
+    async def iter_room_payloads(self, chunk_size: int = 1000
+                                 ) -> AsyncIterator[List[RoomPayload]]:
+        """iterate the room payloads in chunks"""
+        environment = self.mocker.environment
+        async for room_ids in self.iter_room_list(chunk_size):
+            yield [environment.get_room_payload(room_id)
+                   for room_id in room_ids]
 
     async def room_create(self, contact_ids: List[str],
                           topic: str = None) -> str:
@@ -295,6 +644,8 @@ class PuppetMock(Puppet):
 
     async def room_payload(self, room_id: str) -> RoomPayload:
         """get the room payload"""
+        if self.fault_injector:
+            await self.fault_injector.inject('room_payload')
         return self.mocker.environment.get_room_payload(room_id)
 
     async def room_members(self, room_id: str) -> List[str]:
@@ -306,9 +657,7 @@ class PuppetMock(Puppet):
         Returns:
             List[str]: room member ids
         """
-        room_payload: RoomPayload = self.mocker.environment.get_room_payload(
-            room_id)
-        return room_payload.member_ids
+        return self.mocker.environment.get_room_member_ids(room_id)
 
     async def room_add(self, room_id: str, contact_id: str):
         """add a contact to a room"""
@@ -318,7 +667,11 @@ class PuppetMock(Puppet):
         )
 
     async def room_delete(self, room_id: str, contact_id: str):
-        pass
+        """remove the contact from the room"""
+        self.mocker.remove_contact_from_room(
+            contact_ids=[contact_id],
+            room_id=room_id
+        )
 
     async def room_quit(self, room_id: str):
         pass
@@ -335,7 +688,17 @@ class PuppetMock(Puppet):
 
     async def room_member_payload(self, room_id: str,
                                   contact_id: str) -> RoomMemberPayload:
-        pass
+        """get the room member payload from the member store"""
+        record = self.mocker.environment.get_room_member(room_id, contact_id)
+        contact_payload = self.mocker.environment.get_contact_payload(
+            contact_id)
+        return RoomMemberPayload(
+            id=contact_id,
+            room_alias=record.room_alias,
+            inviter_id=record.inviter_id,
+            avatar=contact_payload.avatar,
+            name=contact_payload.name
+        )
 
     async def room_avatar(self, room_id: str) -> FileBox:
         pass
@@ -0,0 +1,273 @@
+"""
+Code Generator - https://github.com/wj-Mcat/python-wechaty-puppet-mock
+
+Authors:    Jingjing WU (吴京京) <https://github.com/wj-Mcat>
+
+2020-now @ Copyright wj-Mcat
+
+Licensed under the Apache License, Version 2.0 (the 'License');
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an 'AS IS' BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple
+)
+
+from wechaty_puppet import MessageType, get_logger     # type: ignore
+
+from wechaty_puppet_mock.metrics import METRICS, MockMetrics
+
+log = get_logger('SendQueue')
+
+SEND_QUEUE_WAIT_SECONDS = METRICS.send_queue_wait_seconds
+SEND_QUEUE_DEPTH = METRICS.send_queue_depth
+
+# (conversation_id, msg_type, text, filename, mention_ids) -> message_id
+Sender = Callable[[str, MessageType, str, str, Optional[List[str]]], str]
+
+
+@dataclass
+class SendQueueOptions:
+    """the pacing of the outbound messages
+
+    Args:
+        global_interval (float): the min seconds between two sends of the bot
+        conversation_interval (float): the min seconds between two sends to
+            the same conversation
+        coalesce (bool): merge the consecutive text messages waiting for the
+            same conversation into one message
+        coalesce_separator (str): the separator of the merged texts
+        max_coalesce (int): the max count of texts merged into one message
+    """
+    global_interval: float = 0.0
+    conversation_interval: float = 0.0
+    coalesce: bool = False
+    coalesce_separator: str = '\n'
+    max_coalesce: int = 10
+
+
+@dataclass
+class SendRequest:
+    """one outbound message waiting in the queue"""
+    conversation_id: str
+    msg_type: MessageType
+    text: str
+    filename: str
+    mention_ids: Optional[List[str]]
+    enqueued_at: float
+    future: asyncio.Future = field(repr=False)
+
+
+@dataclass
+class SendQueueStats:
+    """the delivery of the send queue"""
+    enqueued: int = 0
+    delivered: int = 0
+    coalesced: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """the mean seconds of the messages waiting in the queue"""
+        return self.total_wait / self.delivered if self.delivered else 0.0
+
+
+class SendQueue:
+    """the per-conversation queues behind one global pacer
+
+    one dispatcher task serves all of the conversations: the conversations
+    with pending messages are kept in a heap by the time they are allowed to
+    send again, so thousands of conversations don't need thousands of tasks.
+    """
+
+    def __init__(self, sender: Sender,
+                 options: Optional[SendQueueOptions] = None,
+                 metrics: Optional[MockMetrics] = None):
+        self._sender = sender
+        self.options = options or SendQueueOptions()
+        self.metrics = metrics or METRICS
+        self.stats = SendQueueStats()
+
+        self._queues: Dict[str, Deque[SendRequest]] = {}
+        # (ready time, sequence, conversation id) of the queued conversations
+        self._ready: List[Tuple[float, int, str]] = []
+        self._sequence = 0
+        self._last_sent: Dict[str, float] = {}
+        self._next_send_time = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        queue_ref = weakref.ref(self)
+
+        def _collect_depth() -> Dict[Tuple[str, ...], float]:
+            queue = queue_ref()
+            return {(): queue.depth()} if queue else {}
+
+        self._collect_depth = _collect_depth
+        self._collecting = False
+        self._start_collecting()
+
+    def _start_collecting(self):
+        """collect the depth until the queue is closed"""
+        if not self._collecting:
+            self.metrics.send_queue_depth.add_collector(self._collect_depth)
+            self._collecting = True
+
+    def depth(self, conversation_id: Optional[str] = None) -> int:
+        """the count of messages waiting, in the conversation if specified"""
+        if conversation_id is not None:
+            return len(self._queues.get(conversation_id, ()))
+        return sum(len(queue) for queue in list(self._queues.values()))
+
+    async def put(self, conversation_id: str, msg_type: MessageType,
+                  text: str = '', filename: str = '',
+                  mention_ids: Optional[List[str]] = None) -> str:
+        """queue the message and wait for it to be delivered
+
+        Returns:
+            str: the message id, the coalesced texts share the same id
+        """
+        loop = asyncio.get_event_loop()
+        if self._task is None or self._task.done():
+            # the closed queue is restarted by the next message
+            self._start_collecting()
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._dispatch())
+
+        request = SendRequest(
+            conversation_id=conversation_id,
+            msg_type=msg_type,
+            text=text,
+            filename=filename,
+            mention_ids=mention_ids,
+            enqueued_at=loop.time(),
+            future=loop.create_future()
+        )
+        self.stats.enqueued += 1
+        queue = self._queues.get(conversation_id)
+        if queue is None:
+            queue = self._queues[conversation_id] = deque()
+            ready_time = self._last_sent.get(conversation_id, 0.0) + \
+                self.options.conversation_interval
+            self._push_ready(ready_time, conversation_id)
+        queue.append(request)
+        return await request.future
+
+    async def close(self):
+        """stop the dispatcher, the waiting messages are cancelled"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queue in self._queues.values():
+            for request in queue:
+                request.future.cancel()
+        self._queues.clear()
+        self._ready.clear()
+        if self._collecting:
+            self.metrics.send_queue_depth.remove_collector(self._collect_depth)
+            self._collecting = False
+
+    def _push_ready(self, ready_time: float, conversation_id: str):
+        self._sequence += 1
+        heapq.heappush(self._ready,
+                       (ready_time, self._sequence, conversation_id))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _take(self, queue: Deque[SendRequest]) -> List[SendRequest]:
+        """take the next message, and the texts can be coalesced with it"""
+        batch = [queue.popleft()]
+        if not self.options.coalesce or \
+                batch[0].msg_type != MessageType.MESSAGE_TYPE_TEXT:
+            return batch
+        while queue and len(batch) < self.options.max_coalesce and \
+                queue[0].msg_type == MessageType.MESSAGE_TYPE_TEXT:
+            batch.append(queue.popleft())
+        return batch
+
+    def _deliver(self, batch: List[SendRequest], now: float):
+        first = batch[0]
+        text, mention_ids = first.text, first.mention_ids
+        if len(batch) > 1:
+            text = self.options.coalesce_separator.join(
+                request.text for request in batch)
+            mention_ids = list(dict.fromkeys(
+                mention_id for request in batch
+                for mention_id in request.mention_ids or []))
+            self.stats.coalesced += len(batch) - 1
+        try:
+            message_id = self._sender(first.conversation_id, first.msg_type,
+                                      text, first.filename, mention_ids)
+        except Exception as e:    # pylint: disable=broad-except
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        for request in batch:
+            wait = now - request.enqueued_at
+            self.stats.delivered += 1
+            self.stats.total_wait += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+            self.metrics.send_queue_wait_seconds.observe(wait)
+            if not request.future.done():
+                request.future.set_result(message_id)
+
+    async def _dispatch(self):
+        loop = asyncio.get_event_loop()
+        assert self._wakeup is not None
+        while True:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            ready_time, _, conversation_id = self._ready[0]
+            wait = max(ready_time, self._next_send_time) - loop.time()
+            if wait > 0:
+                # the new conversation may be ready earlier than the top one
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._ready)
+            queue = self._queues[conversation_id]
+            now = loop.time()
+            self._deliver(self._take(queue), now)
+            self._next_send_time = now + self.options.global_interval
+            self._last_sent[conversation_id] = now
+            if queue:
+                self._push_ready(now + self.options.conversation_interval,
+                                 conversation_id)
+            else:
+                del self._queues[conversation_id]
+            # let the senders run between the deliveries
+            await asyncio.sleep(0)
@@ -0,0 +1,41 @@
+"""the shared fixtures of the tests, override `environment` in the test
+module for another size of the world"""
+from typing import Awaitable, Callable
+
+import pytest
+
+from wechaty_puppet_mock import EnvironmentMock, Mocker, PuppetMockOptions, \
+    PuppetMock
+from wechaty_puppet_mock.metrics import MetricsRegistry
+
+# start the puppet with the options and login the first contact
+PuppetFactory = Callable[..., Awaitable[PuppetMock]]
+
+
+@pytest.fixture
+def environment() -> EnvironmentMock:
+    return EnvironmentMock()
+
+
+@pytest.fixture
+def mocker(environment: EnvironmentMock) -> Mocker:
+    mocker = Mocker()
+    mocker.use(environment)
+    return mocker
+
+
+@pytest.fixture
+def new_puppet(mocker: Mocker) -> PuppetFactory:
+    async def _new_puppet(**options) -> PuppetMock:
+        # every test reports to a fresh registry, so the counts start at 0
+        options.setdefault('metrics_registry', MetricsRegistry())
+        puppet = PuppetMock(PuppetMockOptions(mocker=mocker, **options))
+        await puppet.start()
+        mocker.login(mocker.environment.get_contact_payloads()[0].id)
+        return puppet
+    return _new_puppet
+
+
+@pytest.fixture
+async def puppet(new_puppet: PuppetFactory) -> PuppetMock:
+    return await new_puppet()
@@ -0,0 +1,67 @@
+import gc
+
+import pytest
+from wechaty import Contact, Message, Room
+from wechaty_puppet import MessageType
+
+from wechaty_puppet_mock import Mocker
+
+
+class ContactMock(Contact):
+    abstract = False
+
+
+class RoomMock(Room):
+    abstract = False
+
+
+class MessageMock(Message):
+    abstract = False
+
+
+@pytest.fixture
+def mocker(mocker: Mocker) -> Mocker:
+    mocker.Contact, mocker.Room, mocker.Message = \
+        ContactMock, RoomMock, MessageMock
+    return mocker
+
+
+def test_accessory_cache(mocker: Mocker):
+    contact = mocker.new_contact()
+    assert contact.payload is \
+        mocker.environment.get_contact_payload(contact.contact_id)
+    assert mocker.load_contact(contact.contact_id) is contact
+
+    room = mocker.new_room()
+    assert room.payload.id == room.room_id
+    assert mocker.load_room(room.room_id) is room
+    message_id = mocker.send_message_payload(
+        talker_id=contact.contact_id, conversation_id=room.room_id,
+        msg_type=MessageType.MESSAGE_TYPE_TEXT, text='ding')
+    assert mocker.load_message(message_id).payload.text == 'ding'
+
+    stats = mocker.accessory_cache_stats
+    assert (stats.hits, stats.misses) == (2, 3)
+
+    # the changed payload is attached again to the same pooled instance
+    member_id = mocker.environment.new_contact_payload().id
+    mocker.add_contact_to_room(member_id, room.room_id,
+                               inviter_id=contact.contact_id)
+    assert stats.invalidations == 1
+    assert mocker.load_room(room.room_id) is room
+    assert member_id in room.payload.member_ids
+    assert stats.misses == 4
+
+    # the pool of wechaty and the cache share the instances
+    assert ContactMock.load(contact.contact_id) is contact
+    assert RoomMock.load(room.room_id) is room
+
+    # the messages are reused while referenced, and released with the last
+    # reference, wechaty doesn't pool them
+    message = mocker.load_message(message_id)
+    assert mocker.load_message(message_id) is message
+    assert stats.hits == 3
+    del message
+    gc.collect()
+    assert mocker.load_message(message_id).message_id == message_id
+    assert stats.misses == 6
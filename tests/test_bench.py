@@ -0,0 +1,51 @@
+import pytest
+from wechaty import Contact, Message, Room
+
+from wechaty_puppet_mock.bench import compare_with_baseline
+from wechaty_puppet_mock.bench.runner import percentiles, run_bench
+
+
+def test_percentiles():
+    result = percentiles([float(index) for index in range(1, 101)])
+    assert result['p50'] == 51
+    assert result['p99'] == 100
+    assert result['max'] == 100
+    assert percentiles([]) == {}
+
+
+def test_compare_with_baseline():
+    baseline = {
+        'throughput': 1000.0,
+        'latency_ms': {'p50': 1.0, 'p90': 2.0, 'p99': 5.0},
+        'peak_rss_kb': 50000
+    }
+    report = {
+        'throughput': 950.0,
+        'latency_ms': {'p50': 1.05, 'p90': 3.0, 'p99': 5.0},
+        'peak_rss_kb': 50000
+    }
+    assert compare_with_baseline(report, baseline, tolerance=0.1) == [
+        'latency_ms.p90: 3.000 vs baseline 2.000'
+    ]
+    report['throughput'] = 800.0
+    assert len(compare_with_baseline(report, baseline, tolerance=0.1)) == 2
+
+
+@pytest.fixture
+def unbound_accessories(monkeypatch):
+    """run_bench binds the accessories to its own puppet, so unbind the
+    ones from the other tests and restore them after"""
+    for accessory in (Contact, Room, Message):
+        monkeypatch.setattr(accessory, '_puppet', None)
+        monkeypatch.setattr(accessory, '_wechaty', None)
+
+
+@pytest.mark.asyncio
+async def test_run_bench(unbound_accessories):
+    # pylint: disable=unused-argument,redefined-outer-name
+    report = await run_bench('ding-dong', events=100, contact_num=20,
+                             room_num=5)
+    assert report.events == 100
+    # every ding is sent by a member who is not the bot, and gets its dong
+    assert report.replies == 100
+    assert report.unanswered == 0
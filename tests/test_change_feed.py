@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from wechaty_puppet import MessagePayload
+from wechaty_puppet.schemas.types import PayloadType
+
+from wechaty_puppet_mock import EnvironmentMock, MockEnvironmentError
+from wechaty_puppet_mock.mock.change_feed import (
+    CHANGE_DELETE,
+    CHANGE_INSERT,
+    CHANGE_UPDATE,
+    ChangeFeed
+)
+
+
+def test_change_feed():
+    environment = EnvironmentMock(contact_num=10, room_num=0)
+    feed = environment.enable_change_feed()
+    subscription = feed.subscribe(batch_size=2)
+
+    contact_ids = environment.get_contact_ids(limit=None).ids
+    room = environment.new_room_payload(member_ids=contact_ids[:2])
+    environment.add_room_members(room.id, [contact_ids[2]], contact_ids[0])
+    environment.remove_room_members(room.id, [contact_ids[0]])
+    environment.add_message_payload(MessagePayload(id='message'))
+    environment.recall_message('message')
+
+    assert [(change.op, change.payload_type, change.payload_id)
+            for change in subscription.poll(limit=100)] == [
+        (CHANGE_INSERT, PayloadType.PAYLOAD_TYPE_ROOM, room.id),
+        (CHANGE_INSERT, PayloadType.PAYLOAD_TYPE_ROOM_MEMBER, contact_ids[0]),
+        (CHANGE_INSERT, PayloadType.PAYLOAD_TYPE_ROOM_MEMBER, contact_ids[1]),
+        (CHANGE_INSERT, PayloadType.PAYLOAD_TYPE_ROOM_MEMBER, contact_ids[2]),
+        (CHANGE_UPDATE, PayloadType.PAYLOAD_TYPE_ROOM, room.id),
+        (CHANGE_DELETE, PayloadType.PAYLOAD_TYPE_ROOM_MEMBER, contact_ids[0]),
+        (CHANGE_UPDATE, PayloadType.PAYLOAD_TYPE_ROOM, room.id),
+        (CHANGE_INSERT, PayloadType.PAYLOAD_TYPE_MESSAGE, 'message'),
+        (CHANGE_UPDATE, PayloadType.PAYLOAD_TYPE_MESSAGE, 'message'),
+    ]
+    assert subscription.cursor == feed.last_seq == 9
+    assert not subscription.poll()
+
+    # subscribe from an old sequence to catch up
+    batches = []
+    feed.subscribe(batches.append, from_seq=5, batch_size=3)
+    feed.flush()
+    assert [[change.seq for change in batch] for batch in batches] == \
+        [[6, 7, 8], [9]]
+
+
+def test_trimmed_feed():
+    feed = ChangeFeed(capacity=3)
+    for index in range(6):
+        feed.append(CHANGE_INSERT, PayloadType.PAYLOAD_TYPE_CONTACT,
+                    f'contact-{index}')
+    assert feed.first_seq == 3
+    assert [change.seq for change in feed.changes_since(3)] == [4, 5, 6]
+    with pytest.raises(MockEnvironmentError):
+        feed.changes_since(2)
+    with pytest.raises(MockEnvironmentError):
+        feed.subscribe(from_seq=1)
+
+
+@pytest.mark.asyncio
+async def test_batched_delivery():
+    environment = EnvironmentMock(contact_num=1, room_num=0)
+    batches = []
+    environment.enable_change_feed().subscribe(batches.append)
+    for _ in range(5):
+        environment.new_contact_payload()
+    assert not batches
+    await asyncio.sleep(0)
+    assert [len(batch) for batch in batches] == [5]
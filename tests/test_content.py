@@ -0,0 +1,55 @@
+import statistics
+
+import pytest
+
+from wechaty_puppet_mock import EnvironmentMock, Mocker
+from wechaty_puppet_mock.exceptions import WechatyPuppetMockError
+from wechaty_puppet_mock.mock.content import ContentGenerator, ContentOptions
+
+
+def test_content_generator():
+    options = ContentOptions(median_tokens=10, emoji_rate=0, url_rate=0,
+                             mention_rate=0, separator=' ', seed=7)
+    generator = ContentGenerator(options)
+    texts = [generator.generate().text for _ in range(2000)]
+    # the same seed gives the same messages
+    same_generator = ContentGenerator(options)
+    assert [same_generator.generate().text for _ in range(10)] == texts[:10]
+    lengths = [len(text.split(' ')) for text in texts]
+    assert 7 <= statistics.median(lengths) <= 13
+    assert max(lengths) <= options.max_tokens
+    assert len(set(texts)) > 1900
+
+    generator = ContentGenerator(ContentOptions(
+        emoji_rate=1, url_rate=1, mention_rate=1, max_mentions=2, seed=7))
+    content = generator.generate(['contact-1', 'contact-2', 'contact-3'],
+                                 lambda contact_id: f'name-{contact_id}')
+    assert 1 <= len(content.mention_ids) <= 2
+    assert content.text.startswith(f'@name-{content.mention_ids[0]}')
+    assert 'http' in content.text
+    assert any(emoji in content.text for emoji in generator.options.emoji)
+
+    for options in (ContentOptions(max_emoji=0), ContentOptions(max_mentions=0)):
+        with pytest.raises(WechatyPuppetMockError):
+            ContentGenerator(options)
+
+
+def test_send_random_message(environment: EnvironmentMock, mocker: Mocker):
+    contact_ids = environment.get_contact_ids(limit=None).ids
+    room = environment.new_room_payload(member_ids=contact_ids[:5])
+    mocker.content_generator = ContentGenerator(
+        ContentOptions(mention_rate=1, seed=1))
+
+    for _ in range(20):
+        message_id = mocker.send_random_message(contact_ids[0], room.id)
+        payload = environment.get_message_payload(message_id)
+        assert payload.room_id == room.id
+        # the talker is never mentioned
+        assert set(payload.mention_ids) <= set(contact_ids[1:5])
+    name = environment.get_contact_payload(payload.mention_ids[0]).name
+    assert payload.text.startswith(f'@{name}')
+
+    message_id = mocker.send_random_message(contact_ids[0], contact_ids[1])
+    payload = environment.get_message_payload(message_id)
+    assert payload.to_id == contact_ids[1]
+    assert payload.text and not payload.mention_ids
@@ -0,0 +1,91 @@
+import pytest
+from wechaty_puppet import MessageType
+
+from wechaty_puppet_mock import PuppetMock
+from wechaty_puppet_mock.correlation import ReplyCorrelator
+
+pytestmark = pytest.mark.asyncio
+
+
+def _say(puppet: PuppetMock, talker_id: str, conversation_id: str,
+         text: str) -> str:
+    return puppet.mocker.send_message_payload(
+        talker_id, conversation_id, MessageType.MESSAGE_TYPE_TEXT, text=text)
+
+
+async def test_reply_latency(puppet: PuppetMock):
+    correlator = ReplyCorrelator(puppet.mocker).attach()
+    contacts = puppet.mocker.environment.get_contact_payloads()
+    room = puppet.mocker.environment.new_room_payload()
+
+    _say(puppet, contacts[1].id, puppet.self_id(), 'ding')
+    second_id = _say(puppet, contacts[1].id, puppet.self_id(), 'ding')
+    _say(puppet, contacts[2].id, room.id, 'ding')
+    await puppet.message_send_text(contacts[1].id, 'dong')
+    await puppet.message_send_text(contacts[1].id, 'dong again')
+
+    report = correlator.report()
+    assert report[contacts[1].id]['replies'] == 1
+    assert report[contacts[1].id]['unanswered'] == 0
+    assert report[room.id]['unanswered'] == 1
+    assert correlator.outbound[0].inbound_message_id == second_id
+    assert correlator.outbound[1].inbound_message_id is None
+    assert correlator.summary()['unanswered'] == 1
+    correlator.detach()
+
+
+async def test_correlation_hook(puppet: PuppetMock):
+    # the bot quotes the id of the message which it replies to
+    correlator = ReplyCorrelator(
+        puppet.mocker, hook=lambda payload: payload.text.split(':')[0]
+    ).attach()
+    contact_id = puppet.mocker.environment.get_contact_payloads()[1].id
+
+    first_id = _say(puppet, contact_id, puppet.self_id(), 'ding')
+    second_id = _say(puppet, contact_id, puppet.self_id(), 'ding')
+    await puppet.message_send_text(contact_id, f'{first_id}:dong')
+
+    assert correlator.outbound[0].inbound_message_id == first_id
+    assert correlator.report()[contact_id]['unanswered'] == 1
+    await puppet.message_send_text(contact_id, f'{second_id}:dong')
+    report = correlator.report()[contact_id]
+    assert report['replies'] == 2
+    assert report['unanswered'] == 0
+    assert len(correlator.latencies_ms()) == 2
+
+
+async def test_expired_and_bounded(puppet: PuppetMock):
+    correlator = ReplyCorrelator(puppet.mocker, capacity=2).attach()
+    contacts = puppet.mocker.environment.get_contact_payloads()
+
+    _say(puppet, contacts[1].id, puppet.self_id(), 'ding')
+    _say(puppet, contacts[2].id, puppet.self_id(), 'ding')
+    # the first message is expired, the reply to it is not correlated
+    _say(puppet, contacts[2].id, puppet.self_id(), 'ding')
+    report = correlator.report()
+    assert report[contacts[1].id]['unanswered'] == 0
+    assert report[contacts[1].id]['expired'] == 1
+    await puppet.message_send_text(contacts[1].id, 'dong')
+    assert correlator.outbound[-1].inbound_message_id is None
+
+    # the least recently active conversation is dropped
+    _say(puppet, contacts[3].id, puppet.self_id(), 'ding')
+    assert list(correlator.conversations) == [contacts[1].id, contacts[3].id]
+    assert correlator.summary()['unanswered'] == 1
+    correlator.detach()
+
+
+async def test_hook_books_inbound_conversation(puppet: PuppetMock):
+    correlator = ReplyCorrelator(
+        puppet.mocker, hook=lambda payload: payload.text.split(':')[0]
+    ).attach()
+    contacts = puppet.mocker.environment.get_contact_payloads()
+
+    inbound_id = _say(puppet, contacts[1].id, puppet.self_id(), 'ding')
+    # the bot answers in another conversation
+    await puppet.message_send_text(contacts[2].id, f'{inbound_id}:dong')
+    report = correlator.report()
+    assert report[contacts[1].id]['replies'] == 1
+    assert report[contacts[1].id]['unanswered'] == 0
+    assert contacts[2].id not in report
+    correlator.detach()
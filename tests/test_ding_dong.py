@@ -5,8 +5,7 @@ import pytest
 from wechaty import WechatyOptions, Wechaty, Message
 from wechaty_puppet import Puppet, get_logger
 
-from wechaty_puppet_mock import EnvironmentMock, Mocker, PuppetMockOptions, \
-    PuppetMock
+from wechaty_puppet_mock import PuppetMockOptions, PuppetMock
 
 # All test coroutines will be treated as marked.
 pytestmark = pytest.mark.asyncio
@@ -14,14 +13,6 @@ pytestmark = pytest.mark.asyncio
 log = get_logger('TestDingDong')
 
 
-@pytest.fixture
-def mocker() -> Mocker:
-    environment = EnvironmentMock()
-    mocker = Mocker()
-    mocker.use(environment)
-    return mocker
-
-
 @pytest.fixture
 async def bot(mocker) -> Wechaty:
     puppet_options = PuppetMockOptions(mocker=mocker)
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from wechaty_puppet_mock import ApiFault, EnvironmentMock, FaultInjector
+from wechaty_puppet_mock.exceptions import PuppetFaultError, \
+    PuppetRateLimitError, PuppetTimeoutError
+from wechaty_puppet_mock.fault import FixedLatency, TokenBucket, \
+    UniformLatency
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _run_faults(seed: int):
+    injector = FaultInjector(seed=seed).configure(
+        'contact_payload', ApiFault(latency=UniformLatency(0, 0.001),
+                                    error_rate=0.3, timeout_rate=0.2,
+                                    timeout=0))
+    results = []
+    for _ in range(50):
+        try:
+            await injector.inject('contact_payload')
+            results.append('ok')
+        except PuppetTimeoutError:
+            results.append('timeout')
+        except PuppetFaultError:
+            results.append('error')
+    return results, injector.stats['contact_payload']
+
+
+async def test_deterministic_under_seed():
+    results, stats = await _run_faults(seed=1)
+    assert results == (await _run_faults(seed=1))[0]
+    assert stats.calls == 50
+    assert stats.errors == results.count('error') > 0
+    assert stats.timeouts == results.count('timeout') > 0
+
+
+async def test_puppet_apis(environment: EnvironmentMock, new_puppet):
+    injector = FaultInjector(seed=0)
+    puppet = await new_puppet(fault_injector=injector)
+    contact_id = environment.get_contact_payloads()[1].id
+
+    injector.configure('contact_payload', ApiFault(latency=FixedLatency(0.05)))
+    loop = asyncio.get_event_loop()
+    start_time = loop.time()
+    assert (await puppet.contact_payload(contact_id)).id == contact_id
+    assert loop.time() - start_time >= 0.05
+
+    injector.configure('message_send_text', ApiFault(
+        rate_limit=TokenBucket(rate=1, capacity=1), block=False))
+    await puppet.message_send_text(contact_id, 'ding')
+    with pytest.raises(PuppetRateLimitError):
+        await puppet.message_send_text(contact_id, 'ding')
+    assert injector.stats['message_send_text'].rate_limited == 1
+
+    injector.configure('message_send_text', ApiFault(
+        rate_limit=TokenBucket(rate=20, capacity=1)))
+    start_time = loop.time()
+    for _ in range(3):
+        await puppet.message_send_text(contact_id, 'ding')
+    assert loop.time() - start_time >= 0.09
+
+    # the other kinds of messages are limited too, the bucket is shared
+    bucket = TokenBucket(rate=1, capacity=1)
+    for api in ('message_send_url', 'message_send_contact', 'message_forward'):
+        injector.configure(api, ApiFault(rate_limit=bucket, block=False))
+    message_id = await puppet.message_send_url(contact_id, 'https://wechaty.js.org')
+    with pytest.raises(PuppetRateLimitError):
+        await puppet.message_send_contact(contact_id, contact_id)
+    with pytest.raises(PuppetRateLimitError):
+        await puppet.message_forward(contact_id, message_id)
+    assert injector.stats['message_send_url'].calls == 1
+    assert injector.stats['message_send_contact'].rate_limited == 1
+
+    with pytest.raises(PuppetFaultError):
+        injector.configure('room_list', ApiFault())
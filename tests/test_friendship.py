@@ -0,0 +1,34 @@
+import pytest
+from wechaty_puppet.schemas.types import FriendshipType
+
+from wechaty_puppet_mock import PuppetMock
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_friendship_search(puppet: PuppetMock):
+    contact = puppet.mocker.environment.get_contact_payloads()[0]
+    assert await puppet.friendship_search(weixin=contact.weixin) == contact.id
+    assert await puppet.friendship_search(phone=contact.phone[0]) == \
+        contact.id
+    assert await puppet.friendship_search(weixin='not-exist') is None
+
+
+async def test_friendship_accept(puppet: PuppetMock):
+    friendship_ids = []
+    puppet.on('friendship',
+              lambda payload: friendship_ids.append(payload.friendship_id))
+
+    received_ids = await puppet.mocker.send_friendship_requests(
+        count=20, hello='hello')
+    assert friendship_ids == received_ids
+
+    friendship = await puppet.friendship_payload(received_ids[0])
+    assert friendship.type == FriendshipType.FRIENDSHIP_TYPE_RECEIVE
+    contact = await puppet.contact_payload(friendship.contact_id)
+    assert not contact.friend
+
+    await puppet.friendship_accept(friendship.id)
+    assert contact.friend
+    assert friendship.type == FriendshipType.FRIENDSHIP_TYPE_CONFIRM
+    assert friendship_ids[-1] == friendship.id
@@ -0,0 +1,85 @@
+import asyncio
+import os
+
+import pytest
+from wechaty_puppet import MessageType
+
+from wechaty_puppet_mock import EnvironmentMock, Mocker, PuppetMockOptions, \
+    PuppetMock
+from wechaty_puppet_mock.mock.journal import EventJournal
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return os.path.join(tmp_path, 'events.journal')
+
+
+def test_journal(path: str):
+    journal = EventJournal(path, fsync_batch=500, fsync_interval=60)
+    for index in range(3000):
+        assert journal.append(1, f'event-{index}') == index + 1
+    assert journal.fsyncs == 6
+    assert journal.durable_seq == 3000
+    journal.append(1, 'event-3000')
+    assert journal.durable_seq == 3000
+    journal.close()
+
+    # the torn record at the tail is cut when the journal is opened again
+    with open(path, 'ab') as file:
+        file.write(b'\x00' * 7)
+    journal = EventJournal(path)
+    assert journal.last_seq == 3001
+    assert journal.append(2, 'event-3001') == 3002
+    entries = list(journal.read(after_seq=2047))
+    assert [entry.seq for entry in entries] == list(range(2048, 3003))
+    assert entries[0].payload == 'event-2047'
+    assert entries[-1].type == 2
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_replay_after_crash(path: str, environment: EnvironmentMock,
+                                  mocker: Mocker):
+    mocker.use_journal(EventJournal(path))
+    talker_id = environment.get_contact_payloads()[1].id
+    room_id = environment.new_room_payload().id
+
+    def send(text: str):
+        mocker.send_message_payload(
+            talker_id=talker_id, conversation_id=room_id,
+            msg_type=MessageType.MESSAGE_TYPE_TEXT, text=text)
+
+    async def received(puppet: PuppetMock, message_ids: list) -> list:
+        return [(await puppet.message_payload(message_id)).text
+                for message_id in message_ids]
+
+    puppet = PuppetMock(PuppetMockOptions(mocker=mocker))
+    message_ids: list = []
+    puppet.on('message', lambda payload: message_ids.append(
+        payload.message_id))
+    await puppet.start()
+    send('before crash')
+    await puppet.stop()
+    cursor = puppet.journal_cursor
+
+    for index in range(2500):
+        send(f'missed {index}')
+
+    restarted = PuppetMock(PuppetMockOptions(mocker=mocker))
+    replayed_ids: list = []
+    restarted.on('message', lambda payload: replayed_ids.append(
+        payload.message_id))
+    await restarted.start()
+    # the live event during the replay is emitted once, in order
+    asyncio.get_event_loop().call_soon(send, 'during replay')
+    stats = await restarted.replay_journal(cursor, chunk_size=100)
+    send('after restart')
+
+    assert await received(puppet, message_ids) == ['before crash']
+    texts = await received(restarted, replayed_ids)
+    assert texts == [f'missed {index}' for index in range(2500)] + \
+        ['during replay', 'after restart']
+    assert (stats.replayed, stats.buffered) == (2501, 1)
+    assert stats.throughput > 0
+    assert restarted.journal_cursor == mocker.journal.last_seq
+    mocker.journal.close()
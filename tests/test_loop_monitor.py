@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+import pytest
+
+from wechaty_puppet_mock.loop_monitor import LoopMonitorOptions
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_flag_stall(new_puppet):
+    puppet = await new_puppet(loop_monitor=LoopMonitorOptions(
+        interval=0.02, stall_threshold=0.15))
+    assert puppet.loop_monitor.running
+
+    async def slow_handler():
+        await asyncio.sleep(0.05)
+        time.sleep(0.4)
+
+    task = asyncio.ensure_future(slow_handler())
+    await asyncio.sleep(0.1)
+    await task
+    await asyncio.sleep(0.05)
+    await puppet.stop()
+    assert not puppet.loop_monitor.running
+
+    monitor = puppet.loop_monitor
+    assert monitor.samples
+    assert monitor.max_lag >= 0.3
+    stall = monitor.stalls[0]
+    assert any('slow_handler' in line for line in stall.blocking_stack)
+    assert 'stalled' in stall.format()
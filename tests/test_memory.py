@@ -0,0 +1,31 @@
+import pytest
+
+from wechaty_puppet_mock import PuppetMock
+from wechaty_puppet_mock.memory import MemoryTracker, memory_report
+
+
+@pytest.mark.asyncio
+async def test_memory_report(puppet: PuppetMock):
+    report = memory_report(puppet)
+    assert report['environment']['contacts']['count'] == 30
+    assert report['environment']['contacts']['bytes'] > 0
+    assert report['environment']['messages']['count'] == 0
+    assert report['listeners']['mocker'] == {'stream': 1}
+    assert 'pending_tasks' in report
+
+
+def test_memory_tracker(puppet: PuppetMock):
+    tracker = MemoryTracker()
+    tracker.start()
+    try:
+        tracker.checkpoint('before')
+        for _ in range(20):
+            puppet.mocker.environment.new_contact_payload()
+        tracker.checkpoint('after')
+        growths = tracker.diff()
+    finally:
+        tracker.stop()
+
+    assert tracker.checkpoints == ['before', 'after']
+    assert growths[0].subsystem == 'mock/environment'
+    assert growths[0].size_diff > 0
@@ -0,0 +1,58 @@
+import pytest
+from wechaty_puppet import FileBox, MessageType, MiniProgramPayload
+
+from wechaty_puppet_mock import PuppetMock
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_send_family(puppet: PuppetMock):
+    environment = puppet.mocker.environment
+    contact = environment.get_contact_payloads()[1]
+    room = environment.new_room_payload()
+
+    message_id = await puppet.message_send_text(room.id, 'ding')
+    payload = await puppet.message_payload(message_id)
+    assert payload.room_id == room.id
+    assert payload.from_id == puppet.self_id()
+
+    message_id = await puppet.message_send_contact(contact.id, contact.id)
+    assert (await puppet.message_payload(message_id)).to_id == contact.id
+    assert await puppet.message_contact(message_id) == contact.id
+
+    file_box = FileBox.from_base64('ZGluZw==', name='ding.txt')
+    message_id = await puppet.message_send_file(room.id, file_box)
+    assert (await puppet.message_file(message_id)).name == 'ding.txt'
+
+    message_id = await puppet.message_send_url(room.id, 'https://wechaty.js.org')
+    assert (await puppet.message_url(message_id)).url == \
+        'https://wechaty.js.org'
+
+    mini_program = MiniProgramPayload(appid='app-id', title='title')
+    message_id = await puppet.message_send_mini_program(room.id, mini_program)
+    assert await puppet.message_mini_program(message_id) == mini_program
+
+
+async def test_recall_and_forward(puppet: PuppetMock):
+    environment = puppet.mocker.environment
+    room = environment.new_room_payload()
+    message_ids = []
+    puppet.on('message', lambda payload: message_ids.append(
+        payload.message_id))
+
+    message_id = await puppet.message_send_text(room.id, 'ding')
+    assert await puppet.message_recall(message_id)
+    assert not await puppet.message_recall(message_id)
+    assert environment.is_message_recalled(message_id)
+
+    recalled_payload = await puppet.message_payload(message_ids[-1])
+    assert recalled_payload.type == MessageType.MESSAGE_TYPE_RECALLED
+    assert recalled_payload.text == message_id
+
+    forward_id = await puppet.message_forward(room.id, message_id)
+    second_forward_id = await puppet.message_forward(room.id, forward_id)
+    forward_payload = await puppet.message_payload(second_forward_id)
+    assert forward_payload.text is \
+        (await puppet.message_payload(message_id)).text
+    assert environment.get_message_origin_id(second_forward_id) == message_id
+    assert message_ids[-1] == second_forward_id
@@ -0,0 +1,92 @@
+import urllib.request
+
+import pytest
+
+from wechaty_puppet_mock import EnvironmentMock, Mocker, PuppetMock, \
+    PuppetMockOptions
+from wechaty_puppet_mock.exceptions import MockEnvironmentError
+from wechaty_puppet_mock.metrics import METRICS, MetricsRegistry
+
+
+def test_render_prometheus_text(tmp_path):
+    registry = MetricsRegistry()
+    counter = registry.counter('requests_total', 'the requests', ['kind'])
+    counter.inc(labels=('text',))
+    counter.inc(2, labels=('text',))
+    gauge = registry.gauge('queue_depth', 'the depth')
+    gauge.add_collector(lambda: {(): 1})
+    # the collectors of the same label values are summed
+    gauge.add_collector(lambda: {(): 2})
+    histogram = registry.histogram('latency_seconds', 'the latency',
+                                   buckets=[0.1, 1])
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.render()
+    assert 'requests_total{kind="text"} 3' in text
+    assert 'queue_depth 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_count 3' in text
+    assert registry.counter('requests_total', 'the requests') is counter
+
+    path = tmp_path / 'metrics.prom'
+    registry.dump(str(path))
+    assert path.read_text() == text
+
+    def collect_five():
+        return {(): 5}
+    gauge.add_collector(collect_five)
+    assert gauge.get() == 8
+    gauge.remove_collector(collect_five)
+    assert gauge.get() == 3
+
+    server = registry.serve(port=0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as r:
+            assert 'requests_total{kind="text"} 3' in r.read().decode()
+    finally:
+        server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_mock_metrics(environment: EnvironmentMock,
+                            puppet: PuppetMock):
+    metrics = puppet.metrics
+    room = environment.new_room_payload()
+    await puppet.message_send_text(room.id, 'ding')
+    with pytest.raises(MockEnvironmentError):
+        await puppet.contact_payload('not-exist')
+
+    assert metrics.events_emitted.get(('EVENT_TYPE_MESSAGE',)) == 1
+    assert metrics.payload_misses.get(('contact',)) == 1
+    text = metrics.registry.render()
+    assert 'wechaty_mock_listeners{emitter="mocker",event="stream"}' in text
+
+    # the collectors of the stopped puppet are removed
+    await puppet.stop()
+    assert not metrics.listeners._collectors
+
+
+@pytest.mark.asyncio
+async def test_own_registry(new_puppet):
+    puppet = await new_puppet()
+    # the puppet without the registry reports to the global one
+    other = PuppetMock(PuppetMockOptions(mocker=Mocker()))
+    assert other.metrics is METRICS
+    assert puppet.metrics is not METRICS
+
+    other.mocker.use(EnvironmentMock())
+    messages = METRICS.events_emitted.get(('EVENT_TYPE_MESSAGE',))
+    await other.start()
+    contacts = other.mocker.environment.get_contact_payloads()
+    other.mocker.login(contacts[0].id)
+    await other.message_send_text(contacts[1].id, 'ding')
+    await other.stop()
+
+    assert METRICS.events_emitted.get(('EVENT_TYPE_MESSAGE',)) == messages + 1
+    assert puppet.metrics.events_emitted.get(('EVENT_TYPE_MESSAGE',)) == 0
+    await puppet.stop()
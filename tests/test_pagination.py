@@ -0,0 +1,55 @@
+import pytest
+
+from wechaty_puppet_mock import EnvironmentMock, MockEnvironmentError, \
+    PuppetMock
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def environment() -> EnvironmentMock:
+    return EnvironmentMock(contact_num=25, room_num=7)
+
+
+async def test_list(puppet: PuppetMock):
+    environment = puppet.mocker.environment
+    assert await puppet.contact_list() == \
+        [payload.id for payload in environment.get_contact_payloads()]
+    assert await puppet.room_list() == \
+        [payload.id for payload in environment.get_room_payloads()]
+
+
+async def test_paging_under_mutation(puppet: PuppetMock):
+    environment = puppet.mocker.environment
+    contact_ids = await puppet.contact_list()
+
+    page = await puppet.contact_list_page(limit=10)
+    assert page.ids == contact_ids[:10]
+    new_contact = environment.new_contact_payload()
+    page = await puppet.contact_list_page(page.next_cursor, limit=10)
+    assert page.ids == contact_ids[10:20]
+    page = await puppet.contact_list_page(page.next_cursor, limit=10)
+    assert page.ids == contact_ids[20:] + [new_contact.id]
+    assert page.next_cursor is None
+
+    with pytest.raises(MockEnvironmentError):
+        await puppet.room_list_page(limit=0)
+
+
+async def test_iterate(puppet: PuppetMock):
+    environment = puppet.mocker.environment
+    room_ids = await puppet.room_list()
+
+    chunks = []
+    async for chunk in puppet.iter_room_list(chunk_size=3):
+        if not chunks:
+            new_room_id = environment.new_room_payload().id
+        chunks.append(chunk)
+    assert [len(chunk) for chunk in chunks] == [3, 3, 2]
+    assert sum(chunks, []) == room_ids + [new_room_id]
+
+    payloads = []
+    async for chunk in puppet.iter_contact_payloads(chunk_size=10):
+        payloads.extend(chunk)
+    assert [payload.id for payload in payloads] == \
+        await puppet.contact_list()
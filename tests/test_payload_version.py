@@ -0,0 +1,39 @@
+import pytest
+from wechaty_puppet.schemas.types import PayloadType
+
+from wechaty_puppet_mock import PuppetMock
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_conditional_fetch(puppet: PuppetMock):
+    contact_id = puppet.mocker.environment.get_contact_payloads()[0].id
+    version = await puppet.payload_version(
+        PayloadType.PAYLOAD_TYPE_CONTACT, contact_id)
+    assert version > 0
+
+    not_modified = await puppet.payload_if_newer(
+        PayloadType.PAYLOAD_TYPE_CONTACT, contact_id, version)
+    assert not_modified is None
+
+    await puppet.contact_alias(contact_id, 'new-alias')
+    modified = await puppet.payload_if_newer(
+        PayloadType.PAYLOAD_TYPE_CONTACT, contact_id, version)
+    assert modified is not None
+    assert modified.version > version
+    assert modified.payload.alias == 'new-alias'
+
+
+async def test_dirty_event(puppet: PuppetMock):
+    dirty_payloads = []
+    puppet.on('dirty', dirty_payloads.append)
+
+    room = puppet.mocker.environment.new_room_payload()
+    puppet.mocker.environment.update_room_payload(room)
+    contact_id = puppet.mocker.environment.get_contact_payloads()[0].id
+    await puppet.contact_payload_dirty(contact_id)
+
+    assert [payload.payload_id for payload in dirty_payloads] == \
+        [room.id, contact_id]
+    assert dirty_payloads[0].payload_type == PayloadType.PAYLOAD_TYPE_ROOM
+    assert dirty_payloads[0].version < dirty_payloads[1].version
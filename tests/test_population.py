@@ -0,0 +1,41 @@
+import random
+
+from wechaty_puppet_mock import EnvironmentMock
+from wechaty_puppet_mock.mock.population import LogNormalRoomSize, \
+    ParetoRoomSize, UniformRoomSize, sample_ids
+from wechaty_puppet_mock.mock.room_member import RoomMemberStore
+
+
+def test_room_size_distributions():
+    rand = random.Random(0)
+    sizes = [ParetoRoomSize(minimum=3, maximum=500).sample(rand, 1000)
+             for _ in range(10000)]
+    assert min(sizes) >= 3 and max(sizes) <= 500
+    # heavy-tailed: the median room is small, but some rooms are huge
+    assert sorted(sizes)[5000] < 10 and max(sizes) == 500
+
+    assert UniformRoomSize().sample(rand, 5) <= 5
+    assert LogNormalRoomSize(maximum=50).sample(rand, 10) <= 10
+    assert len(set(sample_ids(['a', 'b', 'c'], 10, rand))) == 3
+
+
+def test_populate_rooms():
+    environment = EnvironmentMock(room_num=5, contact_num=50, seed=1)
+    assert len(environment.get_room_payloads()) == 5
+
+    room_ids = environment.populate_rooms(
+        100, room_size=UniformRoomSize(low=2, high=10))
+    for room_id in room_ids:
+        member_ids = environment.get_room_payload(room_id).member_ids
+        assert 2 <= len(member_ids) <= 10
+        assert len(set(member_ids)) == len(member_ids)
+        assert environment.get_room_member(room_id, member_ids[0])
+
+
+def test_add_many_members():
+    store = RoomMemberStore()
+    assert store.add_many('room-1', ['c-3', 'c-1', 'c-3'], 'c-0', 1) == 2
+    assert sorted(store.member_ids('room-1')) == ['c-1', 'c-3']
+    assert store.add_many('room-1', ['c-1', 'c-2'], 'c-0', 1) == 1
+    assert store.get('room-1', 'c-2').inviter_id == 'c-0'
+    assert store.member_count() == 3
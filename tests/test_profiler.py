@@ -0,0 +1,42 @@
+import json
+import os
+import time
+
+import pytest
+
+from wechaty_puppet_mock import EnvironmentMock
+from wechaty_puppet_mock.profiler import ProfilerOptions
+
+
+def busy_bot_handler(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_profile_layers(tmp_path, environment: EnvironmentMock,
+                              new_puppet):
+    options = ProfilerOptions(interval=0.001, output_dir=str(tmp_path),
+                              name='run')
+    puppet = await new_puppet(profiler=options)
+
+    busy_bot_handler(0.2)
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        environment.new_contact_payload()
+    await puppet.stop()
+
+    report = puppet.profile_report
+    assert report.samples > 50
+    assert report.layers['bot'].samples > report.samples * 0.3
+    assert report.layers['mocker'].samples > report.samples * 0.3
+    assert any('test_profiler:busy_bot_handler' in stack
+               for stack in report.stacks)
+
+    with open(os.path.join(tmp_path, 'run.layers.json')) as file:
+        assert json.load(file)['samples'] == report.samples
+    with open(os.path.join(tmp_path, 'run.collapsed')) as file:
+        line = file.readline()
+    stack, count = line.rsplit(' ', 1)
+    assert ';' in stack and int(count) > 0
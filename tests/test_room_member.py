@@ -0,0 +1,99 @@
+import json
+import random
+
+import pytest
+from wechaty_puppet import EventType
+from wechaty_puppet.schemas.types import PayloadType
+
+from wechaty_puppet_mock import EnvironmentMock, PuppetMock
+from wechaty_puppet_mock.mock.room_member import RoomMemberStore
+
+
+def test_room_member_store():
+    store = RoomMemberStore()
+    for index in range(1000):
+        assert store.add('room-1', f'contact-{index}', 'contact-0', 1600000000)
+    assert not store.add('room-1', 'contact-5', 'contact-1', 1600000001)
+    assert store.member_count() == 1000
+    assert store.nbytes() == 12 * 1000
+
+    record = store.get('room-1', 'contact-5')
+    assert record.inviter_id == 'contact-0'
+    assert record.join_time == 1600000000
+
+    assert store.set_alias('room-1', 'contact-5', 'alias')
+    assert store.get('room-1', 'contact-5').room_alias == 'alias'
+    assert store.remove('room-1', 'contact-5')
+    assert store.get('room-1', 'contact-5') is None
+    assert not store.set_alias('room-2', 'contact-5', 'alias')
+
+
+def test_member_view():
+    store = RoomMemberStore()
+    store.add_many('room-1', ['c-1', 'c-2', 'c-3'], 'c-1', 1600000000)
+    view = store.member_view('room-1', exclude_id='c-2')
+    assert len(view) == 2
+    assert list(view) == [view[0], view[-1]] == ['c-1', 'c-3']
+    assert view[:1] == ['c-1']
+    with pytest.raises(IndexError):
+        view[2]
+    assert sorted(random.Random(1).sample(view, 2)) == ['c-1', 'c-3']
+    assert list(store.member_view('room-1', exclude_id='c-9')) == \
+        ['c-1', 'c-2', 'c-3']
+    assert store.member_view('room-2') == []
+
+
+@pytest.mark.asyncio
+async def test_room_member_payload(puppet: PuppetMock):
+    environment = puppet.mocker.environment
+    contacts = environment.get_contact_payloads()
+    room = environment.new_room_payload(member_ids=[contacts[0].id])
+
+    joins = []
+
+    def on_stream(response):
+        if response.type == int(EventType.EVENT_TYPE_ROOM_JOIN):
+            joins.append(json.loads(response.payload))
+
+    puppet.mocker.on('stream', on_stream)
+    puppet.mocker.add_contact_to_room(
+        [contacts[1].id, contacts[0].id], room.id, inviter_id=contacts[0].id)
+    # the members are ordered by the member store, not by the joins
+    assert sorted(await puppet.room_members(room.id)) == \
+        sorted([contacts[0].id, contacts[1].id])
+    # only the contact which is not a member before joins
+    assert joins[0]['inviteeIdList'] == [contacts[1].id]
+    puppet.mocker.add_contact_to_room(contacts[1].id, room.id,
+                                      inviter_id=contacts[0].id)
+    assert len(joins) == 1
+    puppet.mocker.remove_listener('stream', on_stream)
+
+    environment.set_room_alias(room.id, contacts[1].id, 'room-alias')
+    payload = await puppet.room_member_payload(room.id, contacts[1].id)
+    assert payload.inviter_id == contacts[0].id
+    assert payload.room_alias == 'room-alias'
+    assert payload.name == contacts[1].name
+
+    payload = await puppet.room_member_payload(room.id, contacts[0].id)
+    assert payload.inviter_id == room.owner_id
+
+
+def test_members_in_store_only():
+    environment = EnvironmentMock(contact_num=10, room_num=0)
+    contact_ids = environment.get_contact_ids(limit=None).ids
+    room = environment.new_room_payload(member_ids=contact_ids[:3])
+    environment.add_room_members(room.id, [contact_ids[3]], contact_ids[0])
+    environment.remove_room_members(room.id, [contact_ids[1]])
+
+    expected = sorted([contact_ids[0], contact_ids[2], contact_ids[3]])
+    assert sorted(environment.get_room_payload(room.id).member_ids) == \
+        expected
+    assert sorted(environment.get_room_member_ids(room.id)) == expected
+    # the stored payload doesn't keep a second copy of the members
+    assert environment._storage.get(PayloadType.PAYLOAD_TYPE_ROOM,
+                                    room.id).member_ids == []
+
+    room_payload = environment.get_room_payload(room.id)
+    room_payload.member_ids = [contact_ids[4]]
+    environment.update_room_payload(room_payload)
+    assert environment.get_room_member_ids(room.id) == [contact_ids[4]]
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from wechaty_puppet import MessageType
+
+from wechaty_puppet_mock.metrics import MetricsRegistry, MockMetrics
+from wechaty_puppet_mock.send_queue import SendQueue, SendQueueOptions
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_pacing(new_puppet):
+    puppet = await new_puppet(
+        send_queue=SendQueueOptions(conversation_interval=0.05))
+    contacts = puppet.mocker.environment.get_contact_payloads()
+    loop = asyncio.get_event_loop()
+
+    start_time = loop.time()
+    message_ids = await asyncio.gather(
+        puppet.message_send_text(contacts[1].id, 'ding'),
+        puppet.message_send_text(contacts[1].id, 'dong'),
+        puppet.message_send_text(contacts[2].id, 'ding'),
+    )
+    assert loop.time() - start_time >= 0.05
+    assert len(set(message_ids)) == 3
+    assert puppet.send_queue.stats.delivered == 3
+    assert puppet.send_queue.stats.max_wait >= 0.05
+    assert puppet.send_queue.depth() == 0
+    # the depth of the closed queue is not collected any more
+    depth = puppet.metrics.send_queue_depth
+    assert len(depth._collectors) == 1
+    await puppet.stop()
+    assert not depth._collectors
+
+
+async def test_coalesce(new_puppet):
+    puppet = await new_puppet(
+        send_queue=SendQueueOptions(global_interval=0.01, coalesce=True))
+    contacts = puppet.mocker.environment.get_contact_payloads()
+
+    message_ids = await asyncio.gather(
+        puppet.message_send_text(contacts[1].id, 'ding'),
+        puppet.message_send_text(contacts[2].id, 'hello'),
+        puppet.message_send_text(contacts[1].id, 'dong'),
+        puppet.message_send_text(contacts[1].id, 'ding-dong'),
+    )
+    assert message_ids[0] == message_ids[2] == message_ids[3]
+    payload = await puppet.message_payload(message_ids[0])
+    assert payload.text == 'ding\ndong\nding-dong'
+    assert puppet.send_queue.stats.coalesced == 2
+    await puppet.stop()
+
+
+async def test_restart_after_close():
+    metrics = MockMetrics(MetricsRegistry())
+    queue = SendQueue(lambda conversation_id, *_: f'{conversation_id}-id',
+                      metrics=metrics)
+    depth = metrics.send_queue_depth
+    await queue.close()
+    assert not depth._collectors
+
+    # the next message restarts the dispatcher and the depth collector
+    assert await queue.put('room', MessageType.MESSAGE_TYPE_TEXT,
+                           'ding') == 'room-id'
+    assert len(depth._collectors) == 1
+    assert 'room' in queue._last_sent
+    await queue.close()
+    await queue.close()
+    assert not depth._collectors
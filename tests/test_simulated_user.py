@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from wechaty_puppet_mock import EnvironmentMock, PuppetMock
+from wechaty_puppet_mock.fault import FixedLatency
+from wechaty_puppet_mock.mock.user.simulated_user import ScriptedReply, \
+    UserSimulation
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def environment() -> EnvironmentMock:
+    return EnvironmentMock(contact_num=300)
+
+
+@pytest.fixture
+async def puppet(new_puppet) -> PuppetMock:
+    puppet = await new_puppet()
+
+    async def on_message(payload):
+        message = await puppet.message_payload(payload.message_id)
+        if message.from_id == puppet.self_id() or message.text != 'ding':
+            return
+        await puppet.message_send_text(message.room_id or message.from_id,
+                                       'dong')
+
+    puppet.on('message', on_message)
+    return puppet
+
+
+async def _wait_for(condition, timeout: float = 5):
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    while not condition() and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+async def test_closed_loop(puppet: PuppetMock):
+    environment = puppet.mocker.environment
+    contact_ids = [payload.id for payload in
+                   environment.get_contact_payloads()[1:]]
+    room = environment.new_room_payload(member_ids=contact_ids[:10])
+
+    simulation = UserSimulation(
+        puppet.mocker, think_time=FixedLatency(0.001),
+        policy=ScriptedReply(['ding', 'ding', 'bye'], repeat=False), seed=1)
+    simulation.add_users(contact_ids[10:])
+    simulation.add_users(contact_ids[:10], room_id=room.id)
+    simulation.start(opening='ding')
+
+    # every user: opening + ding + ding + bye, the bot replies to the dings
+    total = len(simulation.users)
+    await _wait_for(lambda: simulation.stats.sent >= total * 4)
+    await simulation.stop()
+
+    assert simulation.stats.sent == total * 4
+    assert simulation.stats.received == total * 3
+    assert len(simulation.response_times_ms) == total * 3
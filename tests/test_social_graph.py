@@ -0,0 +1,93 @@
+import pytest
+
+from wechaty_puppet_mock import EnvironmentMock, MockEnvironmentError
+from wechaty_puppet_mock.mock.environment import ALL_PAYLOADS
+from wechaty_puppet_mock.mock.population import UniformRoomSize
+from wechaty_puppet_mock.mock.social_graph import SocialGraph, \
+    generate_social_graph
+
+
+def test_csr_graph():
+    graph = SocialGraph.from_edges(5, [0, 0, 1, 2, 3, 0],
+                                   [1, 2, 2, 0, 3, 1])
+    assert graph.edge_count == 3
+    assert list(graph.neighbors_of(0)) == [1, 2]
+    assert graph.degree(3) == 0
+    assert graph.connected(1, 2) and not graph.connected(1, 4)
+    assert graph.mutual_neighbors(0, 1) == [2]
+    with pytest.raises(MockEnvironmentError):
+        graph.degree(5)
+
+
+def test_generate_social_graph():
+    graph = generate_social_graph(5000, mean_degree=10, community_size=100,
+                                  seed=1)
+    assert graph.node_count == 5000
+    assert list(graph.neighbors) == list(generate_social_graph(
+        5000, mean_degree=10, community_size=100, seed=1).neighbors)
+
+    degrees = sorted(graph.degree(node) for node in range(5000))
+    # power-law: the hubs are far above the median
+    assert degrees[-1] > 10 * degrees[2500]
+
+    intra = total = 0
+    for node in range(5000):
+        for neighbor in graph.neighbors_of(node):
+            total += 1
+            intra += graph.community_of(node) == graph.community_of(neighbor)
+    assert intra / total > 0.7
+    assert graph.community_of(0) == 0
+    assert 0 in graph.community_range(0)
+    with pytest.raises(MockEnvironmentError):
+        generate_social_graph(100, degree_alpha=1)
+
+
+def test_environment_social_graph():
+    environment = EnvironmentMock(contact_num=300, room_num=0, seed=1)
+    contact_ids = [payload.id for payload in
+                   environment.get_contact_payloads()]
+    with pytest.raises(MockEnvironmentError):
+        environment.get_neighbor_contact_ids(contact_ids[0])
+
+    dirty_events = []
+    environment.add_dirty_listener(
+        lambda *event: dirty_events.append(event))
+    environment.build_social_graph(mean_degree=8, community_size=50,
+                                   self_id=contact_ids[0])
+    # the friend flags are changed in one bulk notification
+    assert [event[1] for event in dirty_events] == [ALL_PAYLOADS]
+    neighbor_ids = environment.get_neighbor_contact_ids(contact_ids[0])
+    assert neighbor_ids
+    assert environment._sample_room_member_ids(0) == []
+    friend_ids = {payload.id for payload in
+                  environment.get_contact_payloads() if payload.friend}
+    assert friend_ids == set(neighbor_ids)
+
+    other_id = neighbor_ids[0]
+    for mutual_id in environment.get_mutual_contact_ids(contact_ids[0],
+                                                        other_id):
+        assert mutual_id in neighbor_ids
+        assert mutual_id in environment.get_neighbor_contact_ids(other_id)
+
+    new_contact = environment.new_contact_payload()
+    assert environment.get_neighbor_contact_ids(new_contact.id) == []
+
+    room_ids = environment.populate_rooms(
+        20, room_size=UniformRoomSize(low=5, high=5))
+    for room_id in room_ids:
+        member_ids = set(environment.get_room_payload(room_id).member_ids)
+        assert len(member_ids) == 5
+        # the members are drawn from the neighborhood in the graph
+        assert any(member_ids & set(environment.get_neighbor_contact_ids(
+            member_id)) for member_id in member_ids)
+
+
+def test_fill_small_component():
+    environment = EnvironmentMock(contact_num=100, room_num=0, seed=2)
+    environment.build_social_graph(mean_degree=1, community_size=5,
+                                   mixing=0.0)
+    # the neighborhoods are smaller than the rooms, strangers fill them up
+    for room_id in environment.populate_rooms(
+            10, room_size=UniformRoomSize(low=40, high=40)):
+        member_ids = environment.get_room_payload(room_id).member_ids
+        assert len(set(member_ids)) == len(member_ids) == 40
@@ -0,0 +1,141 @@
+import os
+
+import pytest
+from wechaty_puppet import MessagePayload
+from wechaty_puppet.schemas.types import PayloadType
+
+from wechaty_puppet_mock import EnvironmentMock, MockEnvironmentError
+from wechaty_puppet_mock.mock.storage import SQLiteStorage
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return os.path.join(tmp_path, 'world.db')
+
+
+def test_sqlite_storage(path: str):
+    storage = SQLiteStorage(path, batch_size=10, cache_size=5)
+    for index in range(25):
+        storage.put(PayloadType.PAYLOAD_TYPE_MESSAGE,
+                    MessagePayload(id=f'message-{index}', text=str(index)))
+    assert storage.count(PayloadType.PAYLOAD_TYPE_MESSAGE) == 25
+    assert len(storage.resident(PayloadType.PAYLOAD_TYPE_MESSAGE)) == 5
+
+    payload = storage.get(PayloadType.PAYLOAD_TYPE_MESSAGE, 'message-3')
+    assert payload.text == '3'
+    assert storage.get(PayloadType.PAYLOAD_TYPE_MESSAGE, 'message-3') is \
+        payload
+    assert storage.get(PayloadType.PAYLOAD_TYPE_ROOM, 'message-3') is None
+
+    # the changed payload is written again after put
+    payload.text = 'changed'
+    storage.put(PayloadType.PAYLOAD_TYPE_MESSAGE, payload)
+    storage.close()
+
+    storage = SQLiteStorage(path)
+    assert storage.get(PayloadType.PAYLOAD_TYPE_MESSAGE,
+                       'message-3').text == 'changed'
+    assert [payload.id for payload in storage.iter_payloads(
+        PayloadType.PAYLOAD_TYPE_MESSAGE)][:3] == \
+        ['message-0', 'message-1', 'message-2']
+    assert storage.connection.execute('PRAGMA journal_mode').fetchone()[0] \
+        == 'wal'
+    storage.close()
+
+    with pytest.raises(MockEnvironmentError):
+        SQLiteStorage(path, cache_size=0)
+
+
+def test_reuse_world(path: str):
+    # the payloads are evicted right away, the in-place changes of the
+    # members must be written anyway
+    environment = EnvironmentMock(contact_num=20, room_num=4,
+                                  storage=SQLiteStorage(path, cache_size=1))
+    contact_ids = environment.get_contact_ids(limit=None).ids
+    room_id = environment.get_room_ids().ids[0]
+    environment.add_room_members(room_id, [contact_ids[0], contact_ids[1]],
+                                 inviter_id=contact_ids[0])
+    member_ids = environment.get_room_payload(room_id).member_ids
+    assert contact_ids[1] in member_ids
+    environment.add_message_payload(MessagePayload(id='message', text='ding',
+                                                   room_id=room_id))
+    version = environment.get_payload_version(
+        PayloadType.PAYLOAD_TYPE_MESSAGE, 'message')
+    assert version > 0
+    # the versions of messages are kept in the rows, not in memory
+    assert not environment._payload_versions[
+        PayloadType.PAYLOAD_TYPE_MESSAGE]
+    environment.close()
+
+    environment = EnvironmentMock(contact_num=5,
+                                  storage=SQLiteStorage(path, cache_size=4))
+    assert environment.get_contact_ids(limit=None).ids == contact_ids
+    assert len(environment.get_room_ids().ids) == 4
+    assert environment.get_room_payload(room_id).member_ids == member_ids
+    assert environment.get_room_member(room_id, contact_ids[1])
+    assert environment.search_contact_id(
+        weixin=environment.get_contact_payload(contact_ids[3]).weixin) == \
+        contact_ids[3]
+    assert environment.get_message_payload('message').text == 'ding'
+    assert environment.get_payload_version(
+        PayloadType.PAYLOAD_TYPE_MESSAGE, 'message') == version
+    assert environment.get_payload_if_newer(
+        PayloadType.PAYLOAD_TYPE_MESSAGE, 'message', version) is None
+    environment.mark_payload_dirty(PayloadType.PAYLOAD_TYPE_MESSAGE,
+                                   'message')
+    assert environment.get_payload_version(
+        PayloadType.PAYLOAD_TYPE_MESSAGE, 'message') > version
+    assert environment.memory_usage()['messages'].count == 1
+    environment.close()
+
+
+def test_round_trip_world(path: str):
+    environment = EnvironmentMock(contact_num=20, room_num=4,
+                                  storage=SQLiteStorage(path))
+    contact_ids = environment.get_contact_ids(limit=None).ids
+    room_id = environment.new_room_payload(member_ids=contact_ids[:2]).id
+    new_member_id = contact_ids[5]
+    environment.add_room_members(room_id, [new_member_id],
+                                 inviter_id=contact_ids[6])
+    environment.set_room_alias(room_id, new_member_id, 'alias')
+    environment.add_contact_tag('tag', contact_ids[1])
+    environment.add_contact_tag('star', contact_ids[2], favorite=True)
+    friendship = environment.new_friendship_payload(contact_ids[3], 'hello')
+    environment.add_message_payload(MessagePayload(id='message', text='ding'))
+    environment.add_message_payload(MessagePayload(id='forward', text='ding'),
+                                    origin_id='message')
+    environment.recall_message('message')
+    environment.update_contact_payload(
+        environment.get_contact_payload(contact_ids[4]))
+
+    member = environment.get_room_member(room_id, new_member_id)
+    login_user_id = environment._login_user_payload.id
+    versions = {
+        payload_type: {
+            payload_id: environment.get_payload_version(payload_type,
+                                                        payload_id)
+            for payload_id in payload_ids
+        }
+        for payload_type, payload_ids in (
+            (PayloadType.PAYLOAD_TYPE_CONTACT, contact_ids),
+            (PayloadType.PAYLOAD_TYPE_ROOM, environment.get_room_ids().ids),
+        )
+    }
+    environment.close()
+
+    environment = EnvironmentMock(storage=SQLiteStorage(path))
+    assert environment.get_room_member(room_id, new_member_id) == member
+    assert member.inviter_id == contact_ids[6]
+    assert member.room_alias == 'alias'
+    assert environment.query_tagged_contact_ids(all_of=['tag']) == \
+        [contact_ids[1]]
+    assert environment.get_tag_ids(contact_ids[2], favorite=True) == ['star']
+    assert environment.get_friendship_payload(friendship.id).hello == 'hello'
+    assert environment.is_message_recalled('message')
+    assert environment.get_message_origin_id('forward') == 'message'
+    assert environment._login_user_payload.id == login_user_id
+    for payload_type, payload_versions in versions.items():
+        for payload_id, version in payload_versions.items():
+            assert environment.get_payload_version(
+                payload_type, payload_id) == version
+    environment.close()
@@ -0,0 +1,80 @@
+import pytest
+
+from wechaty_puppet_mock import PuppetMock
+from wechaty_puppet_mock.mock.tag import Bitmap, TagStore
+
+
+def test_bitmap_operations():
+    left = Bitmap([1, 3, 70000, 200000])
+    right = Bitmap([3, 4, 200000])
+    assert list(left & right) == [3, 200000]
+    assert list(left | right) == [1, 3, 4, 70000, 200000]
+    assert list(left - right) == [1, 70000]
+    assert len(left) == 4
+
+    left.remove(70000)
+    assert 70000 not in left
+    assert 1 in left
+
+
+def test_bitmap_chunks():
+    # the scattered indices are stored as arrays of 2 bytes each
+    sparse = Bitmap(range(0, 1525 << 16, 1 << 16))
+    assert len(sparse) == 1525
+    assert sparse.nbytes() == 2 * 1525
+
+    # the dense chunk is stored as bits, and back to the array when the
+    # set operations make it sparse again
+    dense = Bitmap(range(0, 1 << 16, 2))
+    assert dense.nbytes() == 8192
+    odd = Bitmap(range(1, 1 << 16, 2))
+    assert not dense & odd
+    assert len(dense | odd) == 1 << 16
+    few = dense - Bitmap(range(0, (1 << 16) - 20, 2))
+    assert list(few) == list(range((1 << 16) - 20, 1 << 16, 2))
+    assert few.nbytes() == 20
+
+    mixed = dense | Bitmap([1, 3, 70001])
+    assert list(mixed & Bitmap([1, 2, 5, 70001])) == [1, 2, 70001]
+    assert list(Bitmap([1, 2, 5, 70001]) - dense) == [1, 5, 70001]
+
+    # the results don't share the arrays of the operands
+    union = sparse | Bitmap()
+    union.add(1)
+    assert 1 not in sparse
+    union.remove(0)
+    assert 0 in sparse and 0 not in union
+
+
+def test_tag_store_query():
+    store = TagStore()
+    for index in range(0, 1000000, 3):
+        store.add('a', index)
+    for index in range(0, 1000000, 5):
+        store.add('b', index)
+    for index in range(0, 1000000, 7):
+        store.add('c', index)
+
+    result = store.query(all_of=['a', 'b'], none_of=['c'])
+    expected = [index for index in range(0, 1000000, 15) if index % 7]
+    assert list(result) == expected
+
+
+@pytest.mark.asyncio
+async def test_tag_contact(puppet: PuppetMock):
+    contacts = puppet.mocker.environment.get_contact_payloads()
+    await puppet.tag_contact_add('vip', contacts[0].id)
+    await puppet.tag_contact_add('vip', contacts[1].id)
+    await puppet.tag_contact_add('new', contacts[1].id)
+    await puppet.tag_favorite_add('star', contacts[2].id)
+
+    assert await puppet.tag_contact_list() == ['vip', 'new']
+    assert await puppet.contact_tag_ids(contacts[1].id) == ['vip', 'new']
+    assert await puppet.tag_contact_query(
+        all_of=['vip'], none_of=['new']) == [contacts[0].id]
+
+    await puppet.tag_contact_remove('vip', contacts[0].id)
+    assert await puppet.contact_tag_ids(contacts[0].id) == []
+
+    await puppet.tag_contact_delete('new')
+    assert await puppet.tag_contact_list() == ['vip']
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+from wechaty_puppet import MessageType
+
+from wechaty_puppet_mock import EnvironmentMock, MockEnvironmentError, \
+    Mocker, PuppetMock
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_inject_from_threads(environment: EnvironmentMock,
+                                   mocker: Mocker, puppet: PuppetMock):
+    contact_ids = [payload.id for payload in environment.get_contact_payloads()]
+
+    message_ids = []
+    puppet.on('message', lambda payload: message_ids.append(
+        payload.message_id))
+    threadsafe = mocker.threadsafe()
+    assert mocker.threadsafe() is threadsafe
+
+    futures = []
+
+    def produce(index: int):
+        for count in range(500):
+            futures.append(threadsafe.send_message_payload(
+                contact_ids[index + 1], contact_ids[0],
+                MessageType.MESSAGE_TYPE_TEXT, text=f'ding {count}'))
+
+    threads = [threading.Thread(target=produce, args=(index,))
+               for index in range(4)]
+    for thread in threads:
+        thread.start()
+    await asyncio.get_event_loop().run_in_executor(
+        None, lambda: [thread.join() for thread in threads])
+    results = await asyncio.gather(*[asyncio.wrap_future(future)
+                                     for future in futures])
+
+    assert len(set(results)) == 2000
+    assert sorted(message_ids) == sorted(results)
+    assert threadsafe.pending() == 0
+    assert threadsafe.batches < threadsafe.drained
+
+    with pytest.raises(MockEnvironmentError):
+        await asyncio.wrap_future(threadsafe.add_contact_to_room(
+            contact_ids[1], 'not-exist-room', contact_ids[0]))